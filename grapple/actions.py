@@ -11,7 +11,7 @@ from django.core.exceptions import FieldDoesNotExist
 from django.db import models
 from django.utils.module_loading import import_string
 from graphene_django.types import DjangoObjectType
-from wagtail.blocks import StructValue, stream_block
+from wagtail.blocks import StreamValue, StructValue, stream_block
 from wagtail.contrib.settings.models import BaseGenericSetting, BaseSiteSetting
 from wagtail.documents.models import AbstractDocument
 from wagtail.fields import RichTextField
@@ -22,14 +22,17 @@ from wagtail.rich_text import RichText
 from wagtail.snippets.models import get_snippet_models
 
 from .helpers import field_middlewares, streamfield_types
+from .loaders import ChooserBlockLoader, StreamFieldLoader, track_stream_value
+from .optimizer import prefetch_model_lookups
 from .registry import registry
 from .settings import grapple_settings
 from .types.documents import DocumentObjectType
 from .types.images import ImageObjectType, ImageRenditionObjectType
 from .types.pages import Page, get_page_interface
 from .types.rich_text import RichText as RichTextType
+from .types.rich_text import format_rich_text, load_rich_text
 from .types.snippets import get_snippet_interface
-from .types.streamfield import generate_streamfield_union
+from .types.streamfield import StructBlockItem, generate_streamfield_union
 
 
 if apps.is_installed("wagtailmedia"):
@@ -173,6 +176,7 @@ def get_field_type(field):
                 field_type,
                 description=field.description,
                 deprecation_reason=field.deprecation_reason,
+                **getattr(field, "arguments", {}),
             )
 
 
@@ -180,6 +184,8 @@ def model_resolver(field):
     def mixin(self, instance, info, **kwargs):
         from .utils import resolve_queryset
 
+        # Load the relations selected on this model for the whole list at once
+        prefetch_model_lookups(info, instance)
         cls_field = getattr(instance, field.field_source)
 
         # If queryset then call .all() method
@@ -225,8 +231,13 @@ def model_resolver(field):
         if field.field_type is RichTextType:
             # Rendering of html will be handled by the GraphQL executor calling
             # RichText.serialize, due to being declared as GraphQLRichText rather than
-            # GraphQLString
-            return cls_field
+            # GraphQLString. The rich text of the whole list is rendered at once
+            # first where possible, and returned as is by RichText.serialize.
+            output_format = str(kwargs["format"]) if kwargs.get("format") else None
+            rendered = load_rich_text(info, instance, field.field_source, output_format)
+            if rendered is None and cls_field is not None:
+                rendered = format_rich_text(cls_field, output_format)
+            return rendered
         try:
             if hasattr(instance._meta, "get_field"):
                 field_model = instance._meta.get_field(field.field_source)
@@ -236,7 +247,14 @@ def model_resolver(field):
             return cls_field
 
         if type(field_model) is RichTextField:
-            return RichTextType.serialize(cls_field)
+            rendered = load_rich_text(info, instance, field.field_source)
+            return RichTextType.serialize(cls_field if rendered is None else rendered)
+
+        if isinstance(cls_field, StreamValue):
+            # Convert the StreamField of all peers at once, and allow chooser blocks
+            # to load their values for the whole StreamField at once
+            StreamFieldLoader.for_request(info, field.field_source).load(instance)
+            return track_stream_value(info, cls_field)
 
         # If none of those then just return field
         return cls_field
@@ -410,7 +428,12 @@ def streamfield_resolver(self, instance, info, **kwargs):
 
         value = get_field_value(instance, field_name)
         if issubclass(type(block), ImageChooserBlock) and isinstance(value, int):
-            return block.to_python(value)
+            return ChooserBlockLoader.for_request(info).load(
+                StructBlockItem(field_name, block, value)
+            )
+        if isinstance(value, RichText):
+            output_format = str(kwargs["format"]) if kwargs.get("format") else None
+            return load_rich_text(info, value, output_format=output_format)
 
     return value
 
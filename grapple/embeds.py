@@ -0,0 +1,218 @@
+"""
+Resolution of the Wagtail embeds of embed blocks. Embeds stored by Wagtail are
+read with one query, and the others are fetched from their providers
+concurrently. URLs the providers fail to embed are remembered for a while, so
+they are not retried on every request.
+
+Embeds can also be warmed ahead of time, when pages are published or with the
+``grapple_warm_embeds`` management command, so that reads never wait for a
+provider.
+"""
+
+import logging
+import threading
+
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from functools import partial
+from typing import Optional
+
+from django.core.cache import caches
+from django.db import connections
+from django.utils.timezone import now
+from wagtail.embeds.embeds import get_embed, get_embed_hash
+from wagtail.embeds.exceptions import EmbedException
+from wagtail.embeds.models import Embed
+from wagtail.fields import StreamField
+
+from .loaders import get_stream_embed_values
+from .settings import grapple_settings
+
+
+logger = logging.getLogger("grapple")
+
+
+def get_failure_cache_key(url: str) -> str:
+    return f"grapple:embed:failure:{get_embed_hash(url)}"
+
+
+def get_stored_embeds(urls) -> dict:
+    """
+    Return the unexpired embeds stored by Wagtail for the given URLs, by URL.
+    """
+    hashes = {get_embed_hash(url): url for url in urls}
+    if not hashes:
+        return {}
+    return {
+        hashes[embed.hash]: embed
+        for embed in Embed.objects.exclude(cache_until__lte=now()).filter(
+            hash__in=hashes
+        )
+    }
+
+
+def fetch_embed_in_thread(url: str):
+    try:
+        return get_embed(url)
+    finally:
+        # Each thread has its own database connections.
+        connections.close_all()
+
+
+class EmbedFetchPool:
+    """
+    The threads embeds are fetched on, shared by all requests, so that at most
+    ``EMBED_MAX_WORKERS`` embeds are fetched at once however slow providers are.
+    A URL already being fetched is not fetched again, its pending fetch is
+    returned instead.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._max_workers = None
+        self._futures = {}
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        max_workers = grapple_settings.EMBED_MAX_WORKERS
+        if self._executor is None or self._max_workers != max_workers:
+            if self._executor is not None:
+                # Fetches in progress still complete on the previous threads.
+                self._executor.shutdown(wait=False)
+            self._executor = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="grapple-embeds"
+            )
+            self._max_workers = max_workers
+        return self._executor
+
+    def submit(self, url: str) -> Future:
+        with self._lock:
+            future = self._futures.get(url)
+            if future is not None:
+                return future
+            future = self._get_executor().submit(fetch_embed_in_thread, url)
+            self._futures[url] = future
+        future.add_done_callback(partial(self._forget, url))
+        return future
+
+    def _forget(self, url: str, future: Future):
+        with self._lock:
+            if self._futures.get(url) is future:
+                del self._futures[url]
+
+
+embed_fetch_pool = EmbedFetchPool()
+
+
+def fetch_embeds(
+    urls, *, timeout: Optional[float] = None, skip_failures: bool = True
+) -> dict:
+    """
+    Fetch the embeds of the given URLs from their providers, on the threads of
+    ``embed_fetch_pool``, and return them by URL. Embeds still pending after
+    ``timeout`` seconds are left out, and saved by Wagtail once fetched.
+
+    URLs that cannot be embedded are left out too, and remembered in the
+    ``EMBED_FAILURE_CACHE`` cache for ``EMBED_FAILURE_TIMEOUT`` seconds. Unless
+    ``skip_failures`` is false, those URLs are not fetched again meanwhile.
+    """
+    urls = list(dict.fromkeys(urls))
+    failure_timeout = grapple_settings.EMBED_FAILURE_TIMEOUT
+    failure_cache = caches[grapple_settings.EMBED_FAILURE_CACHE]
+    if urls and failure_timeout and skip_failures:
+        known_failures = failure_cache.get_many(
+            [get_failure_cache_key(url) for url in urls]
+        )
+        urls = [url for url in urls if get_failure_cache_key(url) not in known_failures]
+    if not urls:
+        return {}
+
+    embeds, failed = {}, []
+    if min(len(urls), grapple_settings.EMBED_MAX_WORKERS) > 1:
+        futures = {embed_fetch_pool.submit(url): url for url in urls}
+        # Do not wait for slow providers, their embeds are saved once fetched.
+        done, pending = wait(futures, timeout=timeout)
+        for future in pending:
+            logger.warning("Timed out embedding %s", futures[future])
+        for future in done:
+            try:
+                embeds[futures[future]] = future.result()
+            except EmbedException:
+                failed.append(futures[future])
+    else:
+        for url in urls:
+            try:
+                embeds[url] = get_embed(url)
+            except EmbedException:
+                failed.append(url)
+
+    if failed and failure_timeout:
+        failure_cache.set_many(
+            dict.fromkeys(map(get_failure_cache_key, failed), True),
+            timeout=failure_timeout,
+        )
+    return embeds
+
+
+def get_embeds(urls) -> dict:
+    """
+    Return the embeds of the given URLs by URL, as read by the GraphQL API.
+    Embeds that are not stored are fetched within ``EMBED_TIMEOUT`` seconds,
+    unless the ``EMBED_FETCH_ON_READ`` setting is false.
+    """
+    urls = list(dict.fromkeys(urls))
+    embeds = get_stored_embeds(urls)
+    missing = [url for url in urls if url not in embeds]
+    if missing and grapple_settings.EMBED_FETCH_ON_READ:
+        embeds.update(fetch_embeds(missing, timeout=grapple_settings.EMBED_TIMEOUT))
+    return embeds
+
+
+def get_instance_embed_urls(instance) -> set[str]:
+    """
+    Return the URLs of all the embed blocks in the StreamFields of a model instance.
+    """
+    urls = set()
+    for field in instance._meta.concrete_fields:
+        if isinstance(field, StreamField):
+            for value in get_stream_embed_values(getattr(instance, field.attname)):
+                if value.url:
+                    urls.add(value.url)
+    return urls
+
+
+def warm_embeds(urls) -> tuple[int, int]:
+    """
+    Fetch and store the embeds of the given URLs that are not stored yet,
+    retrying URLs that failed before. Returns how many URLs were embedded and
+    how many could not be.
+    """
+    urls = set(urls)
+    stored = get_stored_embeds(urls)
+    fetched = fetch_embeds(
+        [url for url in urls if url not in stored], skip_failures=False
+    )
+    embedded = len(stored) + len(fetched)
+    return embedded, len(urls) - embedded
+
+
+def warm_embeds_in_thread(urls):
+    try:
+        warm_embeds(urls)
+    finally:
+        # Each thread has its own database connections.
+        connections.close_all()
+
+
+def warm_embeds_in_background(urls) -> threading.Thread:
+    """
+    Warm the embeds of the given URLs in a background thread, so the caller does
+    not wait for their providers, however slow.
+    """
+    thread = threading.Thread(
+        target=warm_embeds_in_thread,
+        args=(set(urls),),
+        name="grapple-warm-embeds",
+        daemon=True,
+    )
+    thread.start()
+    return thread
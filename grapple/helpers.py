@@ -8,6 +8,7 @@ from django.utils.translation import gettext_lazy as _
 from graphene.utils.str_converters import to_camel_case
 from wagtail.models import Page
 
+from .optimizer import optimize_queryset
 from .registry import registry
 from .settings import grapple_settings
 from .types.streamfield import StreamFieldInterface
@@ -124,7 +125,7 @@ def register_query_field(
 
                         return qs.get(**kwargs)
 
-                    return cls.objects.get(**kwargs)
+                    return optimize_queryset(cls.objects.all(), info).get(**kwargs)
                 except (cls.DoesNotExist, cls.MultipleObjectsReturned):
                     return None
 
@@ -191,9 +192,11 @@ def register_paginated_query_field(
     plural_required=False,
     plural_item_required=False,
     middleware=None,
+    cursor_pagination=False,
+    total_strategy=None,
 ):
-    from .types.structures import PaginatedQuerySet
-    from .utils import resolve_paginated_queryset
+    from .types.structures import ConnectionQuerySet, PaginatedQuerySet
+    from .utils import resolve_connection_queryset, resolve_paginated_queryset
 
     if not plural_field_name:
         plural_field_name = field_name + "s"
@@ -244,7 +247,7 @@ def register_paginated_query_field(
                             ).first()
                         return qs.get(**kwargs)
 
-                    return cls.objects.get(**kwargs)
+                    return optimize_queryset(cls.objects.all(), info).get(**kwargs)
                 except (cls.DoesNotExist, cls.MultipleObjectsReturned):
                     return None
 
@@ -255,7 +258,11 @@ def register_paginated_query_field(
                     if "order" not in kwargs:
                         kwargs["order"] = "-first_published_at"
 
-                return resolve_paginated_queryset(qs.all(), info, **kwargs)
+                if cursor_pagination:
+                    return resolve_connection_queryset(qs.all(), info, **kwargs)
+                return resolve_paginated_queryset(
+                    qs.all(), info, total_strategy=total_strategy, **kwargs
+                )
 
             # Create schema and add resolve methods
             schema = type(cls.__name__ + "Query", (), {})
@@ -274,10 +281,13 @@ def register_paginated_query_field(
             if plural_item_required:
                 plural_field_type = graphene.NonNull(field_type)
 
+            plural_field_class = (
+                ConnectionQuerySet if cursor_pagination else PaginatedQuerySet
+            )
             setattr(
                 schema,
                 plural_field_name,
-                PaginatedQuerySet(plural_field_type, cls, required=plural_required),
+                plural_field_class(plural_field_type, cls, required=plural_required),
             )
 
             setattr(
@@ -338,7 +348,7 @@ def register_singular_query_field(
 
                     return qs.live().public().filter(**kwargs).first()
 
-                return qs.filter(**kwargs).first()
+                return optimize_queryset(qs, info).filter(**kwargs).first()
 
             # Create schema and add resolve methods
             schema = type(cls.__name__ + "Query", (), {})
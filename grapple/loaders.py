@@ -0,0 +1,656 @@
+"""
+Per-request batch loading.
+
+GraphQL resolves list items one at a time, so a resolver that looks up related
+objects (e.g. the parent of a page) runs one query per item. Loaders avoid this
+by collecting the keys needed by every item of the list being resolved and
+fetching them in bulk the first time any of them is requested.
+
+Loaders and the lists they batch across are stored on the GraphQL context
+(usually the request), so they only live as long as the request does. When no
+context is available, a fresh loader is used for every call, which keeps results
+correct at the cost of batching.
+"""
+
+from collections import defaultdict
+from typing import Any, Optional
+
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import F, Q, Window, prefetch_related_objects
+from django.db.models.functions import RowNumber, Substr
+from wagtail import blocks
+from wagtail.documents.models import AbstractDocument
+from wagtail.embeds.blocks import EmbedBlock, EmbedValue
+from wagtail.images.blocks import ImageBlock
+from wagtail.images.models import AbstractImage
+from wagtail.models import Page as WagtailPage
+from wagtail.rich_text import RichText
+
+from .selection import get_selected_field_names, iter_selected_fields
+from .settings import grapple_settings
+
+
+REQUEST_CACHE_ATTR = "_grapple_loaders"
+
+
+def get_request_cache(info) -> Optional[dict]:
+    """
+    Return the dict used to store per-request loader state, or None if the
+    GraphQL context cannot hold it.
+    """
+    context = info.context
+    if context is None:
+        return None
+    if isinstance(context, dict):
+        return context.setdefault(REQUEST_CACHE_ATTR, {})
+    try:
+        return vars(context).setdefault(REQUEST_CACHE_ATTR, {})
+    except TypeError:
+        return None
+
+
+def track_results(info, results):
+    """
+    Remember a list of resolved items (usually a QuerySet), so loaders can
+    batch across all of its items. QuerySets are not evaluated here; their
+    items are read once GraphQL has iterated over them.
+    """
+    cache = get_request_cache(info)
+    if cache is not None:
+        cache.setdefault("tracked_results", []).append(results)
+    return results
+
+
+def _get_evaluated_items(results) -> Optional[list]:
+    if isinstance(results, (list, tuple)):
+        return list(results)
+    # QuerySet and Wagtail search results respectively
+    for attr in ("_result_cache", "_results_cache"):
+        items = getattr(results, attr, None)
+        if items is not None:
+            return list(items)
+    return None
+
+
+def get_peers(info, instance) -> list:
+    """
+    Return the items of the tracked list ``instance`` was resolved from,
+    or ``[instance]`` if it was not part of one.
+    """
+    cache = get_request_cache(info)
+    if cache is None:
+        return [instance]
+
+    peers_by_id = cache.setdefault("peers", {})
+    if id(instance) not in peers_by_id:
+        pending = []
+        for results in cache.get("tracked_results", []):
+            items = _get_evaluated_items(results)
+            if items is None:
+                pending.append(results)
+                continue
+            for item in items:
+                peers_by_id.setdefault(id(item), items)
+        cache["tracked_results"] = pending
+
+    return peers_by_id.get(id(instance), [instance])
+
+
+def get_stream_block_values(stream_value, block_classes) -> list:
+    """
+    Return the values of all blocks of the given classes nested anywhere in a
+    StreamField value.
+    """
+    values = []
+
+    def collect(block, value):
+        if value is None:
+            return
+        if isinstance(block, block_classes):
+            values.append(value)
+        elif isinstance(block, blocks.StreamBlock):
+            for child in value:
+                collect(child.block, child.value)
+        elif isinstance(block, blocks.ListBlock):
+            for item in value:
+                collect(block.child_block, item)
+        elif isinstance(block, blocks.StructBlock) and isinstance(
+            value, blocks.StructValue
+        ):
+            for name, child_block in block.child_blocks.items():
+                collect(child_block, value.get(name))
+
+    for child in stream_value:
+        collect(child.block, child.value)
+
+    return values
+
+
+# The blocks whose values are loaded in bulk: chooser blocks (ImageBlock values
+# are images rather than StructValues), embed blocks and rich text blocks.
+BATCHED_BLOCK_CLASSES = (
+    blocks.ChooserBlock,
+    ImageBlock,
+    EmbedBlock,
+    blocks.RichTextBlock,
+)
+
+
+def get_stream_embed_values(stream_value) -> list:
+    """
+    Return the values of all embed blocks nested anywhere in a StreamField value.
+    """
+    return get_stream_block_values(stream_value, EmbedBlock)
+
+
+def track_stream_value(info, stream_value):
+    """
+    Track the chooser, embed and rich text block values of a StreamField value,
+    so loaders can batch across all of its blocks.
+    """
+    if get_request_cache(info) is not None:
+        track_results(
+            info, get_stream_block_values(stream_value, BATCHED_BLOCK_CLASSES)
+        )
+    return stream_value
+
+
+class BatchLoader:
+    """
+    Base class for loaders. Subclasses implement ``get_key`` to map an item to
+    the key it needs loaded and ``batch_load`` to load many keys at once.
+
+    Loaders whose results depend on the fields selected on them, e.g. to
+    optimize their QuerySets, set ``per_field`` so that every field of the query
+    gets its own loader.
+    """
+
+    per_field = False
+
+    def __init__(self, info, *args, **kwargs):
+        self.info = info
+        self._results = {}
+
+    @classmethod
+    def for_request(cls, info, *args, **kwargs):
+        """
+        Return the loader for the current request, creating it if needed.
+        Any other arguments are passed to the loader and become part of its
+        cache key, so they must be hashable.
+        """
+        cache = get_request_cache(info)
+        if cache is None:
+            return cls(info, *args, **kwargs)
+
+        loaders = cache.setdefault("loaders", {})
+        key = (cls, args, tuple(sorted(kwargs.items())))
+        if cls.per_field:
+            key += (tuple(map(id, info.field_nodes)),)
+        if key not in loaders:
+            loaders[key] = cls(info, *args, **kwargs)
+        return loaders[key]
+
+    def get_key(self, item) -> Any:
+        """
+        Return the key to load for the given item, or None if the item is not
+        handled by this loader.
+        """
+        raise NotImplementedError
+
+    def batch_load(self, keys: list) -> dict:
+        """
+        Load all the given keys, returning a mapping of key to value.
+        Missing keys resolve to None.
+        """
+        raise NotImplementedError
+
+    def load(self, item):
+        key = self.get_key(item)
+        if key is None:
+            return None
+
+        if key not in self._results:
+            keys = {key}
+            for peer in get_peers(self.info, item):
+                peer_key = self.get_key(peer)
+                if peer_key is not None and peer_key not in self._results:
+                    keys.add(peer_key)
+
+            keys = list(keys)
+            loaded = self.batch_load(keys)
+            for loaded_key in keys:
+                self._results[loaded_key] = loaded.get(loaded_key)
+
+        return self._results[key]
+
+
+class PageParentLoader(BatchLoader):
+    """
+    Load the specific parent page of pages, keyed by the parent's treebeard path.
+    """
+
+    per_field = True
+
+    def get_key(self, page):
+        if not isinstance(page, WagtailPage) or page.depth <= 1:
+            return None
+        return page.path[: -page.steplen]
+
+    def batch_load(self, keys):
+        from .optimizer import optimize_queryset
+
+        qs = WagtailPage.objects.filter(path__in=keys).specific()
+        pages = list(optimize_queryset(qs, self.info))
+        track_results(self.info, pages)
+        return {page.path: page for page in pages}
+
+
+class SpecificPageLoader(BatchLoader):
+    """
+    Load the specific instance of pages, with one query per content type.
+    """
+
+    def get_key(self, page):
+        if not isinstance(page, WagtailPage):
+            return None
+        return (page.content_type_id, page.pk)
+
+    def load(self, page):
+        if isinstance(page, WagtailPage):
+            if "specific" in vars(page):
+                return page.specific
+            if isinstance(page, page.specific_class or WagtailPage):
+                return page
+        return super().load(page)
+
+    def batch_load(self, keys):
+        pks_by_content_type = defaultdict(list)
+        for content_type_id, pk in keys:
+            pks_by_content_type[content_type_id].append(pk)
+
+        pages = {}
+        for content_type_id, pks in pks_by_content_type.items():
+            # Fall back to the generic page if the specific model is missing.
+            model = (
+                ContentType.objects.get_for_id(content_type_id).model_class()
+                or WagtailPage
+            )
+            pages.update(
+                ((content_type_id, page.pk), page)
+                for page in model._default_manager.filter(pk__in=pks)
+            )
+        return pages
+
+
+class ChooserBlockLoader(BatchLoader):
+    """
+    Load the model instances of chooser block values that are still raw primary
+    keys, keyed by the target model and primary key. Items are ``StructBlockItem``
+    objects, and all keys of a model are fetched with one ``in_bulk`` query.
+    """
+
+    def get_key(self, item):
+        block = getattr(item, "block", None)
+        if not isinstance(block, blocks.ChooserBlock) or not isinstance(
+            item.value, int
+        ):
+            return None
+        return (block.model_class, item.value)
+
+    def batch_load(self, keys):
+        pks_by_model = defaultdict(list)
+        for model, pk in keys:
+            pks_by_model[model].append(pk)
+
+        objects = {}
+        for model, pks in pks_by_model.items():
+            objects.update(
+                ((model, pk), obj) for pk, obj in model.objects.in_bulk(pks).items()
+            )
+        prefetch_chooser_relations(self.info, objects.values())
+        return objects
+
+
+class StreamFieldLoader(BatchLoader):
+    """
+    Convert the raw data of a StreamField for all the instances in a list at once.
+
+    Wagtail converts the blocks of each StreamField value on first access, with one
+    query per chooser block type and value. Converting the values of all peers with
+    ``StreamBlock.bulk_to_python`` brings this down to one query per chooser block
+    type for the whole list.
+    """
+
+    def __init__(self, info, field_name):
+        super().__init__(info)
+        self.field_name = field_name
+        self._stream_values = {}
+
+    def get_key(self, instance):
+        value = getattr(instance, "__dict__", {}).get(self.field_name)
+        if not isinstance(value, blocks.StreamValue) or not value.is_lazy:
+            return None
+        # Keep a reference to the value, so its id stays unique for this request.
+        self._stream_values[id(value)] = value
+        return id(value)
+
+    def batch_load(self, keys):
+        # Blocks are not hashable, so group values by block identity.
+        values_by_block = defaultdict(list)
+        for key in keys:
+            value = self._stream_values[key]
+            values_by_block[id(value.stream_block)].append(value)
+
+        block_values = []
+        for stream_values in values_by_block.values():
+            converted_values = stream_values[0].stream_block.bulk_to_python(
+                [list(value.raw_data) for value in stream_values]
+            )
+            for value, converted in zip(stream_values, converted_values):
+                # Unrecognised block types are dropped by both conversions, so
+                # the children line up.
+                if len(converted) == len(value):
+                    for i, child in enumerate(converted):
+                        if value._bound_blocks[i] is None:
+                            value._bound_blocks[i] = child
+                block_values += get_stream_block_values(value, BATCHED_BLOCK_CLASSES)
+
+        # Allow chooser, embed and rich text block fields to batch across all
+        # the converted values.
+        track_results(self.info, block_values)
+        prefetch_chooser_relations(self.info, block_values)
+        return {key: self._stream_values[key] for key in keys}
+
+
+def prefetch_chooser_relations(info, values):
+    """
+    Prefetch the renditions and tags of the images and documents in ``values``
+    when the query selects them. Only the renditions matching the filter specs
+    of the selected rendition fields are prefetched.
+    """
+    from .types.images import get_renditions_prefetch, get_selected_filter_specs
+
+    selected = get_selected_field_names(info)
+    lookups_by_model = defaultdict(list)
+    filter_specs = []
+    if selected & {"rendition", "renditions", "srcSet"}:
+        filter_specs = get_selected_filter_specs(info, iter_selected_fields(info))
+    if "tags" in selected:
+        lookups_by_model[AbstractImage].append("tags")
+        lookups_by_model[AbstractDocument].append("tags")
+    if not lookups_by_model and not filter_specs:
+        return
+
+    # Prefetching works on a single model at a time
+    objects_by_model = defaultdict(list)
+    for value in values:
+        if isinstance(value, (AbstractImage, AbstractDocument)):
+            objects_by_model[type(value)].append(value)
+
+    for model, objects in objects_by_model.items():
+        base = AbstractImage if issubclass(model, AbstractImage) else AbstractDocument
+        lookups = list(lookups_by_model[base])
+        if base is AbstractImage and filter_specs:
+            lookups.append(get_renditions_prefetch(model, filter_specs))
+        if lookups:
+            prefetch_related_objects(objects, *lookups)
+
+
+class EmbedLoader(BatchLoader):
+    """
+    Load the Wagtail embeds of embed block values, keyed by URL, so each URL is
+    only resolved once per request however many fields select it.
+
+    Embeds already in the database are fetched with one query, and the others
+    from their providers concurrently, see ``grapple.embeds.get_embeds``.
+    """
+
+    @staticmethod
+    def get_embed_value(item):
+        # Items are embed values, or stream children and struct block items
+        # holding them.
+        return item if isinstance(item, EmbedValue) else getattr(item, "value", None)
+
+    def get_key(self, item):
+        value = self.get_embed_value(item)
+        if not isinstance(value, EmbedValue) or not value.url:
+            return None
+        return value.url
+
+    def load(self, item):
+        # Embed values are the items tracked for the StreamField, so look up
+        # their peers rather than those of the holder.
+        return super().load(self.get_embed_value(item))
+
+    def batch_load(self, keys):
+        from .embeds import get_embeds
+
+        return get_embeds(keys)
+
+
+class RichTextLoader(BatchLoader):
+    """
+    Render rich text in an output format, keyed by source. Items are rich text
+    values, or model instances when a ``field_name`` is given.
+
+    Wagtail expands the links and embeds of each rich text separately, with one
+    query per link or embed type. The links and embeds of all the rich text in a
+    batch are expanded together instead, so each type is loaded with one query.
+    """
+
+    def __init__(self, info, field_name=None, output_format="html"):
+        super().__init__(info)
+        self.field_name = field_name
+        self.output_format = output_format
+
+    def get_key(self, item):
+        value = item
+        if self.field_name is not None:
+            value = getattr(item, "__dict__", {}).get(self.field_name)
+        if isinstance(value, RichText):
+            value = value.source
+        if not isinstance(value, str):
+            return None
+        return value
+
+    def batch_load(self, keys):
+        from .types.rich_text import format_rich_text_many
+
+        return dict(zip(keys, format_rich_text_many(keys, self.output_format)))
+
+
+class PageAncestorsLoader(BatchLoader):
+    """
+    Load the live, public, specific ancestors of pages, keyed by the page path.
+    All ancestors for the batch are fetched with one query per content type.
+    """
+
+    per_field = True
+
+    def get_key(self, page):
+        if not isinstance(page, WagtailPage):
+            return None
+        return page.path
+
+    @staticmethod
+    def get_ancestor_paths(path: str) -> list[str]:
+        steplen = WagtailPage.steplen
+        return [path[:end] for end in range(steplen, len(path), steplen)]
+
+    def batch_load(self, keys):
+        ancestor_paths_by_path = {key: self.get_ancestor_paths(key) for key in keys}
+        all_paths = {
+            path for paths in ancestor_paths_by_path.values() for path in paths
+        }
+
+        pages_by_path = {}
+        if all_paths:
+            from .optimizer import optimize_queryset
+
+            qs = WagtailPage.objects.filter(path__in=all_paths).live().public()
+            pages = list(optimize_queryset(qs.specific(), self.info))
+            track_results(self.info, pages)
+            pages_by_path = {page.path: page for page in pages}
+
+        return {
+            key: [pages_by_path[path] for path in paths if path in pages_by_path]
+            for key, paths in ancestor_paths_by_path.items()
+        }
+
+
+class PageRelativesLoader(BatchLoader):
+    """
+    Load the live, public, specific children, siblings or descendants of pages,
+    keyed by the page path, applying the ``QuerySetList`` arguments for each page.
+
+    Rows are numbered per parent page with a ``ROW_NUMBER()`` window, so the limit
+    and offset of every page in the batch are applied by a single query.
+    """
+
+    per_field = True
+
+    RELATIONS = (
+        "children",
+        "siblings",
+        "next_siblings",
+        "previous_siblings",
+        "descendants",
+    )
+
+    def __init__(
+        self,
+        info,
+        relation,
+        *,
+        limit=None,
+        offset=None,
+        order=None,
+        id=None,
+        in_menu=None,
+        **kwargs,
+    ):
+        super().__init__(info)
+        if relation not in self.RELATIONS:
+            raise ValueError(f"Unknown page relation '{relation}'")
+
+        self.relation = relation
+        self.offset = int(offset or 0)
+        self.limit = min(
+            int(limit or grapple_settings.PAGE_SIZE), grapple_settings.MAX_PAGE_SIZE
+        )
+        order_fields = [x.strip() for x in order.split(",")] if order else []
+        # Tree order breaks ties, as it is the default order of page querysets.
+        # Previous siblings are nearest first by default, like get_prev_siblings().
+        if relation == "previous_siblings" and not order_fields:
+            self.order_by = ["-path"]
+        else:
+            self.order_by = [*order_fields, "path"]
+        self.id = id
+        self.in_menu = in_menu
+
+    def get_key(self, page):
+        if not isinstance(page, WagtailPage):
+            return None
+        return page.path
+
+    def get_queryset(self, filters):
+        qs = WagtailPage.objects.filter(filters).live().public()
+        if self.id is not None:
+            qs = qs.filter(pk=self.id)
+        if self.in_menu is not None:
+            qs = qs.in_menu() if self.in_menu else qs.not_in_menu()
+        return qs
+
+    def get_pages(self, qs) -> list:
+        from .optimizer import optimize_queryset
+
+        return list(
+            optimize_queryset(qs.order_by(*self.order_by).specific(), self.info)
+        )
+
+    def get_windowed_pages(self, filters, partition_by, first, last):
+        """
+        Return the pages matching ``filters``, numbered from 1 within each
+        ``partition_by`` group and limited to rows ``first`` to ``last``.
+        """
+        qs = (
+            self.get_queryset(filters)
+            .annotate(
+                grapple_row_number=Window(
+                    RowNumber(), partition_by=[partition_by], order_by=self.order_by
+                )
+            )
+            .filter(grapple_row_number__gte=first, grapple_row_number__lte=last)
+        )
+        return self.get_pages(qs)
+
+    def group_by_prefix(self, pages, length) -> dict[str, list]:
+        groups = defaultdict(list)
+        for page in pages:
+            groups[page.path[:length]].append(page)
+        return groups
+
+    def batch_load(self, keys):
+        steplen = WagtailPage.steplen
+        # The treebeard path of the parent of each row
+        parent_path = Substr("path", 1, (F("depth") - 1) * steplen)
+        start, end = self.offset, self.offset + self.limit
+
+        if self.relation == "children":
+            filters = Q()
+            for key in keys:
+                filters |= Q(path__startswith=key, depth=len(key) // steplen + 1)
+
+            pages = self.get_windowed_pages(filters, parent_path, start + 1, end)
+            groups = self.group_by_prefix(pages, -steplen)
+            results = {key: groups.get(key, []) for key in keys}
+
+        elif self.relation == "descendants":
+            # Subtrees of pages at the same depth never overlap, so each depth
+            # can be partitioned by the path prefix of that depth.
+            keys_by_depth = defaultdict(list)
+            for key in keys:
+                keys_by_depth[len(key)].append(key)
+
+            pages, results = [], {}
+            for length, depth_keys in keys_by_depth.items():
+                filters = Q()
+                for key in depth_keys:
+                    filters |= Q(path__startswith=key, depth__gt=length // steplen)
+
+                depth_pages = self.get_windowed_pages(
+                    filters, Substr("path", 1, length), start + 1, end
+                )
+                groups = self.group_by_prefix(depth_pages, length)
+                results.update((key, groups.get(key, [])) for key in depth_keys)
+                pages += depth_pages
+
+        else:
+            filters = Q()
+            for parent in {key[:-steplen] for key in keys}:
+                filters |= Q(path__startswith=parent, depth=len(parent) // steplen + 1)
+
+            if self.relation == "siblings":
+                # Each page is excluded from its own siblings, so fetch one
+                # extra row to make up for it.
+                pages = self.get_windowed_pages(filters, parent_path, 1, end + 1)
+            else:
+                # Next and previous siblings depend on the position of each
+                # page, so all siblings are fetched.
+                pages = self.get_pages(self.get_queryset(filters))
+
+            groups = self.group_by_prefix(pages, -steplen)
+            results = {}
+            for key in keys:
+                siblings = groups.get(key[:-steplen], [])
+                if self.relation == "next_siblings":
+                    siblings = [page for page in siblings if page.path > key]
+                elif self.relation == "previous_siblings":
+                    siblings = [page for page in siblings if page.path < key]
+                else:
+                    siblings = [page for page in siblings if page.path != key]
+                results[key] = siblings[start:end]
+
+        # Allow nested fields to batch across the pages loaded for all parents.
+        track_results(self.info, pages)
+        return results
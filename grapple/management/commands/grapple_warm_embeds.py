@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from wagtail.fields import StreamField
+
+from grapple.embeds import get_instance_embed_urls, warm_embeds
+from grapple.registry import registry
+
+
+class Command(BaseCommand):
+    help = (
+        "Fetch and store the embeds of the embed blocks in the StreamFields of the "
+        "live pages of the registered page models, so the API does not fetch them."
+    )
+
+    def handle(self, *args, **options):
+        urls = set()
+        for model in registry.pages:
+            if not hasattr(model, "_meta"):
+                continue
+
+            field_names = [
+                field.attname
+                for field in model._meta.concrete_fields
+                if isinstance(field, StreamField)
+            ]
+            if not field_names:
+                continue
+
+            # Only the StreamFields of each page are needed.
+            pages = model._default_manager.live().exact_type(model).only(*field_names)
+            for page in pages.iterator():
+                urls |= get_instance_embed_urls(page)
+
+        embedded, failed = warm_embeds(urls)
+        self.stdout.write(f"Embedded {embedded} URLs, {failed} could not be embedded.")
@@ -15,6 +15,8 @@ class GraphQLField:
     field_source: Optional[str]
     description: Optional[str]
     deprecation_reason: Optional[str]
+    depends_on: Optional[tuple[str, ...]]
+    arguments: dict
 
     def __init__(
         self,
@@ -30,6 +32,11 @@ class GraphQLField:
         self.field_source = kwargs.get("source", field_name)
         self.description = kwargs.get("description")
         self.deprecation_reason = kwargs.get("deprecation_reason")
+        # The model fields the resolver of a custom source needs loaded
+        depends_on = kwargs.get("depends_on")
+        self.depends_on = tuple(depends_on) if depends_on is not None else None
+        # The GraphQL arguments of the field, passed to its resolver
+        self.arguments = {}
 
         # Add support for NonNull/required fields
         if required:
@@ -124,9 +131,11 @@ def GraphQLStreamfield(field_name: str, **kwargs):
 
 def GraphQLRichText(field_name: str, **kwargs):
     def Mixin():
-        from .types.rich_text import RichText
+        from .types.rich_text import RichText, get_rich_text_format_argument
 
-        return GraphQLField(field_name, RichText, **kwargs)
+        field = GraphQLField(field_name, RichText, **kwargs)
+        field.arguments["format"] = get_rich_text_format_argument()
+        return field
 
     return Mixin
 
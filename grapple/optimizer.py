@@ -0,0 +1,471 @@
+"""
+Selection set aware QuerySet optimization.
+
+List fields are resolved from a single QuerySet, but the related objects returned
+by the fields of each item (foreign keys, reverse relations, tags, image renditions...) are loaded
+one item at a time. The optimizer walks the fields selected by the query and adds
+the matching ``select_related()`` and ``prefetch_related()`` lookups to the
+QuerySet before it is evaluated. Columns of models other than pages that none of
+the selected fields need are left out with ``only()``, and so are the StreamFields
+of pages.
+
+Fields selected on a more specific type than the one of the QuerySet, such as
+``... on BlogPage`` in a list of pages, cannot be added to the QuerySet as they
+do not exist on every item. Those are prefetched for all items of that type once
+the first of them is resolved instead.
+"""
+
+from functools import lru_cache
+from typing import Optional
+
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Manager, Prefetch, QuerySet, prefetch_related_objects
+from graphene.utils.str_converters import to_camel_case, to_snake_case
+from graphene_django import DjangoObjectType
+from graphql import get_named_type, get_nullable_type, is_list_type
+from taggit.managers import TaggableManager
+from wagtail.fields import StreamField
+from wagtail.images.models import AbstractImage
+from wagtail.models import Page as WagtailPage
+from wagtail.query import SpecificIterable
+
+from .loaders import BatchLoader, get_request_cache
+from .selection import iter_field_nodes
+
+
+# Arguments of list fields that can be applied to prefetched results
+PREFETCH_ARGUMENTS = frozenset({"limit", "offset"})
+
+
+class QuerySetLookups:
+    """
+    The ``select_related()`` and ``prefetch_related()`` lookups of a QuerySet.
+    """
+
+    def __init__(self):
+        self.select_related = {}
+        self.prefetch_related = {}
+
+    def __bool__(self):
+        return bool(self.select_related or self.prefetch_related)
+
+    def add_select_related(self, path: str):
+        self.select_related[path] = path
+
+    def add_prefetch_related(self, path: str, lookup=None):
+        # The first lookup wins, as Django rejects the same lookup with two querysets
+        self.prefetch_related.setdefault(path, lookup or path)
+
+    def apply(self, qs: QuerySet) -> QuerySet:
+        # Specific querysets load their items with one query per model, so the
+        # lookups must be passed on to those queries.
+        kwargs = {}
+        if getattr(qs, "_iterable_class", None) is SpecificIterable:
+            kwargs["for_specific_subqueries"] = True
+
+        if self.select_related:
+            qs = qs.select_related(*self.select_related, **kwargs)
+        if self.prefetch_related:
+            qs = qs.prefetch_related(*self.prefetch_related.values(), **kwargs)
+        return qs
+
+    def prefetch(self, instances: list):
+        """
+        Load the related objects of already evaluated instances.
+        """
+        prefetch_related_objects(
+            instances, *self.select_related, *self.prefetch_related.values()
+        )
+
+
+@lru_cache(maxsize=None)  # noqa: UP033
+def get_graphql_fields(model) -> dict:
+    """
+    Map the GraphQL field names of the ``graphql_fields`` of a model to their
+    ``GraphQLField``.
+    """
+    fields = {}
+    for field in getattr(model, "graphql_fields", ()):
+        if callable(field):
+            field = field()
+        # Collections return the nested field along with its wrapper
+        if isinstance(field, tuple):
+            field = field[0]
+            if callable(field):
+                field = field()
+        fields[to_camel_case(field.field_name)] = field
+    return fields
+
+
+def get_field_source(model, name: str) -> tuple[str, ...]:
+    """
+    Return the path of model attributes read by a GraphQL field, including the
+    keys of nested field extraction.
+    """
+    field = get_graphql_fields(model).get(name)
+    if field is None:
+        return (to_snake_case(name),)
+    return (field.field_source, *(field.extract_key or ()))
+
+
+def get_type_model(graphql_type):
+    """
+    Return the Django model of a GraphQL object type, or None for interfaces and
+    types not backed by a model.
+    """
+    graphene_type = getattr(graphql_type, "graphene_type", None)
+    return getattr(getattr(graphene_type, "_meta", None), "model", None)
+
+
+def is_to_many(field) -> bool:
+    return field.one_to_many or field.many_to_many
+
+
+def collect_lookups(
+    info,
+    model,
+    graphql_type,
+    selection_sets,
+    lookups: QuerySetLookups,
+    *,
+    prefix: str = "",
+    model_lookups: Optional[dict] = None,
+):
+    """
+    Add the lookups needed by the fields of ``selection_sets`` on ``model`` to
+    ``lookups``. If ``model_lookups`` is given, the lookups of fields selected on
+    subclasses of ``model`` are added to it, keyed by the subclass.
+    """
+    if issubclass(model, AbstractImage):
+        add_rendition_lookups(info, model, selection_sets, lookups, prefix)
+
+    for selection_set in selection_sets:
+        for type_condition, node in iter_field_nodes(selection_set, info.fragments):
+            node_type = (
+                info.schema.get_type(type_condition) if type_condition else graphql_type
+            )
+            node_model = get_type_model(node_type) or model
+            if issubclass(model, node_model):
+                add_field_lookups(info, model, node_type, node, lookups, prefix)
+            elif issubclass(node_model, model) and model_lookups is not None:
+                add_field_lookups(
+                    info,
+                    node_model,
+                    node_type,
+                    node,
+                    model_lookups.setdefault(node_model, QuerySetLookups()),
+                    "",
+                )
+
+
+def add_rendition_lookups(info, model, selection_sets, lookups, prefix):
+    """
+    Prefetch the renditions of images matching the filter specs of the
+    ``rendition``, ``renditions`` and ``srcSet`` fields selected on them.
+    """
+    from .types.images import get_renditions_prefetch, get_selected_filter_specs
+
+    filter_specs = get_selected_filter_specs(
+        info,
+        (
+            node
+            for selection_set in selection_sets
+            for _type_condition, node in iter_field_nodes(selection_set, info.fragments)
+        ),
+    )
+    if filter_specs:
+        lookup_path = f"{prefix}renditions"
+        lookups.add_prefetch_related(
+            lookup_path, get_renditions_prefetch(model, filter_specs, lookup_path)
+        )
+
+
+def add_field_lookups(info, model, graphql_type, node, lookups, prefix):
+    name = node.name.value
+    graphql_field = getattr(graphql_type, "fields", {}).get(name)
+    if graphql_field is None:
+        return
+
+    source = get_field_source(model, name)
+
+    # Follow the relations of the source, e.g. "authors.person.name"
+    path, related_model, field, to_many = [], model, None, False
+    for attr in source:
+        try:
+            field = related_model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            break
+        if not field.is_relation:
+            break
+        path.append(attr)
+        to_many = to_many or is_to_many(field)
+        related_model = field.related_model
+        if related_model is None:
+            # Generic foreign keys can only be prefetched
+            to_many = True
+            break
+
+    if not path:
+        return
+
+    lookup_path = prefix + "__".join(path)
+    if len(path) > 1 or related_model is None or isinstance(field, TaggableManager):
+        if to_many:
+            lookups.add_prefetch_related(lookup_path)
+        else:
+            lookups.add_select_related(lookup_path)
+        return
+
+    sub_type = get_named_type(graphql_field.type)
+    if not to_many:
+        lookups.add_select_related(lookup_path)
+        if node.selection_set:
+            collect_lookups(
+                info,
+                related_model,
+                sub_type,
+                [node.selection_set],
+                lookups,
+                prefix=f"{lookup_path}__",
+            )
+        return
+
+    # Prefetched results can only be used by list fields that do not filter them.
+    arguments = {argument.name.value for argument in node.arguments}
+    if not is_list_type(get_nullable_type(graphql_field.type)) or (
+        arguments - PREFETCH_ARGUMENTS
+    ):
+        return
+
+    nested_lookups = QuerySetLookups()
+    if node.selection_set:
+        collect_lookups(
+            info, related_model, sub_type, [node.selection_set], nested_lookups
+        )
+    if nested_lookups:
+        queryset = nested_lookups.apply(related_model._default_manager.all())
+        lookups.add_prefetch_related(lookup_path, Prefetch(lookup_path, queryset))
+    else:
+        lookups.add_prefetch_related(lookup_path)
+
+
+def get_declared_dependencies(graphql_type, name: str):
+    """
+    Return the model fields declared as needed by a field of a Grapple type or
+    interface in its ``field_dependencies``, None if it needs the whole instance
+    or ``NotImplemented`` if nothing is declared.
+    """
+    graphene_type = getattr(graphql_type, "graphene_type", None)
+    meta = getattr(graphene_type, "_meta", None)
+    for klass in (graphene_type, *getattr(meta, "interfaces", ())):
+        dependencies = getattr(klass, "field_dependencies", {})
+        if name in dependencies:
+            return dependencies[name]
+        # A custom resolver that did not declare what it uses. The resolvers of
+        # DjangoObjectType (e.g. for the id) only read model fields.
+        resolver = f"resolve_{name}"
+        if hasattr(klass, resolver) and not hasattr(DjangoObjectType, resolver):
+            return None
+    return NotImplemented
+
+
+def get_field_dependencies(model, graphql_type, name: str) -> Optional[tuple]:
+    """
+    Return the names of the model fields to load for a GraphQL field, or None if
+    they cannot be known.
+    """
+    if name == "__typename":
+        return ()
+
+    graphql_field = get_graphql_fields(model).get(name)
+    if graphql_field is not None:
+        if graphql_field.depends_on is not None:
+            return graphql_field.depends_on
+        attr = graphql_field.field_source
+    else:
+        attr = to_snake_case(name)
+        dependencies = get_declared_dependencies(graphql_type, attr)
+        if dependencies is not NotImplemented:
+            return dependencies
+
+    try:
+        field = model._meta.get_field(attr)
+    except FieldDoesNotExist:
+        # A method or property
+        return None
+
+    if is_to_many(field):
+        # Loaded by a separate query
+        return ()
+    if isinstance(field, GenericForeignKey):
+        return (field.ct_field, field.fk_field)
+    if field.concrete:
+        return (field.name,)
+    if field.one_to_one:
+        return ()
+    return None
+
+
+def collect_only_fields(
+    info, model, graphql_type, selection_sets, lookups: QuerySetLookups
+) -> Optional[set[str]]:
+    """
+    Return the names of the model fields needed by the fields of
+    ``selection_sets``, or None if all of them should be loaded.
+    """
+    only_fields = {model._meta.pk.name}
+    for selection_set in selection_sets:
+        for type_condition, node in iter_field_nodes(selection_set, info.fragments):
+            node_type = (
+                info.schema.get_type(type_condition) if type_condition else graphql_type
+            )
+            if not issubclass(model, get_type_model(node_type) or model):
+                continue
+            dependencies = get_field_dependencies(model, node_type, node.name.value)
+            if dependencies is None:
+                return None
+            only_fields.update(dependencies)
+
+    # Foreign keys traversed by select_related() cannot be deferred
+    only_fields.update(path.split("__")[0] for path in lookups.select_related)
+    return only_fields
+
+
+def selects_stream_fields(info, model, graphql_type, selection_sets) -> bool:
+    """
+    Return whether any of the fields of ``selection_sets`` may read a StreamField
+    of ``model`` or, for fields selected on them, its subclasses.
+    """
+    for selection_set in selection_sets:
+        for type_condition, node in iter_field_nodes(selection_set, info.fragments):
+            node_type = (
+                info.schema.get_type(type_condition) if type_condition else graphql_type
+            )
+            node_model = get_type_model(node_type) or model
+            if not issubclass(model, node_model) and not issubclass(node_model, model):
+                continue
+
+            name = node.name.value
+            graphql_field = get_graphql_fields(node_model).get(name)
+            if graphql_field is None:
+                attrs = (to_snake_case(name),)
+            elif graphql_field.depends_on is not None:
+                attrs = graphql_field.depends_on
+            else:
+                attrs = (graphql_field.field_source,)
+
+            for attr in attrs:
+                try:
+                    field = node_model._meta.get_field(attr)
+                except FieldDoesNotExist:
+                    # Methods and properties of graphql_fields may read anything
+                    if graphql_field is not None:
+                        return True
+                    continue
+                if isinstance(field, StreamField):
+                    return True
+    return False
+
+
+def get_list_selection_sets(info, items_field: Optional[str] = None):
+    """
+    Return the GraphQL type of the items of the list being resolved and the
+    selection sets applied to them. ``items_field`` is the name of the field
+    holding the items, for types wrapping the list (e.g. paginated results).
+    """
+    graphql_type = get_named_type(info.return_type)
+    selection_sets = [node.selection_set for node in info.field_nodes]
+    if items_field is None:
+        return graphql_type, selection_sets
+
+    items_type = get_named_type(graphql_type.fields[items_field].type)
+    return items_type, [
+        node.selection_set
+        for selection_set in selection_sets
+        for _type_condition, node in iter_field_nodes(selection_set, info.fragments)
+        if node.name.value == items_field
+    ]
+
+
+def defer_unselected_fields(qs, info, graphql_type, selection_sets, lookups):
+    if issubclass(qs.model, WagtailPage):
+        # Pages need most of their fields for URLs, permissions and previews, but
+        # their StreamFields are often large and only needed when selected.
+        if hasattr(qs, "defer_streamfields") and not selects_stream_fields(
+            info, qs.model, graphql_type, selection_sets
+        ):
+            qs = qs.defer_streamfields()
+        return qs
+
+    only_fields = collect_only_fields(
+        info, qs.model, graphql_type, selection_sets, lookups
+    )
+    return qs if only_fields is None else qs.only(*only_fields)
+
+
+def optimize_queryset(qs, info, *, items_field: Optional[str] = None):
+    """
+    Add the ``select_related()`` and ``prefetch_related()`` lookups needed by the
+    fields selected on the items of ``qs``.
+    """
+    if isinstance(qs, Manager):
+        qs = qs.all()
+    # Leave prefetched and already evaluated results alone.
+    if not isinstance(qs, QuerySet) or qs._result_cache is not None:
+        return qs
+
+    graphql_type, selection_sets = get_list_selection_sets(info, items_field)
+    lookups, model_lookups = QuerySetLookups(), {}
+    collect_lookups(
+        info,
+        qs.model,
+        graphql_type,
+        selection_sets,
+        lookups,
+        model_lookups=model_lookups,
+    )
+
+    cache = get_request_cache(info)
+    if model_lookups and cache is not None:
+        for model, subclass_lookups in model_lookups.items():
+            cache.setdefault("model_lookups", {}).setdefault(model, subclass_lookups)
+
+    # Leave explicitly deferred or restricted columns as they are.
+    if not qs.query.deferred_loading[0]:
+        qs = defer_unselected_fields(qs, info, graphql_type, selection_sets, lookups)
+
+    return lookups.apply(qs)
+
+
+class ModelLookupsLoader(BatchLoader):
+    """
+    Prefetch the related objects of the fields selected on a specific model, for
+    all the items of that model in the list an instance was resolved from.
+    """
+
+    def __init__(self, info, model):
+        super().__init__(info)
+        self.model = model
+        self._instances = {}
+
+    def get_key(self, instance):
+        if type(instance) is not self.model:
+            return None
+        self._instances[id(instance)] = instance
+        return id(instance)
+
+    def batch_load(self, keys):
+        lookups = get_request_cache(self.info)["model_lookups"][self.model]
+        lookups.prefetch([self._instances[key] for key in keys])
+        return dict.fromkeys(keys, True)
+
+
+def prefetch_model_lookups(info, instance):
+    """
+    Prefetch the related objects selected on the specific model of ``instance``
+    registered by ``optimize_queryset``, if any.
+    """
+    cache = get_request_cache(info)
+    if cache and type(instance) in cache.get("model_lookups", {}):
+        ModelLookupsLoader.for_request(info, type(instance)).load(instance)
@@ -0,0 +1,147 @@
+"""
+Caching of rendered rich text. Rendered values are kept in a per-process LRU
+cache of ``RICHTEXT_CACHE_SIZE`` entries and, when the ``RICHTEXT_CACHE``
+setting is set, in that Django cache too, keyed by a hash of the source, the
+output format, the active language and a generation token. The generation is
+replaced whenever the links rendered from sources may change, e.g. when the URL
+of a page changes, which expires all the cached values.
+"""
+
+import hashlib
+import threading
+
+from collections import OrderedDict
+from typing import Callable
+from uuid import uuid4
+
+from django.core.cache import caches
+from django.utils.translation import get_language
+
+from .settings import grapple_settings
+
+
+RICHTEXT_GENERATION_CACHE_KEY = "grapple:richtext:generation"
+
+
+def get_rich_text_cache():
+    """
+    Returns the Django cache rendered rich text is stored in, or None if disabled.
+    """
+
+    alias = grapple_settings.RICHTEXT_CACHE
+    return caches[alias] if alias else None
+
+
+class RichTextCache:
+    """
+    A thread-safe LRU cache of rendered rich text, in front of the optional
+    ``RICHTEXT_CACHE`` Django cache.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._generation = uuid4().hex
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_generation(self) -> str:
+        cache = get_rich_text_cache()
+        if cache is None:
+            return self._generation
+
+        generation = cache.get(RICHTEXT_GENERATION_CACHE_KEY)
+        if generation is None:
+            generation = uuid4().hex
+            if not cache.add(RICHTEXT_GENERATION_CACHE_KEY, generation, timeout=None):
+                generation = cache.get(RICHTEXT_GENERATION_CACHE_KEY, generation)
+        return generation
+
+    def bump_generation(self):
+        with self._lock:
+            self._generation = uuid4().hex
+            self._entries.clear()
+
+        cache = get_rich_text_cache()
+        if cache is not None:
+            cache.set(RICHTEXT_GENERATION_CACHE_KEY, uuid4().hex, timeout=None)
+
+    @staticmethod
+    def get_key(source: str, output_format: str, generation: str) -> str:
+        signature = "\n".join([generation, output_format, get_language() or "", source])
+        digest = hashlib.md5(signature.encode(), usedforsecurity=False).hexdigest()
+        return f"grapple:richtext:{digest}"
+
+    def get_many(
+        self,
+        sources: list[str],
+        output_format: str,
+        render_many: Callable[[list], list],
+    ) -> list:
+        """
+        Return the rendered values of ``sources`` in ``output_format``, calling
+        ``render_many`` with the sources that are not cached yet.
+        """
+        maxsize = grapple_settings.RICHTEXT_CACHE_SIZE
+        cache = get_rich_text_cache()
+        if not maxsize and cache is None:
+            return render_many(sources)
+
+        generation = self.get_generation()
+        keys = {
+            source: self.get_key(source, output_format, generation)
+            for source in sources
+        }
+        values = {}
+        with self._lock:
+            for source, key in keys.items():
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    values[source] = self._entries[key]
+
+        missing = [source for source in keys if source not in values]
+        if missing and cache is not None:
+            cached = cache.get_many([keys[source] for source in missing])
+            for source in missing:
+                if keys[source] in cached:
+                    values[source] = cached[keys[source]]
+            self._store(
+                {
+                    keys[source]: values[source]
+                    for source in missing
+                    if source in values
+                },
+                maxsize,
+            )
+            missing = [source for source in missing if source not in values]
+
+        if missing:
+            rendered = dict(zip(missing, render_many(missing)))
+            values.update(rendered)
+            entries = {keys[source]: value for source, value in rendered.items()}
+            if cache is not None:
+                cache.set_many(entries, timeout=grapple_settings.RICHTEXT_CACHE_TIMEOUT)
+            self._store(entries, maxsize)
+
+        return [values[source] for source in sources]
+
+    def _store(self, entries: dict, maxsize: int):
+        if not maxsize or not entries:
+            return
+        with self._lock:
+            self._entries.update(entries)
+            for key in entries:
+                self._entries.move_to_end(key)
+            while len(self._entries) > maxsize:
+                self._entries.popitem(last=False)
+
+
+rich_text_cache = RichTextCache()
+
+
+def bump_rich_text_generation():
+    """
+    Expire all the cached rich text, in every process sharing ``RICHTEXT_CACHE``.
+    """
+    rich_text_cache.bump_generation()
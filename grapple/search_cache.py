@@ -0,0 +1,158 @@
+"""
+Caching of search results, used when the ``SEARCH_CACHE`` setting is set. The
+ids and scores of the results are cached rather than the objects, which are
+loaded from the database with a single query when the cached results are used.
+"""
+
+import hashlib
+
+from typing import Optional
+from uuid import uuid4
+
+from django.core.cache import caches
+from django.core.exceptions import EmptyResultSet
+from wagtail.search.utils import normalise_query_string
+
+from .settings import grapple_settings
+
+
+SEARCH_GENERATION_CACHE_KEY = "grapple:search:generation"
+
+
+def get_search_cache():
+    """
+    Returns the cache the search results are stored in, or None if disabled.
+    """
+
+    alias = grapple_settings.SEARCH_CACHE
+    return caches[alias] if alias else None
+
+
+def get_search_generation(cache) -> str:
+    """
+    Returns the current generation of the search index, which is part of the
+    keys of the cached search results so that updating the index expires them.
+    """
+
+    generation = cache.get(SEARCH_GENERATION_CACHE_KEY)
+    if generation is None:
+        generation = uuid4().hex
+        if not cache.add(SEARCH_GENERATION_CACHE_KEY, generation, timeout=None):
+            generation = cache.get(SEARCH_GENERATION_CACHE_KEY, generation)
+    return generation
+
+
+def bump_search_generation():
+    """
+    Expire all the cached search results, e.g. when the search index changes.
+    """
+
+    cache = get_search_cache()
+    if cache is not None:
+        cache.set(SEARCH_GENERATION_CACHE_KEY, uuid4().hex, timeout=None)
+
+
+def get_search_cache_key(
+    qs, search_query: str, search_operator: str, *, order_by_relevance: bool
+) -> Optional[str]:
+    """
+    The key identifying the results of a search on a query set, from the model,
+    filters and ordering of the query set, the normalised query and the search
+    options. Returns None for query sets that cannot match anything.
+    """
+
+    try:
+        sql = str(qs.query)
+    except EmptyResultSet:
+        return None
+
+    signature = "\n".join(
+        [
+            qs.model._meta.label,
+            sql,
+            normalise_query_string(search_query),
+            str(search_operator),
+            str(order_by_relevance),
+        ]
+    )
+    return hashlib.md5(signature.encode(), usedforsecurity=False).hexdigest()
+
+
+class CachedSearchResults:
+    """
+    Wraps the search results of a query set, caching the ids and scores of each
+    slice of the results, and their count, until the search index changes or
+    ``SEARCH_CACHE_TIMEOUT`` seconds pass.
+    """
+
+    def __init__(self, qs, results, cache, key: str):
+        self.qs = qs
+        self.results = results
+        self.cache = cache
+        self.key = f"grapple:search:{get_search_generation(cache)}:{key}"
+
+    def count(self) -> int:
+        key = f"{self.key}:count"
+        count = self.cache.get(key)
+        if count is None:
+            count = self.results.count()
+            self.cache.set(key, count, timeout=grapple_settings.SEARCH_CACHE_TIMEOUT)
+        return count
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def __iter__(self):
+        return iter(self[0 : self.count()])
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key : key + 1][0]
+
+        start = int(key.start or 0)
+        stop = self.count() if key.stop is None else int(key.stop)
+        if stop <= start:
+            return []
+
+        cache_key = f"{self.key}:{start}:{stop}"
+        hits = self.cache.get(cache_key)
+        if hits is None:
+            objects = list(self.results[start:stop])
+            self.cache.set(
+                cache_key,
+                [(obj.pk, getattr(obj, "search_score", None)) for obj in objects],
+                timeout=grapple_settings.SEARCH_CACHE_TIMEOUT,
+            )
+            return objects
+
+        objects_by_pk = self.qs.in_bulk([pk for pk, _score in hits])
+        objects = []
+        for pk, score in hits:
+            obj = objects_by_pk.get(pk)
+            if obj is None:
+                # Deleted since the results were cached.
+                continue
+            if score is not None:
+                obj.search_score = score
+            objects.append(obj)
+        return objects
+
+
+def cache_search_results(
+    qs, results, search_query: str, search_operator: str, *, order_by_relevance: bool
+):
+    """
+    Returns the search results of a query set, cached if the ``SEARCH_CACHE``
+    setting is set.
+    """
+
+    cache = get_search_cache()
+    if cache is None:
+        return results
+
+    key = get_search_cache_key(
+        qs, search_query, search_operator, order_by_relevance=order_by_relevance
+    )
+    if key is None:
+        return results
+    return CachedSearchResults(qs, results, cache, key)
@@ -0,0 +1,129 @@
+"""
+Buffered recording of search hits, used when the ``SEARCH_HIT_FLUSH_INTERVAL``
+setting is set. Hits are counted in memory, per process, and written to the
+database in batches by a background thread, rather than one by one while
+handling each request.
+"""
+
+import atexit
+import datetime
+import logging
+import threading
+
+from collections import Counter
+
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from wagtail.search.utils import normalise_query_string
+
+from .settings import grapple_settings
+
+
+logger = logging.getLogger("grapple")
+
+
+def record_search_hits(hits: dict[tuple[str, datetime.date], int]):
+    """
+    Add a number of hits to the daily hits of `(query_string, date)` pairs, with
+    a few queries for the whole batch rather than a few per hit. Query strings
+    must already be normalised.
+    """
+    from wagtail.contrib.search_promotions.models import Query, QueryDailyHits
+
+    if not hits:
+        return
+
+    query_strings = {query_string for query_string, _date in hits}
+    with transaction.atomic():
+        Query.objects.bulk_create(
+            [Query(query_string=query_string) for query_string in query_strings],
+            ignore_conflicts=True,
+        )
+        query_ids = dict(
+            Query.objects.filter(query_string__in=query_strings).values_list(
+                "query_string", "pk"
+            )
+        )
+
+        # Create the missing daily hits with no hits, then increment them all,
+        # so that concurrent flushes from other processes are not lost.
+        QueryDailyHits.objects.bulk_create(
+            [
+                QueryDailyHits(query_id=query_ids[query_string], date=date, hits=0)
+                for query_string, date in hits
+            ],
+            ignore_conflicts=True,
+        )
+        for (query_string, date), count in hits.items():
+            QueryDailyHits.objects.filter(
+                query_id=query_ids[query_string], date=date
+            ).update(hits=F("hits") + count)
+
+
+class SearchHitBuffer:
+    """
+    Counts search hits in memory and flushes them to the database every
+    ``SEARCH_HIT_FLUSH_INTERVAL`` seconds, or as soon as
+    ``SEARCH_HIT_FLUSH_THRESHOLD`` hits are pending, from a background thread.
+    Pending hits are also flushed when the process exits.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hits = Counter()
+        self._flush_requested = threading.Event()
+        self._thread = None
+
+    def __len__(self) -> int:
+        return sum(self._hits.values())
+
+    @property
+    def flush_requested(self) -> bool:
+        return self._flush_requested.is_set()
+
+    def add(self, search_query: str):
+        key = (normalise_query_string(search_query), timezone.now().date())
+        with self._lock:
+            self._hits[key] += 1
+            threshold_reached = len(self) >= grapple_settings.SEARCH_HIT_FLUSH_THRESHOLD
+            self._start()
+
+        if threshold_reached:
+            self._flush_requested.set()
+
+    def flush(self) -> int:
+        """
+        Write the pending hits to the database, returning how many there were.
+        """
+        with self._lock:
+            hits, self._hits = self._hits, Counter()
+            self._flush_requested.clear()
+
+        record_search_hits(hits)
+        return sum(hits.values())
+
+    def _start(self):
+        # The thread does not survive forking, so check it is still running.
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        if self._thread is None:
+            atexit.register(self.flush)
+        self._thread = threading.Thread(
+            target=self._run, name="grapple-search-hits", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            self._flush_requested.wait(grapple_settings.SEARCH_HIT_FLUSH_INTERVAL)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Failed to record search hits")
+            finally:
+                connections.close_all()
+
+
+search_hit_buffer = SearchHitBuffer()
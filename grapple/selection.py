@@ -0,0 +1,72 @@
+"""
+Helpers to inspect the fields selected by the query being resolved.
+"""
+
+from collections.abc import Iterator
+from typing import Optional
+
+from graphql.language import (
+    FieldNode,
+    FragmentSpreadNode,
+    InlineFragmentNode,
+    SelectionSetNode,
+)
+
+
+def iter_field_nodes(
+    selection_set: Optional[SelectionSetNode], fragments: dict
+) -> Iterator[tuple[Optional[str], FieldNode]]:
+    """
+    Yield the fields of a selection set, expanding fragments, along with the name
+    of the type condition of the innermost fragment they are selected in (or None).
+    """
+
+    def walk(selection_set, type_condition, seen_fragments):
+        if selection_set is None:
+            return
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                yield type_condition, selection
+            elif isinstance(selection, InlineFragmentNode):
+                yield from walk(
+                    selection.selection_set,
+                    selection.type_condition.name.value
+                    if selection.type_condition
+                    else type_condition,
+                    seen_fragments,
+                )
+            elif isinstance(selection, FragmentSpreadNode):
+                name = selection.name.value
+                fragment = fragments.get(name)
+                if fragment is not None and name not in seen_fragments:
+                    yield from walk(
+                        fragment.selection_set,
+                        fragment.type_condition.name.value,
+                        seen_fragments | {name},
+                    )
+
+    yield from walk(selection_set, None, frozenset())
+
+
+def iter_selected_fields(info, *, recursive: bool = True) -> Iterator[FieldNode]:
+    """
+    Yield the field nodes selected below the field being resolved, expanding
+    fragments. With ``recursive=False`` only the direct sub-fields are yielded.
+    """
+
+    def walk(selection_set):
+        for _type_condition, node in iter_field_nodes(selection_set, info.fragments):
+            yield node
+            if recursive:
+                yield from walk(node.selection_set)
+
+    for field_node in info.field_nodes:
+        yield from walk(field_node.selection_set)
+
+
+def get_selected_field_names(info, *, recursive: bool = True) -> set[str]:
+    """
+    Return the names (as written in the query, e.g. ``srcSet``) of the fields
+    selected below the field being resolved.
+    """
+    return {node.name.value for node in iter_selected_fields(info, recursive=recursive)}
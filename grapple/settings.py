@@ -25,9 +25,28 @@ DEFAULTS = {
     "ALLOWED_IMAGE_FILTERS": None,
     "EXPOSE_GRAPHIQL": False,
     "ADD_SEARCH_HIT": False,
+    "SEARCH_HIT_FLUSH_INTERVAL": None,
+    "SEARCH_HIT_FLUSH_THRESHOLD": 1000,
+    "SEARCH_MAX_WORKERS": 4,
+    "SEARCH_CACHE": None,
+    "SEARCH_CACHE_TIMEOUT": 300,
     "PAGE_SIZE": 10,
     "MAX_PAGE_SIZE": 100,
+    "PAGINATION_TOTAL_STRATEGY": "exact",
+    "PAGINATION_TOTAL_CACHE": "default",
+    "PAGINATION_TOTAL_TIMEOUT": 60,
+    "PAGINATION_TOTAL_ESTIMATE_THRESHOLD": 10000,
+    "REDIRECT_MAP_CACHE": None,
+    "EMBED_MAX_WORKERS": 4,
+    "EMBED_TIMEOUT": 10,
+    "EMBED_FAILURE_CACHE": "default",
+    "EMBED_FAILURE_TIMEOUT": 300,
+    "EMBED_FETCH_ON_READ": True,
+    "EMBED_WARM_ON_PUBLISH": False,
     "RICHTEXT_FORMAT": "html",
+    "RICHTEXT_CACHE_SIZE": 0,
+    "RICHTEXT_CACHE": None,
+    "RICHTEXT_CACHE_TIMEOUT": 3600,
     "PAGE_INTERFACE": "grapple.types.interfaces.PageInterface",
     "SNIPPET_INTERFACE": "grapple.types.interfaces.SnippetInterface",
 }
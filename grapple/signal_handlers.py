@@ -0,0 +1,90 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from wagtail.contrib.redirects.models import Redirect
+from wagtail.documents import get_document_model
+from wagtail.images import get_image_model
+from wagtail.models import Page, Site
+from wagtail.search import index
+from wagtail.signals import page_published, page_slug_changed, post_page_move
+
+from .embeds import get_instance_embed_urls, warm_embeds_in_background
+from .registry import registry
+from .rich_text_cache import bump_rich_text_generation
+from .search_cache import bump_search_generation
+from .settings import grapple_settings
+from .types.redirects import (
+    clear_redirect_maps,
+    get_redirect_map_cache,
+    update_redirect_maps,
+)
+
+
+def redirect_pre_save_handler(instance, **kwargs):
+    # Remember where the redirect was, so its previous entry can be updated too.
+    if instance.pk is not None and get_redirect_map_cache() is not None:
+        instance._grapple_previous_location = (
+            Redirect.objects.filter(pk=instance.pk)
+            .values_list("site_id", "old_path")
+            .first()
+        )
+
+
+def redirect_post_save_handler(instance, **kwargs):
+    changes = {(instance.site_id, instance.old_path)}
+    previous_location = getattr(instance, "_grapple_previous_location", None)
+    if previous_location is not None:
+        changes.add(previous_location)
+    update_redirect_maps(changes)
+
+
+def redirect_post_delete_handler(instance, **kwargs):
+    update_redirect_maps({(instance.site_id, instance.old_path)})
+
+
+def page_url_changed_handler(**kwargs):
+    # The links of redirects and rich text to pages are their URL
+    clear_redirect_maps()
+    bump_rich_text_generation()
+
+
+def rich_text_link_changed_handler(**kwargs):
+    # Expire the rich text that may link to or embed the changed object.
+    bump_rich_text_generation()
+
+
+def search_index_changed_handler(**kwargs):
+    # Expire the cached search results when Wagtail updates the search index.
+    bump_search_generation()
+
+
+def page_published_handler(instance, **kwargs):
+    # Fetch the embeds of the page now, so API reads do not wait for providers.
+    # This happens in the background, so slow providers do not hold up publishing.
+    if (
+        not grapple_settings.EMBED_WARM_ON_PUBLISH
+        or type(instance) not in registry.pages
+    ):
+        return
+    urls = get_instance_embed_urls(instance)
+    if urls:
+        transaction.on_commit(lambda: warm_embeds_in_background(urls))
+
+
+def register_signal_handlers():
+    pre_save.connect(redirect_pre_save_handler, sender=Redirect)
+    post_save.connect(redirect_post_save_handler, sender=Redirect)
+    post_delete.connect(redirect_post_delete_handler, sender=Redirect)
+    post_save.connect(page_url_changed_handler, sender=Site)
+    post_delete.connect(page_url_changed_handler, sender=Site)
+    page_slug_changed.connect(page_url_changed_handler)
+    post_page_move.connect(page_url_changed_handler)
+    post_delete.connect(rich_text_link_changed_handler, sender=Page)
+    for model in (get_document_model(), get_image_model()):
+        post_save.connect(rich_text_link_changed_handler, sender=model)
+        post_delete.connect(rich_text_link_changed_handler, sender=model)
+    page_published.connect(page_published_handler)
+
+    for model in index.get_indexed_models():
+        if getattr(model, "search_auto_update", True):
+            post_save.connect(search_index_changed_handler, sender=model)
+            post_delete.connect(search_index_changed_handler, sender=model)
@@ -27,6 +27,10 @@ class DocumentObjectType(DjangoObjectType):
     collection = graphene.Field(lambda: CollectionObjectType, required=True)
     tags = graphene.List(graphene.NonNull(lambda: TagObjectType), required=True)
 
+    # The model fields used by custom resolvers, so the rest can be left out when
+    # loading lists of documents.
+    field_dependencies = {"url": ("file",), "tags": ()}
+
     def resolve_url(self, info, **kwargs):
         """
         Get document file url.
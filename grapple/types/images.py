@@ -4,13 +4,17 @@ from typing import TYPE_CHECKING
 
 import graphene
 
+from django.db.models import Prefetch
 from graphene_django import DjangoObjectType
+from graphql import GraphQLError
+from graphql.execution.values import get_argument_values
 from wagtail.images import get_image_model
 from wagtail.images.models import Image as WagtailImage
 from wagtail.images.models import Rendition as WagtailImageRendition
 from wagtail.images.utils import to_svg_safe_spec
 
 from grapple.registry import registry
+from grapple.selection import iter_selected_fields
 from grapple.settings import grapple_settings
 from grapple.utils import get_media_item_url, resolve_queryset
 
@@ -20,7 +24,9 @@ from .tags import TagObjectType
 
 
 if TYPE_CHECKING:
-    from graphql import GraphQLResolveInfo
+    from collections.abc import Iterable
+
+    from graphql import FieldNode, GraphQLResolveInfo
 
 
 def get_image_type():
@@ -80,6 +86,84 @@ def rendition_allowed(filter_specs: str) -> bool:
     return filter_specs in allowed_filters
 
 
+def get_svg_safe_filter_specs(filter_specs: str) -> str:
+    """
+    Limits the given filter specs to those that are safe to apply to SVGs,
+    falling back to the original image if none are.
+    """
+    return to_svg_safe_spec(filter_specs) or "original"
+
+
+def get_rendition_filter_specs(**kwargs) -> str:
+    """Returns the filter specs of the rendition field for the given arguments"""
+    return "|".join([f"{key}-{val}" for key, val in kwargs.items()])
+
+
+def get_src_set_filter_specs(sizes: list[int], format: str | None = None) -> list[str]:
+    """Returns the allowed filter specs of the srcSet field for the given arguments"""
+    filter_suffix = f"|format-{format}" if format else ""
+    return [
+        f"width-{width}{filter_suffix}"
+        for width in sizes
+        if rendition_allowed(f"width-{width}{filter_suffix}")
+    ]
+
+
+def get_selected_filter_specs(
+    info: GraphQLResolveInfo, field_nodes: Iterable[FieldNode]
+) -> list[str]:
+    """
+    Returns the filter specs of the renditions requested by the given
+    `rendition`, `renditions` and `srcSet` image field nodes, other fields are ignored.
+    """
+    image_type = info.schema.get_type(get_image_type()._meta.name)
+    filter_specs = {}
+    for node in field_nodes:
+        name = node.name.value
+        if name not in ("rendition", "renditions", "srcSet"):
+            continue
+        try:
+            kwargs = get_argument_values(
+                image_type.fields[name], node, info.variable_values
+            )
+        except GraphQLError:
+            continue
+
+        preserve_svg = kwargs.pop("preserve_svg", True)
+        if name == "rendition":
+            specs = [get_rendition_filter_specs(**kwargs)]
+        elif name == "renditions":
+            specs = kwargs.get("specs") or []
+        else:
+            specs = get_src_set_filter_specs(
+                kwargs.get("sizes") or [], kwargs.get("format")
+            )
+
+        for spec in specs:
+            filter_specs[spec] = None
+            if preserve_svg:
+                # The filter specs used if the image turns out to be an SVG
+                filter_specs[get_svg_safe_filter_specs(spec)] = None
+
+    return list(filter_specs)
+
+
+def get_renditions_prefetch(
+    model, filter_specs: list[str], lookup: str = "renditions"
+) -> Prefetch:
+    """
+    Returns a lookup prefetching the renditions of the given image model matching
+    the filter specs, like `ImageQuerySet.prefetch_renditions()` does.
+    """
+    return Prefetch(
+        lookup,
+        queryset=model.get_rendition_model().objects.filter(
+            filter_spec__in=filter_specs
+        ),
+        to_attr="prefetched_renditions",
+    )
+
+
 class ImageRenditionObjectType(DjangoObjectType):
     id = graphene.ID(required=True)
     file = graphene.String(required=True)
@@ -122,9 +206,35 @@ class ImageObjectType(DjangoObjectType):
     collection = graphene.Field(lambda: CollectionObjectType, required=True)
     tags = graphene.List(graphene.NonNull(lambda: TagObjectType), required=True)
     rendition = graphene.Field(get_rendition_type, **get_rendition_field_kwargs())
+    renditions = graphene.List(
+        graphene.NonNull(get_rendition_type),
+        specs=graphene.List(
+            graphene.NonNull(graphene.String),
+            required=True,
+            description="Filter specs to render, e.g. `fill-300x200|format-webp`.",
+        ),
+        preserve_svg=graphene.Boolean(
+            description="Prevents raster image operations (e.g. `format-webp`, `bgcolor`, etc.) being applied to SVGs. "
+            "More info: https://docs.wagtail.org/en/stable/topics/images.html#svg-images"
+        ),
+    )
     src_set = graphene.String(**get_src_set_field_kwargs())
     is_svg = graphene.Boolean(required=True)
 
+    # The model fields used by custom resolvers, so the rest can be left out when
+    # loading lists of images. None means the whole image is needed.
+    field_dependencies = {
+        "src": ("file",),
+        "url": ("file",),
+        "aspect_ratio": ("width", "height"),
+        "sizes": ("width",),
+        "tags": (),
+        "is_svg": ("file",),
+        "rendition": None,
+        "renditions": None,
+        "src_set": None,
+    }
+
     class Meta:
         model = WagtailImage
 
@@ -135,7 +245,7 @@ class ImageObjectType(DjangoObjectType):
         Render a custom rendition of the current image.
         """
         preserve_svg = kwargs.pop("preserve_svg", True)
-        filter_specs = "|".join([f"{key}-{val}" for key, val in kwargs.items()])
+        filter_specs = get_rendition_filter_specs(**kwargs)
 
         # Only allow the defined filters (thus renditions)
         if not rendition_allowed(filter_specs):
@@ -145,16 +255,7 @@ class ImageObjectType(DjangoObjectType):
 
         if instance.is_svg() and preserve_svg:
             # when dealing with SVGs, we want to limit the filter specs to those that are safe
-            filter_specs = to_svg_safe_spec(filter_specs)
-            if not filter_specs:
-                # if there are no valid filters, fall back to the original
-                filter_specs = "original"
-
-            if not filter_specs:
-                raise TypeError(
-                    "No valid filter specs for SVG. "
-                    "See https://docs.wagtail.org/en/stable/topics/images.html#svg-images for details."
-                )
+            filter_specs = get_svg_safe_filter_specs(filter_specs)
 
         # previously we wrapped this in a try/except SourceImageIOError block.
         # Removed to allow the error to bubble up in the response ("errors") and be handled by the user.
@@ -200,30 +301,48 @@ class ImageObjectType(DjangoObjectType):
         """
         Generate src set of renditions.
         """
-        filter_suffix = f"|format-{format}" if format else ""
-        format_kwarg = {"format": format} if format else {}
-        if instance.file.name is not None:
-            rendition_list = [
-                ImageObjectType.resolve_rendition(
-                    instance,
-                    info,
-                    width=width,
-                    preserve_svg=preserve_svg,
-                    **format_kwarg,
-                )
-                for width in sizes
-                if rendition_allowed(f"width-{width}{filter_suffix}")
-            ]
-
-            return ", ".join(
-                [
-                    f"{get_media_item_url(img)} {img.width}w"
-                    for img in rendition_list
-                    if img is not None
-                ]
+        if instance.file.name is None:
+            return ""
+
+        filter_specs = get_src_set_filter_specs(sizes, format)
+        if not filter_specs:
+            return ""
+
+        if instance.is_svg() and preserve_svg:
+            filter_specs = [get_svg_safe_filter_specs(spec) for spec in filter_specs]
+
+        # Fetch (or generate) all the renditions in one go rather than one per width.
+        renditions = instance.get_renditions(*filter_specs)
+        return ", ".join(
+            f"{get_media_item_url(renditions[spec])} {renditions[spec].width}w"
+            for spec in filter_specs
+        )
+
+    def resolve_renditions(
+        instance: WagtailImage,
+        info: GraphQLResolveInfo,
+        specs: list[str],
+        *,
+        preserve_svg: bool = True,
+        **kwargs,
+    ) -> list[WagtailImageRendition]:
+        """
+        Render several custom renditions of the current image at once.
+        """
+        # Only allow the defined filters (thus renditions)
+        if not all(rendition_allowed(spec) for spec in specs):
+            raise TypeError(
+                "Invalid filter specs. Check the `ALLOWED_IMAGE_FILTERS` setting."
             )
 
-        return ""
+        if not specs:
+            return []
+
+        if instance.is_svg() and preserve_svg:
+            specs = [get_svg_safe_filter_specs(spec) for spec in specs]
+
+        renditions = instance.get_renditions(*specs)
+        return [renditions[spec] for spec in specs]
 
     def resolve_is_svg(
         instance: WagtailImage, info: GraphQLResolveInfo, **kwargs
@@ -249,21 +368,23 @@ def ImagesQuery():
 
         def resolve_image(parent, info, id, **kwargs):
             """Returns an image given the id, if in a public collection"""
+            qs = mdl.objects.filter(collection__view_restrictions__isnull=True)
+            # Only prefetch the renditions requested by the query
+            filter_specs = get_selected_filter_specs(
+                info, iter_selected_fields(info, recursive=False)
+            )
+            if filter_specs:
+                qs = qs.prefetch_renditions(*filter_specs)
             try:
-                return (
-                    mdl.objects.filter(collection__view_restrictions__isnull=True)
-                    .prefetch_renditions()
-                    .get(pk=id)
-                )
+                return qs.get(pk=id)
             except mdl.DoesNotExist:
                 return None
 
         def resolve_images(parent, info, **kwargs):
             """Returns all images in a public collection"""
+            # The renditions requested by the query are prefetched by resolve_queryset
             return resolve_queryset(
-                mdl.objects.filter(
-                    collection__view_restrictions__isnull=True
-                ).prefetch_renditions(),
+                mdl.objects.filter(collection__view_restrictions__isnull=True),
                 info,
                 **kwargs,
             )
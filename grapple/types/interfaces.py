@@ -1,5 +1,7 @@
 import inspect
 
+from functools import cache
+
 import graphene
 
 from django.contrib.contenttypes.models import ContentType
@@ -9,9 +11,15 @@ from wagtail import blocks
 from wagtail.models import Page as WagtailPage
 from wagtail.rich_text import RichText
 
+from ..loaders import PageAncestorsLoader, PageParentLoader, PageRelativesLoader
 from ..registry import registry
 from ..settings import grapple_settings
-from ..utils import resolve_queryset, serialize_struct_obj
+from ..utils import (
+    can_batch_queryset_arguments,
+    resolve_loaded_list,
+    resolve_queryset,
+    serialize_struct_obj,
+)
 from .structures import QuerySetList
 
 
@@ -19,6 +27,37 @@ def get_page_interface():
     return import_string(grapple_settings.PAGE_INTERFACE)
 
 
+@cache
+def get_page_types_by_content_type() -> dict:
+    """
+    Map the content type ids of the registered page models to their Graphene type.
+    Built once, with a single query, then filled in for unregistered models as needed.
+    """
+    content_types = ContentType.objects.get_for_models(
+        *(model for model in registry.pages if hasattr(model, "_meta"))
+    )
+    return {
+        content_type.id: registry.pages[model]
+        for model, content_type in content_types.items()
+        # Proxy models share the content type of their concrete model
+        if content_type.model_class() is model
+    }
+
+
+def get_page_type_for_content_type(content_type_id: int):
+    """
+    Returns the Graphene type of pages of the given content type, without loading
+    the specific page.
+    """
+    from .pages import Page
+
+    page_types = get_page_types_by_content_type()
+    if content_type_id not in page_types:
+        model = ContentType.objects.get_for_id(content_type_id).model_class()
+        page_types[content_type_id] = registry.pages.get(model, Page)
+    return page_types[content_type_id]
+
+
 class PageInterface(graphene.Interface):
     id = graphene.ID()
     title = graphene.String(required=True)
@@ -91,13 +130,19 @@ class PageInterface(graphene.Interface):
         return registry.pages.get(type(instance), Page)
 
     def resolve_content_type(self, info, **kwargs):
-        self.content_type = ContentType.objects.get_for_model(self)
-        return (
-            f"{self.content_type.app_label}.{self.content_type.model_class().__name__}"
-        )
+        # Content types are cached by id, so this does not hit the database
+        content_type = ContentType.objects.get_for_id(self.content_type_id)
+        return f"{content_type.app_label}.{content_type.model_class().__name__}"
 
     def resolve_page_type(self, info, **kwargs):
-        return get_page_interface().resolve_type(self.specific, info, **kwargs)
+        page_interface = get_page_interface()
+        if (
+            getattr(page_interface.resolve_type, "__func__", None)
+            is not PageInterface.resolve_type.__func__
+        ):
+            # A custom page interface may resolve types from the specific page
+            return page_interface.resolve_type(self.specific, info, **kwargs)
+        return get_page_type_for_content_type(self.content_type_id)
 
     def resolve_parent(self, info, **kwargs):
         """
@@ -105,7 +150,7 @@ class PageInterface(graphene.Interface):
         Docs: https://docs.wagtail.io/en/stable/reference/pages/model_reference.html#wagtail.models.Page.get_parent
         """
         try:
-            return self.get_parent().specific
+            return PageParentLoader.for_request(info).load(self)
         except GraphQLError:
             return WagtailPage.objects.none()
 
@@ -114,6 +159,11 @@ class PageInterface(graphene.Interface):
         Resolves a list of live children of this page.
         Docs: https://docs.wagtail.io/en/stable/reference/pages/queryset_reference.html#examples
         """
+        if not kwargs.get("search_query"):
+            return PageRelativesLoader.for_request(info, "children", **kwargs).load(
+                self
+            )
+
         return resolve_queryset(
             self.get_children().live().public().specific(), info, **kwargs
         )
@@ -123,6 +173,11 @@ class PageInterface(graphene.Interface):
         Resolves a list of sibling nodes to this page.
         Docs: https://docs.wagtail.io/en/stable/reference/pages/queryset_reference.html?highlight=get_siblings#wagtail.query.PageQuerySet.sibling_of
         """
+        if not kwargs.get("search_query"):
+            return PageRelativesLoader.for_request(info, "siblings", **kwargs).load(
+                self
+            )
+
         return resolve_queryset(
             self.get_siblings().exclude(pk=self.pk).live().public().specific(),
             info,
@@ -134,6 +189,11 @@ class PageInterface(graphene.Interface):
         Resolves a list of direct next siblings of this page. Similar to `resolve_siblings` with sorting.
         Source: https://github.com/wagtail/wagtail/blob/master/wagtail/core/models.py#L1384
         """
+        if not kwargs.get("search_query"):
+            return PageRelativesLoader.for_request(
+                info, "next_siblings", **kwargs
+            ).load(self)
+
         return resolve_queryset(
             self.get_next_siblings().exclude(pk=self.pk).live().public().specific(),
             info,
@@ -145,6 +205,11 @@ class PageInterface(graphene.Interface):
         Resolves a list of direct prev siblings of this page. Similar to `resolve_siblings` with sorting.
         Source: https://github.com/wagtail/wagtail/blob/master/wagtail/core/models.py#L1387
         """
+        if not kwargs.get("search_query"):
+            return PageRelativesLoader.for_request(
+                info, "previous_siblings", **kwargs
+            ).load(self)
+
         return resolve_queryset(
             self.get_prev_siblings().exclude(pk=self.pk).live().public().specific(),
             info,
@@ -156,6 +221,11 @@ class PageInterface(graphene.Interface):
         Resolves a list of nodes pointing to the current page’s descendants.
         Docs: https://docs.wagtail.io/en/stable/reference/pages/model_reference.html#wagtail.models.Page.get_descendants
         """
+        if not kwargs.get("search_query"):
+            return PageRelativesLoader.for_request(info, "descendants", **kwargs).load(
+                self
+            )
+
         return resolve_queryset(
             self.get_descendants().live().public().specific(), info, **kwargs
         )
@@ -165,6 +235,12 @@ class PageInterface(graphene.Interface):
         Resolves a list of nodes pointing to the current page’s ancestors.
         Docs: https://docs.wagtail.io/en/stable/reference/pages/model_reference.html#wagtail.models.Page.get_ancestors
         """
+        if can_batch_queryset_arguments(**kwargs):
+            # Load the ancestors of all pages in the current list at once.
+            return resolve_loaded_list(
+                PageAncestorsLoader.for_request(info).load(self), info, **kwargs
+            )
+
         return resolve_queryset(
             self.get_ancestors().live().public().specific(), info, **kwargs
         )
@@ -237,6 +313,9 @@ class SnippetInterface(graphene.Interface):
     snippet_type = graphene.String(required=True)
     content_type = graphene.String(required=True)
 
+    # Neither field reads from the model fields
+    field_dependencies = {"snippet_type": (), "content_type": ()}
+
     @classmethod
     def resolve_type(cls, instance, info, **kwargs):
         return registry.snippets[type(instance)]
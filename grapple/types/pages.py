@@ -9,9 +9,13 @@ from wagtail.models import Page as WagtailPage
 from wagtail.models import Site
 
 from ..registry import registry
-from ..utils import resolve_queryset, resolve_site_by_hostname
+from ..utils import (
+    resolve_connection_queryset,
+    resolve_queryset,
+    resolve_site_by_hostname,
+)
 from .interfaces import get_page_interface
-from .structures import QuerySetList
+from .structures import ConnectionQuerySet, QuerySetList
 
 
 class Page(DjangoObjectType):
@@ -150,6 +154,83 @@ def get_site_filter(info, **kwargs):
         return Site.find_for_request(info.context)
 
 
+def get_pages_arguments() -> dict:
+    """
+    The arguments filtering the pages of the `pages` and `pagesConnection` fields.
+    """
+    return {
+        "content_type": graphene.Argument(
+            graphene.String,
+            description=_(
+                "Filter by content type. Uses the `app.Model` notation. Accepts a comma separated list of content types."
+            ),
+        ),
+        "in_site": graphene.Argument(
+            graphene.Boolean,
+            description=_("Filter to pages in the current site only."),
+            default_value=False,
+        ),
+        "site": graphene.Argument(
+            graphene.String,
+            description=_("Filter to pages in the give site."),
+        ),
+        "ancestor": graphene.Argument(
+            graphene.ID,
+            description=_("Filter to pages that are descendants of the given page."),
+            required=False,
+        ),
+        "parent": graphene.Argument(
+            graphene.ID,
+            description=_(
+                "Filter to pages that are children of the given page. "
+                "When using both `parent` and `ancestor`, then `parent` will take precendence."
+            ),
+            required=False,
+        ),
+    }
+
+
+def get_pages_queryset(info, **kwargs):
+    """
+    Return the live and public pages matching the arguments of
+    :func:`get_pages_arguments`, ideally specific.
+    """
+    qs = WagtailPage.objects.all()
+
+    try:
+        if kwargs.get("parent"):
+            qs = WagtailPage.objects.get(id=kwargs.get("parent")).get_children()
+        elif kwargs.get("ancestor"):
+            qs = WagtailPage.objects.get(id=kwargs.get("ancestor")).get_descendants()
+    except WagtailPage.DoesNotExist:
+        qs = WagtailPage.objects.none()
+
+    # no need to the root page
+    pages = qs.live().public().filter(depth__gt=1).specific()
+
+    site = get_site_filter(info, **kwargs)
+    site_hostname = kwargs.get("site")
+    in_current_site = kwargs.get("in_site", False)
+
+    if site is not None:
+        pages = pages.in_site(site)
+    elif site is None and any([site_hostname is not None, in_current_site is True]):
+        # If we could not resolve a Site but _were_ passed a filter, we
+        # should not return any results.
+        return WagtailPage.objects.none()
+
+    content_type = kwargs.get("content_type")
+    content_types = content_type.split(",") if content_type else None
+    if content_types:
+        filters = Q()
+        for content_type in content_types:
+            app_label, model = content_type.strip().lower().split(".")
+            filters |= Q(content_type__app_label=app_label, content_type__model=model)
+        pages = pages.filter(filters)
+
+    return pages
+
+
 def PagesQuery():
     # Add base type to registry
     registry.pages[type(WagtailPage)] = Page
@@ -157,40 +238,18 @@ def PagesQuery():
     class Mixin:
         pages = QuerySetList(
             graphene.NonNull(get_page_interface),
-            content_type=graphene.Argument(
-                graphene.String,
-                description=_(
-                    "Filter by content type. Uses the `app.Model` notation. Accepts a comma separated list of content types."
-                ),
-            ),
-            in_site=graphene.Argument(
-                graphene.Boolean,
-                description=_("Filter to pages in the current site only."),
-                default_value=False,
-            ),
-            site=graphene.Argument(
-                graphene.String,
-                description=_("Filter to pages in the give site."),
-            ),
-            ancestor=graphene.Argument(
-                graphene.ID,
-                description=_(
-                    "Filter to pages that are descendants of the given page."
-                ),
-                required=False,
-            ),
-            parent=graphene.Argument(
-                graphene.ID,
-                description=_(
-                    "Filter to pages that are children of the given page. "
-                    "When using both `parent` and `ancestor`, then `parent` will take precendence."
-                ),
-                required=False,
-            ),
+            **get_pages_arguments(),
             enable_search=True,
             enable_in_menu=True,
             required=True,
         )
+        pages_connection = ConnectionQuerySet(
+            graphene.NonNull(get_page_interface),
+            "Page",
+            **get_pages_arguments(),
+            enable_in_menu=True,
+            required=True,
+        )
         page = graphene.Field(
             get_page_interface(),
             id=graphene.ID(),
@@ -227,47 +286,14 @@ def PagesQuery():
 
         # Return all pages in site, ideally specific.
         def resolve_pages(self, info, **kwargs):
-            qs = WagtailPage.objects.all()
-
-            try:
-                if kwargs.get("parent"):
-                    qs = WagtailPage.objects.get(id=kwargs.get("parent")).get_children()
-                elif kwargs.get("ancestor"):
-                    qs = WagtailPage.objects.get(
-                        id=kwargs.get("ancestor")
-                    ).get_descendants()
-            except WagtailPage.DoesNotExist:
-                qs = WagtailPage.objects.none()
-
-            # no need to the root page
-            pages = qs.live().public().filter(depth__gt=1).specific()
-
-            site = get_site_filter(info, **kwargs)
-            site_hostname = kwargs.get("site")
-            in_current_site = kwargs.get("in_site", False)
-
-            if site is not None:
-                pages = pages.in_site(site)
-            elif site is None and any(
-                [site_hostname is not None, in_current_site is True]
-            ):
-                # If we could not resolve a Site but _were_ passed a filter, we
-                # should not return any results.
-                return WagtailPage.objects.none()
-
-            content_type = kwargs.pop("content_type", None)
-            content_types = content_type.split(",") if content_type else None
-            if content_types:
-                filters = Q()
-                for content_type in content_types:
-                    app_label, model = content_type.strip().lower().split(".")
-                    filters |= Q(
-                        content_type__app_label=app_label, content_type__model=model
-                    )
-                pages = pages.filter(filters)
-
+            pages = get_pages_queryset(info, **kwargs)
             return resolve_queryset(pages, info, **kwargs)
 
+        # Return the pages in site with cursor pagination.
+        def resolve_pages_connection(self, info, **kwargs):
+            pages = get_pages_queryset(info, **kwargs)
+            return resolve_connection_queryset(pages, info, **kwargs)
+
         # Return a specific page, identified by ID or Slug.
         def resolve_page(self, info, **kwargs):
             return get_specific_page(
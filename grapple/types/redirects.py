@@ -1,15 +1,48 @@
-import copy
-
-from typing import Optional
+from collections.abc import Iterator
+from itertools import islice
+from typing import NamedTuple, Optional
+from urllib.parse import urlparse
 
 import graphene
 
+from django.core.cache import caches
+from django.db.models import F, Q
+from django.utils.encoding import uri_to_iri
 from wagtail.contrib.redirects.models import Redirect
 from wagtail.models import Page, Site
 
+from grapple.settings import grapple_settings
 from grapple.types.sites import SiteObjectType
+from grapple.utils import resolve_site_by_hostname
 
 from .interfaces import get_page_interface
+from .structures import PositiveInt
+
+
+class SiteRedirect(NamedTuple):
+    """
+    A redirect as it applies to a single site. Redirects without a site apply to
+    all sites, so they are shared by one `SiteRedirect` per site rather than copied.
+    """
+
+    redirect: Redirect
+    site: Site
+
+    @property
+    def old_path(self) -> str:
+        return self.redirect.old_path
+
+    @property
+    def is_permanent(self) -> bool:
+        return self.redirect.is_permanent
+
+    @property
+    def redirect_page(self) -> Optional[Page]:
+        return self.redirect.redirect_page
+
+    @property
+    def link(self) -> Optional[str]:
+        return self.redirect.link
 
 
 class RedirectObjectType(graphene.ObjectType):
@@ -47,31 +80,286 @@ class RedirectObjectType(graphene.ObjectType):
             return self.redirect_page.specific
 
 
+def iter_site_redirects(
+    redirects_qs, sites: Optional[list[Site]] = None
+) -> Iterator[SiteRedirect]:
+    """
+    Yield the redirects of the given query set for each site they apply to.
+    Redirects without a site are yielded once for each of the given sites, or
+    for all sites, fetched once when first needed, if no sites are given.
+    """
+
+    for redirect in redirects_qs.iterator(chunk_size=2000):
+        if redirect.site_id is not None:
+            yield SiteRedirect(redirect, redirect.site)
+            continue
+
+        if sites is None:
+            sites = list(Site.objects.all())
+        for site in sites:
+            yield SiteRedirect(redirect, site)
+
+
+def resolve_redirect_site(info, hostname: Optional[str]) -> Optional[Site]:
+    """
+    Find the site with the given hostname, or the site of the current request.
+    """
+
+    if hostname is not None:
+        return resolve_site_by_hostname(hostname=hostname, filter_name="site")
+    return Site.find_for_request(info.context)
+
+
+def get_redirect_for_path(old_path: str, site: Optional[Site]) -> Optional[Redirect]:
+    """
+    Find the redirect for a path the way `wagtail.contrib.redirects` does, with a
+    single query: the path is normalised, then tried as is, unencoded and without
+    its query string, preferring redirects of the given site to site-less ones.
+    """
+
+    path = Redirect.normalise_path(old_path)
+    if "\0" in path:
+        # Reject paths with null characters, which crash on Postgres
+        return None
+
+    path_without_query = urlparse(path).path
+    candidates = list(
+        dict.fromkeys(
+            [
+                path,
+                uri_to_iri(path),
+                path_without_query,
+                uri_to_iri(path_without_query),
+            ]
+        )
+    )
+
+    if site is not None:
+        redirects_qs = Redirect.get_for_site(site)
+    else:
+        redirects_qs = Redirect.objects.filter(site=None)
+    redirects = redirects_qs.filter(old_path__in=candidates).select_related(
+        "redirect_page", "site"
+    )
+    return min(
+        redirects,
+        key=lambda redirect: (
+            candidates.index(redirect.old_path),
+            redirect.site_id is None,
+        ),
+        default=None,
+    )
+
+
+def get_redirect_map_cache():
+    """
+    Returns the cache the redirect maps are stored in, or None if disabled.
+    """
+
+    alias = grapple_settings.REDIRECT_MAP_CACHE
+    return caches[alias] if alias else None
+
+
+def get_redirect_map_cache_key(site_id: int) -> str:
+    return f"grapple:redirect_map:{site_id}"
+
+
+def get_redirect_map_entry(redirect: Redirect) -> list:
+    """
+    The compact redirect map entry for a redirect: its new URL (None for
+    redirects without one, which are used for 410s) and HTTP status code.
+    """
+
+    return [redirect.link, 301 if redirect.is_permanent else 302]
+
+
+def build_redirect_map(site: Site) -> dict[str, list]:
+    """
+    Map the old paths of the redirects of a site, including site-less ones, to
+    their entry. Redirects of the site take precedence over site-less ones.
+    """
+
+    redirects_qs = (
+        Redirect.get_for_site(site)
+        .select_related("redirect_page")
+        .order_by(F("site").asc(nulls_first=True), "pk")
+    )
+    return {
+        redirect.old_path: get_redirect_map_entry(redirect)
+        for redirect in redirects_qs.iterator(chunk_size=2000)
+    }
+
+
+def get_redirect_map(site: Site) -> dict[str, list]:
+    """
+    Returns the redirect map of a site, from the cache if enabled.
+    """
+
+    cache = get_redirect_map_cache()
+    if cache is None:
+        return build_redirect_map(site)
+
+    cache_key = get_redirect_map_cache_key(site.pk)
+    redirect_map = cache.get(cache_key)
+    if redirect_map is None:
+        redirect_map = build_redirect_map(site)
+        cache.set(cache_key, redirect_map, timeout=None)
+    return redirect_map
+
+
+def update_redirect_maps(changes: set[tuple[Optional[int], str]]):
+    """
+    Update the cached redirect maps for the given `(site_id, old_path)` pairs,
+    where a site id of None stands for all sites. Maps not in the cache are
+    left to be built when next requested.
+    """
+
+    cache = get_redirect_map_cache()
+    if cache is None or not changes:
+        return
+
+    paths_by_site_id = {}
+    for site_id, old_path in changes:
+        site_ids = (
+            Site.objects.values_list("pk", flat=True) if site_id is None else [site_id]
+        )
+        for pk in site_ids:
+            paths_by_site_id.setdefault(pk, set()).add(old_path)
+
+    for site_id, old_paths in paths_by_site_id.items():
+        cache_key = get_redirect_map_cache_key(site_id)
+        redirect_map = cache.get(cache_key)
+        if redirect_map is None:
+            continue
+
+        redirects_qs = (
+            Redirect.objects.filter(old_path__in=old_paths)
+            .filter(Q(site_id=site_id) | Q(site=None))
+            .select_related("redirect_page")
+            .order_by(F("site").asc(nulls_first=True), "pk")
+        )
+        for old_path in old_paths:
+            redirect_map.pop(old_path, None)
+        for redirect in redirects_qs:
+            redirect_map[redirect.old_path] = get_redirect_map_entry(redirect)
+        cache.set(cache_key, redirect_map, timeout=None)
+
+
+def clear_redirect_maps():
+    """
+    Remove all the cached redirect maps, e.g. when page URLs change.
+    """
+
+    cache = get_redirect_map_cache()
+    if cache is not None:
+        cache.delete_many(
+            [
+                get_redirect_map_cache_key(site_id)
+                for site_id in Site.objects.values_list("pk", flat=True)
+            ]
+        )
+
+
 class RedirectsQuery:
-    redirects = graphene.List(graphene.NonNull(RedirectObjectType), required=True)
+    redirects = graphene.List(
+        graphene.NonNull(RedirectObjectType),
+        required=True,
+        limit=PositiveInt(),
+        offset=PositiveInt(),
+        site=graphene.String(
+            description="Only return the redirects of the site with this hostname, "
+            "optionally including the port (e.g. `example.com:8000`)."
+        ),
+        old_path=graphene.String(description="Only return redirects from this path."),
+    )
+    redirect = graphene.Field(
+        RedirectObjectType,
+        old_path=graphene.String(required=True),
+        site=graphene.String(
+            description="The hostname of the site to find the redirect for, "
+            "optionally including the port (e.g. `example.com:8000`). "
+            "Defaults to the site of the current request."
+        ),
+    )
+
+    redirect_map = graphene.Field(
+        graphene.JSONString,
+        site=graphene.String(
+            description="The hostname of the site to return the redirect map of, "
+            "optionally including the port (e.g. `example.com:8000`). "
+            "Defaults to the site of the current request."
+        ),
+        description="The redirects of a site, as a JSON object mapping old paths "
+        "to a `[newUrl, statusCode]` pair.",
+    )
+
+    def resolve_redirect_map(
+        self, info, site: Optional[str] = None, **kwargs
+    ) -> Optional[dict[str, list]]:
+        site = resolve_redirect_site(info, site)
+        return get_redirect_map(site) if site is not None else None
+
+    def resolve_redirect(
+        self, info, old_path: str, site: Optional[str] = None, **kwargs
+    ) -> Optional[SiteRedirect]:
+        """
+        Resolve the redirect from a path, if any. Redirects of the site take
+        precedence over redirects for all sites.
+        """
+
+        site = resolve_redirect_site(info, site)
+        if site is None:
+            return None
+
+        redirect = get_redirect_for_path(old_path, site)
+        if redirect is None:
+            return None
+        return SiteRedirect(redirect, site)
 
     # Return all redirects.
-    def resolve_redirects(self, info, **kwargs) -> list[Redirect]:
+    def resolve_redirects(
+        self,
+        info,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        site: Optional[str] = None,
+        old_path: Optional[str] = None,
+        **kwargs,
+    ) -> list[SiteRedirect]:
         """
         Resolve the query set of redirects. If `site` is None, a redirect works
-        for all sites. To show this, a new redirect object is created for each
-        of the sites.
+        for all sites. To show this, the redirect is returned for each of the sites.
         """
 
+        if site is not None:
+            site = resolve_site_by_hostname(hostname=site, filter_name="site")
+            if site is None:
+                return []
+            sites = [site]
+        else:
+            sites = None
+
         redirects_qs = (
-            Redirect.objects.select_related("redirect_page")
-            .select_related("site")
-            .all()
+            Redirect.get_for_site(site)
+            .select_related("redirect_page", "site")
+            .only(
+                "old_path",
+                "site",
+                "is_permanent",
+                "redirect_page",
+                "redirect_page_route_path",
+                "redirect_link",
+            )
+            .order_by("pk")
         )
-        finalised_redirects: list[Redirect] = []  # Redirects to return in API.
+        if old_path is not None:
+            redirects_qs = redirects_qs.filter(
+                old_path=Redirect.normalise_path(old_path)
+            )
 
-        for redirect in redirects_qs:
-            if redirect.site is None:
-                # Duplicate Redirect for each Site as it applies to all Sites.
-                for site in Site.objects.all():
-                    _new_redirect = copy.deepcopy(redirect)
-                    _new_redirect.site = site
-                    finalised_redirects.append(_new_redirect)
-            else:
-                finalised_redirects.append(redirect)
-        return finalised_redirects
+        site_redirects = iter_site_redirects(redirects_qs, sites)
+        offset = int(offset or 0)
+        if limit is None:
+            return list(islice(site_redirects, offset, None))
+        limit = min(int(limit), grapple_settings.MAX_PAGE_SIZE)
+        return list(islice(site_redirects, offset, offset + limit))
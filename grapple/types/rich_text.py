@@ -1,9 +1,231 @@
-from typing import Union
+import json
 
+from collections import defaultdict
+from html.parser import HTMLParser
+from typing import Optional, Union
+
+import graphene
+
+from django.template.loader import render_to_string
+from django.utils.translation import gettext_lazy as _
 from graphene.types import String
 from wagtail.rich_text import RichText as WagtailRichText
+from wagtail.rich_text import get_rewriter
 
+from ..rich_text_cache import rich_text_cache
 from ..settings import grapple_settings
+from .structures import RichTextFormatEnum
+
+
+class RenderedRichText(str):
+    """
+    Rich text already rendered to HTML, which the ``RichText`` scalar returns as is.
+    """
+
+
+def rewrite_many(rewriter, html_list: list[str]) -> list[str]:
+    """
+    Apply a Wagtail ``TagRewriter`` to many HTML strings, getting the
+    replacements of each tag type for all the strings at once.
+    """
+    matches_list = [rewriter.extract_tags(html) for html in html_list]
+    matches_by_tag_type = defaultdict(list)
+    for matches in matches_list:
+        for tag_type, tag_matches in matches.items():
+            matches_by_tag_type[tag_type] += tag_matches
+
+    for tag_type, tag_matches in matches_by_tag_type.items():
+        replacements = rewriter.get_tag_replacements(
+            tag_type, [match.attrs for match in tag_matches]
+        )
+        for match, replacement in zip(tag_matches, replacements):
+            match.replacement = replacement
+
+    results = []
+    for html, matches in zip(html_list, matches_list):
+        matches_to_replace = sorted(
+            (
+                match
+                for tag_matches in matches.values()
+                for match in tag_matches
+                if match.replacement is not None
+            ),
+            key=lambda match: match.start,
+        )
+        parts, position = [], 0
+        for match in matches_to_replace:
+            parts += [html[position : match.start], match.replacement]
+            position = match.end
+        parts.append(html[position:])
+        results.append("".join(parts))
+    return results
+
+
+def expand_db_html_many(sources: list[str]) -> list[str]:
+    """
+    Like Wagtail's ``expand_db_html``, for many sources at once. The links and
+    embeds of all the sources are expanded together.
+    """
+    html_list = list(sources)
+    for rewriter in get_rewriter().rewriters:
+        html_list = rewrite_many(rewriter, html_list)
+    return html_list
+
+
+def expand_rich_text_many(sources: list[str]) -> list[str]:
+    """
+    Render rich text sources to HTML like ``wagtail.rich_text.RichText`` does,
+    expanding the links and embeds of all the sources together.
+    """
+    return [
+        render_to_string("wagtailcore/shared/richtext.html", {"html": html})
+        for html in expand_db_html_many(sources)
+    ]
+
+
+# Elements which never have content, so have no closing tag.
+VOID_ELEMENTS = frozenset(
+    {
+        "area",
+        "base",
+        "br",
+        "col",
+        "embed",
+        "hr",
+        "img",
+        "input",
+        "link",
+        "meta",
+        "source",
+        "track",
+        "wbr",
+    }
+)
+
+
+class RichTextTreeBuilder(HTMLParser):
+    """
+    Parse expanded rich text into a list of nodes. Elements are
+    ``{"type": "element", "tag": ..., "attrs": {...}, "children": [...]}`` and
+    text is ``{"type": "text", "value": ...}``, with entities decoded.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.nodes = []
+        # The open elements, and the list their content is added to
+        self._stack = [(None, self.nodes)]
+
+    def _add_element(self, tag, attrs) -> list:
+        element = {
+            "type": "element",
+            "tag": tag,
+            "attrs": {name: value or "" for name, value in attrs},
+            "children": [],
+        }
+        self._stack[-1][1].append(element)
+        return element["children"]
+
+    def handle_starttag(self, tag, attrs):
+        children = self._add_element(tag, attrs)
+        if tag not in VOID_ELEMENTS:
+            self._stack.append((tag, children))
+
+    def handle_startendtag(self, tag, attrs):
+        self._add_element(tag, attrs)
+
+    def handle_endtag(self, tag):
+        # Close the innermost open element with this tag, and any left open
+        # inside it. Stray closing tags are ignored.
+        for i in range(len(self._stack) - 1, 0, -1):
+            if self._stack[i][0] == tag:
+                del self._stack[i:]
+                return
+
+    def handle_data(self, data):
+        nodes = self._stack[-1][1]
+        if nodes and nodes[-1]["type"] == "text":
+            nodes[-1]["value"] += data
+        else:
+            nodes.append({"type": "text", "value": data})
+
+
+def parse_rich_text_html(html: str) -> list[dict]:
+    builder = RichTextTreeBuilder()
+    builder.feed(html)
+    builder.close()
+    return builder.nodes
+
+
+def expand_rich_text_json_many(sources: list[str]) -> list[str]:
+    """
+    Render rich text sources to the JSON encoded tree of their expanded HTML,
+    see ``RichTextTreeBuilder``.
+    """
+    return [
+        json.dumps(parse_rich_text_html(html)) for html in expand_db_html_many(sources)
+    ]
+
+
+def format_rich_text_many(
+    sources: list[str], output_format: str
+) -> list[RenderedRichText]:
+    """
+    Return rich text sources in ``output_format``: ``html``, ``json``, or any
+    other value for the sources as is. Rendered values are cached, see
+    ``grapple.rich_text_cache``.
+    """
+    if output_format == "html":
+        render_many = expand_rich_text_many
+    elif output_format == "json":
+        render_many = expand_rich_text_json_many
+    else:
+        return [RenderedRichText(source) for source in sources]
+
+    return [
+        RenderedRichText(value)
+        for value in rich_text_cache.get_many(list(sources), output_format, render_many)
+    ]
+
+
+def format_rich_text(
+    rich_text: Union[str, WagtailRichText], output_format: Optional[str] = None
+) -> RenderedRichText:
+    """
+    Return a rich text value in ``output_format``, by default the
+    ``RICHTEXT_FORMAT`` setting.
+    """
+    if isinstance(rich_text, WagtailRichText):
+        rich_text = rich_text.source
+    output_format = output_format or grapple_settings.RICHTEXT_FORMAT
+    return format_rich_text_many([rich_text or ""], output_format)[0]
+
+
+def load_rich_text(
+    info, item, field_name=None, output_format=None
+) -> Optional[RenderedRichText]:
+    """
+    Return the rich text of ``item`` in ``output_format``, by default the
+    ``RICHTEXT_FORMAT`` setting, rendered along with the other rich text of the
+    request. Returns None if ``item`` holds no rich text source.
+    """
+    from ..loaders import RichTextLoader
+
+    output_format = output_format or grapple_settings.RICHTEXT_FORMAT
+    loader = RichTextLoader.for_request(info, field_name, output_format)
+    if loader.get_key(item) is None:
+        return None
+    return loader.load(item)
+
+
+def get_rich_text_format_argument():
+    return graphene.Argument(
+        RichTextFormatEnum,
+        description=_(
+            "The output format, by default the `RICHTEXT_FORMAT` setting. `JSON` returns the tree "
+            "of the HTML, with links and embeds expanded, encoded as JSON."
+        ),
+    )
 
 
 class RichText(String):
@@ -11,14 +233,10 @@ class RichText(String):
     def coerce_rich_text(rich_text: Union[str, WagtailRichText]):
         # When serializing a model instance, we get a str. When serializing a
         # RichTextBlock instance, its an instance of wagtail.rich_text.RichText already.
-        if grapple_settings.RICHTEXT_FORMAT == "html":
-            if isinstance(rich_text, str):
-                return WagtailRichText(rich_text).__html__()
-            return rich_text.__html__()
-        elif isinstance(rich_text, str):
+        # Values already in the requested format are returned as is.
+        if isinstance(rich_text, RenderedRichText):
             return rich_text
-        else:
-            return rich_text.source
+        return format_rich_text(rich_text)
 
     serialize = coerce_rich_text
     parse_value = coerce_rich_text
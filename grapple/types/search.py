@@ -1,11 +1,79 @@
+import heapq
+
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
 import graphene
 
 from django.apps import apps
+from django.db import connection, connections
+from django.utils.translation import gettext_lazy as _
 from wagtail.documents import get_document_model
 from wagtail.images import get_image_model
+from wagtail.models import Page as WagtailPage
 from wagtail.search.backends import get_search_backend
+from wagtail.search.index import class_is_indexed
+from wagtail.search.utils import parse_query_string
 
+from ..loaders import track_results
 from ..registry import registry
+from ..settings import grapple_settings
+from ..utils import add_search_hit
+from .structures import PositiveInt, SearchOperatorEnum
+
+
+def get_searchable_models() -> list:
+    """
+    Return the indexed models of the documents, images and registered apps that
+    have a GraphQL type, in the order they should be searched.
+    """
+    models = [get_document_model(), get_image_model()]
+    for app in registry.apps:
+        models += apps.all_models[app].values()
+
+    return [
+        model
+        for model in dict.fromkeys(models)
+        if model in registry.class_models and class_is_indexed(model)
+    ]
+
+
+def search_model(model, query, operator: str, limit: int) -> list:
+    """
+    Search the objects of a model, returning at most ``limit`` of them ordered
+    by relevance, with their score if the database can provide it.
+    """
+    qs = model._default_manager.all()
+    if issubclass(model, WagtailPage):
+        qs = qs.live().public()
+
+    results = get_search_backend().search(query, qs, operator=operator)
+    if connection.vendor != "sqlite":
+        results = results.annotate_score("search_score")
+    return list(results[:limit])
+
+
+def search_model_in_thread(*args) -> list:
+    try:
+        return search_model(*args)
+    finally:
+        # Each thread has its own database connections.
+        connections.close_all()
+
+
+def merge_search_results(results_by_model: list[list]):
+    """
+    Lazily merge the results of each model, which are ordered by relevance, by
+    their score. Without scores, results are interleaved by rank instead.
+    """
+
+    def get_key(rank_and_result):
+        rank, result = rank_and_result
+        return -(getattr(result, "search_score", None) or 0), rank
+
+    ranked_results = [enumerate(results) for results in results_by_model]
+    for _rank, result in heapq.merge(*ranked_results, key=get_key):
+        yield result
 
 
 def SearchQuery():
@@ -17,22 +85,73 @@ def SearchQuery():
 
         class Mixin:
             search = graphene.List(
-                graphene.NonNull(Search), query=graphene.String(), required=True
+                graphene.NonNull(Search),
+                query=graphene.String(),
+                limit=graphene.Argument(
+                    PositiveInt, description=_("Limit a number of resulting objects.")
+                ),
+                offset=graphene.Argument(
+                    PositiveInt,
+                    description=_(
+                        "Number of records skipped from the beginning of the results set."
+                    ),
+                ),
+                search_operator=graphene.Argument(
+                    SearchOperatorEnum,
+                    description=_(
+                        "Specify search operator (and/or), see: https://docs.wagtail.org/en/stable/topics/search/searching.html#search-operator"
+                    ),
+                    default_value="and",
+                ),
+                required=True,
             )
 
-            # Return just one setting base on name param.
-            def resolve_search(self, info, **kwargs):
-                query = kwargs.get("query")
-                if query:
-                    s = get_search_backend()
-                    results = []
-                    models = [get_document_model(), get_image_model()]
-                    for app in registry.apps:
-                        models += apps.all_models[app].values()
-                    for model in models:
-                        results += s.search(query, model)
-                    return results
-                return None
+            def resolve_search(
+                self,
+                info,
+                query=None,
+                limit=None,
+                offset=None,
+                search_operator="and",
+                **kwargs,
+            ):
+                """
+                Search all the indexed models, concurrently, and return the most
+                relevant results across them.
+                """
+                if not query:
+                    return []
+
+                if grapple_settings.ADD_SEARCH_HIT:
+                    add_search_hit(query)
+
+                search_operator = str(search_operator)
+                _filters, parsed_query = parse_query_string(query, search_operator)
+                offset = int(offset or 0)
+                limit = min(
+                    int(limit or grapple_settings.PAGE_SIZE),
+                    grapple_settings.MAX_PAGE_SIZE,
+                )
+
+                # No model can contribute more than the whole slice.
+                models = get_searchable_models()
+                args = [
+                    (model, parsed_query, search_operator, offset + limit)
+                    for model in models
+                ]
+                max_workers = min(len(models), grapple_settings.SEARCH_MAX_WORKERS)
+                if max_workers > 1:
+                    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                        results_by_model = list(
+                            executor.map(lambda a: search_model_in_thread(*a), args)
+                        )
+                else:
+                    results_by_model = [search_model(*a) for a in args]
+
+                results = merge_search_results(results_by_model)
+                return track_results(
+                    info, list(islice(results, offset, offset + limit))
+                )
 
         return Mixin
 
@@ -1,19 +1,137 @@
+from itertools import islice
+
 import graphene
 
+from django.core.exceptions import FieldError
+from django.utils.translation import gettext_lazy as _
+from graphql import GraphQLError
+from wagtail.search.index import class_is_indexed
+from wagtail.search.utils import parse_query_string
+
+from ..loaders import track_results
+from ..optimizer import optimize_queryset
 from ..registry import registry
+from ..settings import grapple_settings
+from ..utils import add_search_hit, get_order_by_fields, merge_ordered
 from .interfaces import get_snippet_interface
+from .structures import QuerySetList
+
+
+def get_snippet_models(snippet_type=None, content_type=None) -> list:
+    """
+    Return the registered snippet models, optionally filtered by comma separated
+    lists of snippet types (model names) and content types (`app.Model`).
+    """
+    models = [snippet._meta.model for snippet in registry.snippets]
+
+    if snippet_type:
+        snippet_types = {name.strip() for name in snippet_type.split(",")}
+        models = [model for model in models if model.__name__ in snippet_types]
+
+    if content_type:
+        content_types = {label.strip().lower() for label in content_type.split(",")}
+        models = [model for model in models if model._meta.label_lower in content_types]
+
+    return models
+
+
+def can_order_by(model, order_by: list[str]) -> bool:
+    """
+    Whether the QuerySets of ``model`` can be ordered by the given fields.
+    """
+    try:
+        model._default_manager.order_by(*order_by)
+    except FieldError:
+        return False
+    return True
 
 
 def SnippetsQuery():
     class Mixin:
-        snippets = graphene.List(graphene.NonNull(get_snippet_interface), required=True)
+        snippets = QuerySetList(
+            graphene.NonNull(get_snippet_interface),
+            snippet_type=graphene.Argument(
+                graphene.String,
+                description=_(
+                    "Filter by snippet type, e.g. `Advert`. Accepts a comma separated list of snippet types."
+                ),
+            ),
+            content_type=graphene.Argument(
+                graphene.String,
+                description=_(
+                    "Filter by content type. Uses the `app.Model` notation. Accepts a comma separated list of content types."
+                ),
+            ),
+            enable_search=True,
+            required=True,
+        )
+
+        def resolve_snippets(
+            self,
+            info,
+            snippet_type=None,
+            content_type=None,
+            limit=None,
+            offset=None,
+            order=None,
+            search_query=None,
+            search_operator="and",
+            id=None,
+            **kwargs,
+        ):
+            """
+            Return the snippets of all the registered snippet models. Each model is
+            filtered, ordered and limited in the database, then the results are
+            merged, only querying the models needed to fill the requested slice.
+            Models lacking the ``order`` fields are left out.
+            """
+            models = get_snippet_models(snippet_type, content_type)
+            if search_query:
+                # Only search the snippet models that are indexed.
+                models = [model for model in models if class_is_indexed(model)]
+                if grapple_settings.ADD_SEARCH_HIT:
+                    add_search_hit(search_query)
+                _filters, parsed_query = parse_query_string(
+                    search_query, str(search_operator)
+                )
+
+            if order is not None:
+                order_by = get_order_by_fields(order)
+                # Only order the snippet models which have all the order fields.
+                orderable_models = [
+                    model for model in models if can_order_by(model, order_by)
+                ]
+                if models and not orderable_models:
+                    raise GraphQLError(
+                        f"No snippet type can be ordered by '{order}'. Filter the "
+                        "snippets by snippetType or contentType to order by the "
+                        "fields of specific snippet types."
+                    )
+                models = orderable_models
+
+            offset = int(offset or 0)
+            # All snippets are returned unless a limit is given.
+            stop = None
+            if limit is not None:
+                stop = offset + min(int(limit), grapple_settings.MAX_PAGE_SIZE)
 
-        def resolve_snippets(self, info, **kwargs):
-            snippet_objects = []
-            for snippet in registry.snippets:
-                for object in snippet._meta.model.objects.all():
-                    snippet_objects.append(object)
+            querysets = []
+            for model in models:
+                qs = optimize_queryset(model._default_manager.all(), info)
+                if id is not None:
+                    qs = qs.filter(pk=id)
+                if order is not None:
+                    qs = qs.order_by(*order_by)
+                if search_query:
+                    qs = qs.search(
+                        parsed_query,
+                        order_by_relevance=order is None,
+                        operator=search_operator,
+                    )
+                # No model can contribute more than the whole slice.
+                querysets.append(qs[:stop])
 
-            return snippet_objects
+            snippets = merge_ordered(querysets, order)
+            return track_results(info, list(islice(snippets, offset, stop)))
 
     return Mixin
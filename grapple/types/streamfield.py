@@ -13,13 +13,22 @@ from graphene.types import Scalar
 from graphene_django.converter import convert_django_field
 from wagtail import blocks
 from wagtail.embeds.blocks import EmbedValue
-from wagtail.embeds.embeds import get_embed
-from wagtail.embeds.exceptions import EmbedException
 from wagtail.fields import StreamField
 
+from ..embeds import get_embeds
+from ..loaders import (
+    ChooserBlockLoader,
+    EmbedLoader,
+    SpecificPageLoader,
+    track_results,
+)
 from ..registry import registry
 from .interfaces import StreamFieldInterface
-from .rich_text import RichText as RichTextType
+from .rich_text import (
+    format_rich_text,
+    get_rich_text_format_argument,
+    load_rich_text,
+)
 
 
 class GenericStreamFieldInterface(Scalar):
@@ -58,6 +67,16 @@ def generate_streamfield_union(graphql_types):
     return StreamfieldUnion
 
 
+def resolve_chooser_value(block_item, info):
+    """
+    Return the value of a chooser block, loading it in bulk if it is still a raw id.
+    """
+    loader = ChooserBlockLoader.for_request(info)
+    if loader.get_key(block_item) is None:
+        return block_item.value
+    return loader.load(block_item)
+
+
 class StructBlockItem:
     id = None
     block = None
@@ -90,14 +109,20 @@ class StructBlock(graphene.ObjectType):
 
         for field, value in stream_data.items():
             block = dict(child_blocks)[field]
-            if isinstance(value, int) and (
-                issubclass(type(block), blocks.ChooserBlock)
-                or not issubclass(type(block), blocks.StructBlock)
+            if (
+                isinstance(value, int)
+                and not issubclass(type(block), blocks.ChooserBlock)
+                and not issubclass(type(block), blocks.StructBlock)
             ):
                 value = block.to_python(value)
 
             stream_blocks.append(StructBlockItem(field, block, value))
 
+        # Chooser values given as ids are loaded together, one query per model.
+        track_results(info, stream_blocks)
+        for item in stream_blocks:
+            item.value = resolve_chooser_value(item, info)
+
         return stream_blocks
 
 
@@ -210,13 +235,17 @@ class TimeBlock(DateBlock):
 
 
 class RichTextBlock(graphene.ObjectType):
-    value = graphene.String(required=True)
+    value = graphene.String(required=True, format=get_rich_text_format_argument())
 
     class Meta:
         interfaces = (StreamFieldInterface,)
 
-    def resolve_value(self, info, **kwargs):
-        return RichTextType.serialize(self.value.source)
+    def resolve_value(self, info, format=None, **kwargs):
+        output_format = str(format) if format else None
+        rendered = load_rich_text(info, self.value, output_format=output_format)
+        if rendered is not None:
+            return rendered
+        return format_rich_text(self.value.source, output_format)
 
 
 class RawHTMLBlock(graphene.ObjectType):
@@ -257,11 +286,18 @@ def get_embed_url(instance):
     return instance.value.url if hasattr(instance, "value") else instance.url
 
 
-def get_embed_object(instance):
-    try:
-        return get_embed(get_embed_url(instance))
-    except EmbedException:
-        pass
+def get_embed_object(instance, info=None):
+    """
+    Return the Wagtail embed of an embed block value, or None if it cannot be
+    embedded. With ``info``, embeds are loaded once per URL for the request.
+    """
+    if info is not None:
+        loader = EmbedLoader.for_request(info)
+        if loader.get_key(instance) is not None:
+            return loader.load(instance)
+
+    url = get_embed_url(instance)
+    return get_embeds([url]).get(url) if url else None
 
 
 class EmbedBlock(graphene.ObjectType):
@@ -285,12 +321,12 @@ class EmbedBlock(graphene.ObjectType):
         return EmbedBlock.resolve_raw_value(self, info, **kwargs)
 
     def resolve_embed(self: EmbedValue, info, **kwargs) -> Optional[str]:
-        embed = get_embed_object(self)
+        embed = get_embed_object(self, info)
         if embed:
             return embed.html
 
     def resolve_raw_embed(self: EmbedValue, info, **kwargs) -> Optional[str]:
-        embed = get_embed_object(self)
+        embed = get_embed_object(self, info)
         if embed:
             return {
                 "title": embed.title,
@@ -362,7 +398,7 @@ def register_streamfield_blocks():
             interfaces = (StreamFieldInterface,)
 
         def resolve_page(self, info, **kwargs):
-            return self.value.specific
+            return SpecificPageLoader.for_request(info).load(self.value)
 
     class DocumentChooserBlock(graphene.ObjectType):
         document = graphene.Field(get_document_type(), required=False)
@@ -371,7 +407,7 @@ def register_streamfield_blocks():
             interfaces = (StreamFieldInterface,)
 
         def resolve_document(self, info, **kwargs):
-            return self.value
+            return resolve_chooser_value(self, info)
 
     class ImageChooserBlock(graphene.ObjectType):
         image = graphene.Field(get_image_type(), required=False)
@@ -380,7 +416,7 @@ def register_streamfield_blocks():
             interfaces = (StreamFieldInterface,)
 
         def resolve_image(self, info, **kwargs):
-            return self.value
+            return resolve_chooser_value(self, info)
 
     class ImageBlock(graphene.ObjectType):
         image = graphene.Field(get_image_type, required=False)
@@ -415,7 +451,7 @@ def register_streamfield_blocks():
             interfaces = (StreamFieldInterface,)
 
         def resolve_snippet(self, info, **kwargs):
-            return self.value
+            return resolve_chooser_value(self, info)
 
     registry.streamfield_blocks.update(
         {
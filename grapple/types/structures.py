@@ -5,6 +5,7 @@ import graphene_django
 
 from django.utils.translation import gettext_lazy as _
 from graphene.types import Int
+from graphql import GraphQLError
 from taggit.managers import _TaggableManager
 from wagtail.search.index import class_is_indexed
 
@@ -15,10 +16,20 @@ class PositiveInt(Int):
     """
 
     @staticmethod
-    def parse_literal(ast, _variables=None):
-        return_value = Int.parse_literal(ast, _variables=_variables)
-        if return_value is not None and return_value >= 0:
-            return return_value
+    def check_positive(value):
+        if isinstance(value, int) and value < 0:
+            raise GraphQLError(
+                f"PositiveInt cannot represent a negative value: {value}"
+            )
+        return value
+
+    @classmethod
+    def parse_literal(cls, ast, _variables=None):
+        return cls.check_positive(Int.parse_literal(ast, _variables=_variables))
+
+    @classmethod
+    def parse_value(cls, value):
+        return cls.check_positive(Int.parse_value(value))
 
 
 class SearchOperatorEnum(graphene.Enum):
@@ -36,6 +47,29 @@ class SearchOperatorEnum(graphene.Enum):
         return self.value
 
 
+class RichTextFormatEnum(graphene.Enum):
+    """
+    Enum for the output format of rich text.
+    """
+
+    HTML = "html"
+    RAW = "raw"
+    JSON = "json"
+
+    def __str__(self):
+        return self.value
+
+
+class TotalStrategyEnum(graphene.Enum):
+    """
+    Enum for the way the total of a paginated query set was computed.
+    """
+
+    EXACT = "exact"
+    CACHED = "cached"
+    ESTIMATED = "estimated"
+
+
 class QuerySetList(graphene.List):
     """
     List type with arguments used by Django's query sets.
@@ -163,6 +197,12 @@ class PaginationType(graphene.ObjectType):
     prev_page = PositiveInt()
     next_page = PositiveInt()
     total_pages = PositiveInt(required=True)
+    total_strategy = graphene.Field(
+        TotalStrategyEnum,
+        description=_(
+            "How `total` was computed: counted, read from the cache or estimated."
+        ),
+    )
 
 
 class BasePaginatedType(graphene.ObjectType):
@@ -275,3 +315,109 @@ def PaginatedQuerySet(of_type, type_class, **kwargs):
             name = type_name + "PaginatedType"
 
     return graphene.Field(PaginatedType, **kwargs)
+
+
+class PageInfoType(graphene.ObjectType):
+    """
+    GraphQL type for the page info of a cursor paginated QuerySet.
+    """
+
+    has_next_page = graphene.Boolean(required=True)
+    has_previous_page = graphene.Boolean(required=True)
+    start_cursor = graphene.String()
+    end_cursor = graphene.String()
+
+
+class BaseConnectionType(graphene.ObjectType):
+    """
+    GraphQL type for cursor paginated QuerySet result.
+    """
+
+    items = graphene.List(graphene.String)
+    page_info = graphene.Field(PageInfoType)
+
+
+def ConnectionQuerySet(of_type, type_class, **kwargs):
+    """
+    Cursor paginated QuerySet type with arguments used by Django's query sets.
+    Unlike :func:`PaginatedQuerySet`, objects are filtered from the cursor
+    rather than skipped, so every page costs the same to fetch.
+
+    This type sets the following arguments on itself:
+
+    * ``id``
+    * ``in_menu``
+    * ``first``
+    * ``after``
+    * ``last``
+    * ``before``
+    * ``order``
+
+    :param enable_order: Enable ordering via query argument.
+    :type enable_order: bool
+    """
+
+    enable_in_menu = kwargs.pop("enable_in_menu", False)
+    enable_order = kwargs.pop("enable_order", True)
+    required = kwargs.get("required", False)
+    type_name = type_class if isinstance(type_class, str) else type_class.__name__
+    type_name = type_name.lstrip("Stub")
+
+    # Check if the type is a Django model type. Do not perform the
+    # check if value is lazy.
+    if inspect.isclass(of_type) and not issubclass(
+        of_type, graphene_django.DjangoObjectType
+    ):
+        raise TypeError(
+            f"{of_type} is not a subclass of DjangoObjectType and it "
+            "cannot be used with ConnectionQuerySet."
+        )
+
+    # Enable in_menu for Page models.
+    if enable_in_menu is True and "in_menu" not in kwargs:
+        kwargs["in_menu"] = graphene.Argument(
+            graphene.Boolean,
+            description=_(
+                "Filter pages by Page.show_in_menus property. That is, the "
+                "'show in menus' checkbox is checked in the page editor."
+            ),
+        )
+
+    if "first" not in kwargs:
+        kwargs["first"] = graphene.Argument(
+            PositiveInt,
+            description=_("The maximum number of items to return after the cursor."),
+        )
+    if "after" not in kwargs:
+        kwargs["after"] = graphene.Argument(
+            graphene.String,
+            description=_("Return the items after this cursor, e.g. `endCursor`."),
+        )
+    if "last" not in kwargs:
+        kwargs["last"] = graphene.Argument(
+            PositiveInt,
+            description=_("The maximum number of items to return before the cursor."),
+        )
+    if "before" not in kwargs:
+        kwargs["before"] = graphene.Argument(
+            graphene.String,
+            description=_("Return the items before this cursor, e.g. `startCursor`."),
+        )
+
+    # Enable ordering of the queryset
+    if enable_order is True and "order" not in kwargs:
+        kwargs["order"] = graphene.Argument(
+            graphene.String, description=_("Use the Django QuerySet order_by format.")
+        )
+
+    if "id" not in kwargs:
+        kwargs["id"] = graphene.Argument(graphene.ID, description=_("Filter by ID"))
+
+    class ConnectionType(BaseConnectionType):
+        items = graphene.List(of_type, required=required)
+        page_info = graphene.Field(PageInfoType, required=required)
+
+        class Meta:
+            name = type_name + "Connection"
+
+    return graphene.Field(ConnectionType, **kwargs)
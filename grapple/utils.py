@@ -1,16 +1,41 @@
+import datetime
+import hashlib
+import heapq
+import json
+import uuid
+
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections.abc import Iterable, Iterator
+from decimal import Decimal
+from itertools import chain
 from typing import Literal, Optional
 
 from django.conf import settings
-from django.core.exceptions import ImproperlyConfigured
+from django.core.cache import caches
+from django.core.exceptions import (
+    EmptyResultSet,
+    ImproperlyConfigured,
+    ValidationError,
+)
 from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
-from django.db import connection
+from django.db import connection, connections
+from django.db.models import F, Q, QuerySet
 from graphql import GraphQLError
 from wagtail.models import Site
 from wagtail.search.index import class_is_indexed
 from wagtail.search.utils import parse_query_string
 
+from .loaders import track_results
+from .optimizer import optimize_queryset
+from .search_cache import cache_search_results
+from .selection import iter_field_nodes, iter_selected_fields
 from .settings import grapple_settings
-from .types.structures import BasePaginatedType, PaginationType
+from .types.structures import (
+    BaseConnectionType,
+    BasePaginatedType,
+    PageInfoType,
+    PaginationType,
+)
 
 
 if grapple_settings.ADD_SEARCH_HIT:
@@ -80,6 +105,49 @@ def resolve_site_by_hostname(
         return None
 
 
+def add_search_hit(search_query: str):
+    """
+    Log a search query so that Wagtail can suggest promoted results. Hits are
+    buffered and recorded in batches if `SEARCH_HIT_FLUSH_INTERVAL` is set.
+    """
+    if grapple_settings.SEARCH_HIT_FLUSH_INTERVAL is not None:
+        from .search_hits import search_hit_buffer
+
+        search_hit_buffer.add(search_query)
+    else:
+        Query.get(search_query).add_hit()
+
+
+def search_queryset(
+    qs, search_query, search_operator="and", *, order_by_relevance=True
+):
+    """
+    Search a query set using Wagtail search, logging the search query if
+    `ADD_SEARCH_HIT` is set and caching the results if `SEARCH_CACHE` is set.
+    """
+    if grapple_settings.ADD_SEARCH_HIT:
+        add_search_hit(search_query)
+
+    search_operator = str(search_operator)
+    filters, parsed_query = parse_query_string(search_query, search_operator)
+
+    results = qs.search(
+        parsed_query,
+        order_by_relevance=order_by_relevance,
+        operator=search_operator,
+    )
+    if connection.vendor != "sqlite":
+        results = results.annotate_score("search_score")
+
+    return cache_search_results(
+        qs,
+        results,
+        search_query,
+        search_operator,
+        order_by_relevance=order_by_relevance,
+    )
+
+
 def _sliced_queryset(qs, limit=None, offset=None):
     offset = int(offset or 0)
     # default
@@ -126,7 +194,11 @@ def resolve_queryset(
     :type search_operator: "and" | "or"
     """
 
-    qs = qs.all() if id is None else qs.filter(pk=id)
+    if id is not None:
+        qs = qs.filter(pk=id)
+    elif not isinstance(qs, QuerySet):
+        qs = qs.all()
+    qs = optimize_queryset(qs, info)
 
     # filter by in_menu
     if in_menu is not None:
@@ -150,28 +222,156 @@ def resolve_queryset(
         if not class_is_indexed(qs.model):
             raise TypeError("This data type is not searchable by Wagtail.")
 
-        if grapple_settings.ADD_SEARCH_HIT:
-            query = Query.get(search_query)
-            query.add_hit()
+        qs = search_queryset(
+            qs, search_query, search_operator, order_by_relevance=order_by_relevance
+        )
 
-        filters, parsed_query = parse_query_string(search_query, str(search_operator))
+    return track_results(info, _sliced_queryset(qs, limit, offset))
 
-        qs = qs.search(
-            parsed_query,
-            order_by_relevance=order_by_relevance,
-            operator=search_operator,
-        )
-        if connection.vendor != "sqlite":
-            qs = qs.annotate_score("search_score")
 
-    return _sliced_queryset(qs, limit, offset)
+def can_batch_queryset_arguments(search_query=None, order=None, **kwargs) -> bool:
+    """
+    Whether the :class:`~grapple.types.structures.QuerySetList` arguments can be
+    applied to objects that were batch loaded, rather than to a query set.
+    Searching and custom ordering need the database.
+    """
+    return not search_query and order is None
+
+
+def resolve_loaded_list(
+    objects, info, limit=None, offset=None, id=None, in_menu=None, **kwargs
+):
+    """
+    Apply the ``id``, ``in_menu``, ``limit`` and ``offset`` arguments used by
+    :class:`~grapple.types.structures.QuerySetList` to a list of already loaded
+    objects, as :func:`resolve_queryset` does for query sets.
+    """
+    if id is not None:
+        objects = [obj for obj in objects if str(obj.pk) == str(id)]
+
+    if in_menu is not None:
+        objects = [obj for obj in objects if obj.show_in_menus == in_menu]
 
+    return track_results(info, _sliced_queryset(objects, limit, offset))
 
-def get_paginated_result(qs, page, per_page):
+
+def is_pagination_total_selected(info) -> bool:
+    """
+    Whether the ``total`` or ``totalPages`` pagination fields, which need the
+    objects to be counted, are selected below the paginated field being resolved.
+    """
+    for node in iter_selected_fields(info, recursive=False):
+        if node.name.value != "pagination":
+            continue
+        for _type_condition, field_node in iter_field_nodes(
+            node.selection_set, info.fragments
+        ):
+            if field_node.name.value in {"total", "totalPages", "total_pages"}:
+                return True
+    return False
+
+
+def get_total_cache_key(qs) -> Optional[str]:
     """
-    Returns a paginated result.
+    The key identifying the count of a query set, from its model and filters.
     """
+    try:
+        sql = str(qs.order_by().query)
+    except EmptyResultSet:
+        return None
+
+    signature = f"{qs.model._meta.label}\n{sql}"
+    return (
+        "grapple:total:"
+        + hashlib.md5(signature.encode(), usedforsecurity=False).hexdigest()
+    )
+
+
+def estimate_total(qs) -> Optional[int]:
+    """
+    Return the number of rows of a query set estimated by the PostgreSQL query
+    planner, or None if it cannot be estimated.
+    """
+    if not isinstance(qs, QuerySet) or connections[qs.db].vendor != "postgresql":
+        return None
+
+    try:
+        sql, params = qs.order_by().query.get_compiler(using=qs.db).as_sql()
+    except EmptyResultSet:
+        return 0
+
+    with connections[qs.db].cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def get_total(qs, strategy: Optional[str] = None) -> tuple[int, str]:
+    """
+    Count the objects of a query set with the given strategy, defaulting to the
+    ``PAGINATION_TOTAL_STRATEGY`` setting, and return the total along with the
+    strategy that was actually used:
+
+    * ``exact`` counts the objects.
+    * ``cached`` reads the count from the cache, counting the objects on a miss.
+    * ``estimated`` asks the PostgreSQL query planner, counting the objects when
+      the estimate is below ``PAGINATION_TOTAL_ESTIMATE_THRESHOLD`` or if the
+      database is not PostgreSQL.
+    """
+    strategy = str(strategy or grapple_settings.PAGINATION_TOTAL_STRATEGY)
+
+    if strategy == "estimated":
+        total = estimate_total(qs)
+        if (
+            total is not None
+            and total >= grapple_settings.PAGINATION_TOTAL_ESTIMATE_THRESHOLD
+        ):
+            return total, "estimated"
+
+    elif strategy == "cached" and isinstance(qs, QuerySet):
+        cache = caches[grapple_settings.PAGINATION_TOTAL_CACHE]
+        cache_key = get_total_cache_key(qs)
+        if cache_key is None:
+            return 0, "exact"
+
+        total = cache.get(cache_key)
+        if total is not None:
+            return total, "cached"
+        total = qs.count()
+        cache.set(cache_key, total, timeout=grapple_settings.PAGINATION_TOTAL_TIMEOUT)
+        return total, "exact"
+
+    return len(qs) if isinstance(qs, (list, tuple)) else qs.count(), "exact"
+
+
+def get_paginated_result(qs, page, per_page, *, count=True, total_strategy=None):
+    """
+    Returns a paginated result. Unless ``count`` is set, the objects are only
+    counted if the page is out of range, and ``total`` and ``total_pages`` are
+    left empty.
+    """
+    if not count and page >= 1:
+        offset = (page - 1) * per_page
+        # Fetch one more object to find out whether there is a next page.
+        items = list(qs[offset : offset + per_page + 1])
+        if items or page == 1:
+            return BasePaginatedType(
+                items=items[:per_page],
+                pagination=PaginationType(
+                    total=None,
+                    count=len(items[:per_page]),
+                    per_page=per_page,
+                    current_page=page,
+                    prev_page=page - 1 if page > 1 else None,
+                    next_page=page + 1 if len(items) > per_page else None,
+                    total_pages=None,
+                ),
+            )
+
     paginator = Paginator(qs, per_page)
+    paginator.count, total_strategy = get_total(qs, total_strategy)
 
     try:
         # If the page exists and the page is an int
@@ -196,6 +396,7 @@ def get_paginated_result(qs, page, per_page):
             ),
             next_page=page_obj.next_page_number() if page_obj.has_next() else None,
             total_pages=paginator.num_pages,
+            total_strategy=total_strategy,
         ),
     )
 
@@ -209,6 +410,7 @@ def resolve_paginated_queryset(
     order=None,
     search_query=None,
     search_operator="and",
+    total_strategy=None,
     **kwargs,
 ):
     """
@@ -231,13 +433,20 @@ def resolve_paginated_queryset(
     :param search_operator: The operator to use when combining search terms.
                             Defaults to "and".
     :type search_operator: "and" | "or"
+    :param total_strategy: How to count the objects, see :func:`get_total`.
+                           Defaults to the ``PAGINATION_TOTAL_STRATEGY`` setting.
+    :type total_strategy: "exact" | "cached" | "estimated"
     """
     page = int(page or 1)
     per_page = min(
         int(per_page or grapple_settings.PAGE_SIZE), grapple_settings.MAX_PAGE_SIZE
     )
 
-    qs = qs.all() if id is None else qs.filter(pk=id)
+    if id is not None:
+        qs = qs.filter(pk=id)
+    elif not isinstance(qs, QuerySet):
+        qs = qs.all()
+    qs = optimize_queryset(qs, info, items_field="items")
 
     # order_by_relevance will always take precedence over an existing order_by in the Postgres backend
     # we need to set it to False if we want to specify our own order_by.
@@ -251,21 +460,287 @@ def resolve_paginated_queryset(
         if not class_is_indexed(qs.model):
             raise TypeError("This data type is not searchable by Wagtail.")
 
-        if grapple_settings.ADD_SEARCH_HIT:
-            query = Query.get(search_query)
-            query.add_hit()
+        qs = search_queryset(
+            qs, search_query, search_operator, order_by_relevance=order_by_relevance
+        )
+
+    result = get_paginated_result(
+        qs,
+        page,
+        per_page,
+        count=is_pagination_total_selected(info),
+        total_strategy=total_strategy,
+    )
+    track_results(info, result.items)
+    return result
+
+
+# The types of cursor values which JSON cannot represent, by tag, with functions
+# converting them to and from strings without losing precision.
+CURSOR_VALUE_TYPES = {
+    "datetime": (
+        datetime.datetime,
+        datetime.datetime.isoformat,
+        datetime.datetime.fromisoformat,
+    ),
+    "date": (datetime.date, datetime.date.isoformat, datetime.date.fromisoformat),
+    "time": (datetime.time, datetime.time.isoformat, datetime.time.fromisoformat),
+    "decimal": (Decimal, str, Decimal),
+    "uuid": (uuid.UUID, str, uuid.UUID),
+}
+
+
+def encode_cursor_value(value):
+    # datetime is a subclass of date, so it is checked first.
+    for tag, (value_type, to_string, _from_string) in CURSOR_VALUE_TYPES.items():
+        if isinstance(value, value_type):
+            return [tag, to_string(value)]
+    if isinstance(value, datetime.timedelta):
+        return ["duration", [value.days, value.seconds, value.microseconds]]
+    return value
+
+
+def decode_cursor_value(value):
+    if not isinstance(value, list):
+        return value
+    tag, encoded = value
+    if tag == "duration":
+        days, seconds, microseconds = encoded
+        return datetime.timedelta(days, seconds, microseconds)
+    _value_type, _to_string, from_string = CURSOR_VALUE_TYPES[tag]
+    return from_string(encoded)
+
+
+def encode_cursor(values: list) -> str:
+    """
+    Encode the values of the order key of an object into an opaque cursor.
+    Values JSON cannot represent, such as datetimes, are tagged with their type
+    and encoded in full, so that they compare equal to the stored values.
+    """
+    return urlsafe_b64encode(
+        json.dumps([encode_cursor_value(value) for value in values]).encode()
+    ).decode()
+
+
+def decode_cursor(cursor: str, length: int) -> list:
+    """
+    Decode a cursor made by :func:`encode_cursor` for an order key of ``length``.
+    """
+    try:
+        values = json.loads(urlsafe_b64decode(cursor.encode()))
+        if not isinstance(values, list) or len(values) != length:
+            raise GraphQLError("Invalid cursor.")
+        return [decode_cursor_value(value) for value in values]
+    except (ArithmeticError, KeyError, TypeError, ValueError) as e:
+        raise GraphQLError("Invalid cursor.") from e
+
 
-        filters, parsed_query = parse_query_string(search_query, search_operator)
+def get_cursor_order_key(qs, order: Optional[str] = None) -> list[tuple[str, bool]]:
+    """
+    Return the ``(field, descending)`` pairs ordering a cursor paginated query
+    set: the ``order`` argument, or the query set ordering, ending with the
+    primary key so that every object has a distinct position.
+    """
+    if order is not None:
+        fields = get_order_by_fields(order)
+    else:
+        fields = [
+            field
+            for field in qs.query.order_by or qs.model._meta.ordering
+            if isinstance(field, str)
+        ]
+
+    order_key = []
+    for field in fields:
+        if field == "?":
+            raise GraphQLError("Random ordering cannot be used with cursors.")
+        name = field.lstrip("-")
+        if name in ("pk", qs.model._meta.pk.name):
+            order_key.append(("pk", field.startswith("-")))
+            return order_key
+        order_key.append((name, field.startswith("-")))
+
+    order_key.append(("pk", False))
+    return order_key
+
+
+def get_cursor_filter(order_key, values: list, *, before: bool = False) -> Q:
+    """
+    Filter the objects strictly after (or ``before``) the object with the given
+    order key values. ``None`` values are ordered last, like in :class:`OrderKey`.
+    """
+    nothing = Q(pk__in=[])
+    filters = nothing
+    equal = Q()
+    for (field, descending), value in zip(order_key, values):
+        if value is None:
+            beyond = Q(**{f"{field}__isnull": False}) if before else nothing
+            filters |= equal & beyond
+            equal &= Q(**{f"{field}__isnull": True})
+        else:
+            lookup = "lt" if descending != before else "gt"
+            beyond = Q(**{f"{field}__{lookup}": value})
+            if not before:
+                beyond |= Q(**{f"{field}__isnull": True})
+            filters |= equal & beyond
+            equal &= Q(**{field: value})
+    return filters
 
-        qs = qs.search(
-            parsed_query,
-            order_by_relevance=order_by_relevance,
-            operator=search_operator,
+
+def resolve_connection_queryset(
+    qs,
+    info,
+    first=None,
+    after=None,
+    last=None,
+    before=None,
+    id=None,
+    order=None,
+    in_menu=None,
+    **kwargs,
+):
+    """
+    Add cursor pagination and ordering capabilities to the query. This contains
+    argument names used by
+    :function:`~grapple.types.structures.ConnectionQuerySet`.
+    :param qs: The query set to be modified.
+    :param info: The Graphene info object.
+    :param first: The maximum number of objects to return from the start, or
+                  from the ``after`` cursor.
+    :type first: int
+    :param after: Only return objects after the object of this cursor.
+    :type after: str
+    :param last: The maximum number of objects to return from the end, or up
+                 to the ``before`` cursor.
+    :type last: int
+    :param before: Only return objects before the object of this cursor.
+    :type before: str
+    :param id: Filter by the primary key.
+    :type id: int
+    :param order: Order the query set using the Django QuerySet order_by format.
+    :type order: str
+    :param in_menu: Filter pages by their ``show_in_menus`` property.
+    :type in_menu: bool
+    """
+    if first is not None and last is not None:
+        raise GraphQLError("Pass either `first` or `last`, not both.")
+
+    backwards = last is not None
+    limit = min(
+        int((last if backwards else first) or grapple_settings.PAGE_SIZE),
+        grapple_settings.MAX_PAGE_SIZE,
+    )
+
+    if id is not None:
+        qs = qs.filter(pk=id)
+    elif not isinstance(qs, QuerySet):
+        qs = qs.all()
+    qs = optimize_queryset(qs, info, items_field="items")
+
+    if in_menu is not None:
+        qs = qs.in_menu() if in_menu else qs.not_in_menu()
+
+    # Order by annotations, so that the cursor values can be read from the
+    # objects, and relations are compared by their key.
+    fields = get_cursor_order_key(qs, order)
+    aliases = [f"grapple_cursor_{i}" for i in range(len(fields))]
+    qs = qs.annotate(
+        **{alias: F(field) for alias, (field, _descending) in zip(aliases, fields)}
+    )
+    order_key = [
+        (alias, descending) for alias, (_field, descending) in zip(aliases, fields)
+    ]
+
+    try:
+        if after is not None:
+            qs = qs.filter(
+                get_cursor_filter(order_key, decode_cursor(after, len(order_key)))
+            )
+        if before is not None:
+            qs = qs.filter(
+                get_cursor_filter(
+                    order_key, decode_cursor(before, len(order_key)), before=True
+                )
+            )
+    except (TypeError, ValueError, ValidationError) as e:
+        raise GraphQLError("Invalid cursor.") from e
+
+    # Objects with empty values come last, and first when going backwards.
+    nulls = {"nulls_first": True} if backwards else {"nulls_last": True}
+    qs = qs.order_by(
+        *(
+            F(alias).desc(**nulls) if descending != backwards else F(alias).asc(**nulls)
+            for alias, descending in order_key
         )
-        if connection.vendor != "sqlite":
-            qs = qs.annotate_score("search_score")
+    )
+
+    items = list(qs[: limit + 1])
+    has_more = len(items) > limit
+    items = items[:limit]
+    if backwards:
+        items.reverse()
+
+    def get_cursor(obj):
+        return encode_cursor([getattr(obj, alias) for alias, _descending in order_key])
+
+    return BaseConnectionType(
+        items=track_results(info, items),
+        page_info=PageInfoType(
+            has_next_page=before is not None if backwards else has_more,
+            has_previous_page=has_more if backwards else after is not None,
+            start_cursor=get_cursor(items[0]) if items else None,
+            end_cursor=get_cursor(items[-1]) if items else None,
+        ),
+    )
+
+
+def get_order_by_fields(order: str) -> list[str]:
+    """
+    Split an ``order`` argument using the Django QuerySet order_by format.
+    """
+    return [x.strip() for x in order.split(",")]
+
+
+class OrderKey:
+    """
+    Sort key comparing objects like the database would for the given order_by
+    fields, with empty values last.
+    """
+
+    __slots__ = ("values",)
+
+    def __init__(self, obj, fields: list[str]):
+        self.values = []
+        for field in fields:
+            descending = field.startswith("-")
+            value = obj
+            for attr in field.lstrip("-").split("__"):
+                value = getattr(value, attr, None)
+                if value is None:
+                    break
+            self.values.append((descending, (value is None, value)))
+
+    def __lt__(self, other):
+        for (descending, value), (_descending, other_value) in zip(
+            self.values, other.values
+        ):
+            if value == other_value:
+                continue
+            return other_value < value if descending else value < other_value
+        return False
+
+
+def merge_ordered(iterables: Iterable, order: Optional[str] = None) -> Iterator:
+    """
+    Lazily merge the results of several query sets, each ordered by ``order``,
+    into a single ordered iterator. Without an order, the results are chained.
+    Text is compared by code point, which may differ from the database collation.
+    """
+    if order is None:
+        return chain.from_iterable(iterables)
 
-    return get_paginated_result(qs, page, per_page)
+    fields = get_order_by_fields(order)
+    return heapq.merge(*iterables, key=lambda obj: OrderKey(obj, fields))
 
 
 def get_media_item_url(cls):
@@ -1,4 +1,6 @@
+from django.db import connection
 from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
 from test_grapple import BaseGrappleTestWithIntrospection
 from testapp.factories import AdvertFactory
 
@@ -43,6 +45,40 @@ class AdvertTest(BaseGrappleTestWithIntrospection):
         # Check all the fields
         self.validate_advert(advert)
 
+    def test_advert_all_query_only_loads_selected_columns(self):
+        query = """
+        {
+           adverts {
+                url
+            }
+        }
+        """
+        with CaptureQueriesContext(connection) as queries:
+            executed = self.client.execute(query, context_value=self.request)
+
+        self.assertEqual(executed["data"]["adverts"][0]["url"], self.advert.url)
+        self.assertEqual(len(queries), 1)
+        sql = queries[0]["sql"]
+        self.assertIn('"url"', sql)
+        self.assertNotIn('"rich_text"', sql)
+
+    def test_advert_all_query_custom_source_dependencies(self):
+        query = """
+        {
+           adverts {
+                description
+            }
+        }
+        """
+        # The declared dependencies are loaded with the list, not per advert
+        with self.assertNumQueries(1):
+            executed = self.client.execute(query, context_value=self.request)
+
+        self.assertEqual(
+            executed["data"]["adverts"][0]["description"],
+            f"Advert: {self.advert.text}",
+        )
+
     def test_advert_single_query(self):
         query = """
         query($url: String) {
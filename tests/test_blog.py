@@ -1,15 +1,24 @@
 import datetime
 import decimal
 import json
+import threading
+
+from concurrent.futures import wait
+from io import StringIO
+from unittest import mock
 
 import wagtail_factories
 
 from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
 from django.core.exceptions import ValidationError
+from django.core.management import call_command
 from django.core.validators import URLValidator
+from django.db import connection
 from django.test import override_settings
 from django.test.client import RequestFactory
+from django.test.utils import CaptureQueriesContext
 from test_grapple import BaseGrappleTest
 from testapp.blocks import (
     ButtonBlock,
@@ -29,6 +38,8 @@ from wagtail.blocks.list_block import ListBlock, ListValue
 from wagtail.embeds.blocks import EmbedValue
 from wagtail.rich_text import RichText
 
+from grapple.types.rich_text import expand_rich_text_many, format_rich_text_many
+
 
 class BlogTest(BaseGrappleTest):
     def setUp(self):
@@ -495,6 +506,264 @@ class BlogTest(BaseGrappleTest):
         # Check that we test all blocks that were returned.
         self.assertEqual(len(query_blocks), count)
 
+    def test_blog_body_chooserblocks_num_queries(self):
+        query = """
+        {
+            pages(contentType: "testapp.BlogPage", limit: 100) {
+                ... on BlogPage {
+                    body {
+                        ... on ImageChooserBlock {
+                            image {
+                                id
+                                tags {
+                                    name
+                                }
+                            }
+                        }
+                        ... on ImageGalleryBlock {
+                            images {
+                                image {
+                                    id
+                                }
+                            }
+                        }
+                        ... on SnippetChooserBlock {
+                            snippet {
+                                ... on Advert {
+                                    url
+                                }
+                            }
+                        }
+                    }
+                }
+            }
+        }
+        """
+
+        def add_pages(num_pages):
+            for _ in range(num_pages):
+                BlogPageFactory(
+                    parent=self.home,
+                    body=[
+                        ("image", wagtail_factories.ImageFactory()),
+                        ("image", wagtail_factories.ImageFactory()),
+                        ("advert", AdvertFactory()),
+                        ("gallery", {"title": "Gallery"}),
+                    ],
+                )
+
+        def get_num_queries():
+            with CaptureQueriesContext(connection) as queries:
+                executed = self.client.execute(
+                    query, context_value=RequestFactory().get("/")
+                )
+            self.assertNotIn("errors", executed)
+            return len(queries)
+
+        add_pages(2)
+        num_queries = get_num_queries()
+        add_pages(3)
+        # Chooser blocks of all pages are loaded with one query per block type
+        self.assertEqual(get_num_queries(), num_queries)
+
+    def test_blog_rich_text_num_queries(self):
+        query = """
+        {
+            pages(contentType: "testapp.BlogPage", limit: 100) {
+                ... on BlogPage {
+                    summary
+                    stringSummary
+                    body {
+                        ... on RichTextBlock {
+                            value
+                        }
+                        ... on CalloutBlock {
+                            text
+                        }
+                    }
+                }
+            }
+        }
+        """
+
+        def add_pages(num_pages):
+            for _ in range(num_pages):
+                linked_page = BlogPageFactory(parent=self.home)
+                richtext = f'<p><a linktype="page" id="{linked_page.id}">Link</a></p>'
+                BlogPageFactory(
+                    parent=self.home,
+                    summary=richtext,
+                    body=[
+                        ("paragraph", RichText(richtext)),
+                        ("callout", {"text": RichText(richtext)}),
+                    ],
+                )
+
+        def get_num_queries():
+            with CaptureQueriesContext(connection) as queries:
+                executed = self.client.execute(
+                    query, context_value=RequestFactory().get("/")
+                )
+            self.assertNotIn("errors", executed)
+            return len(queries)
+
+        add_pages(2)
+        num_queries = get_num_queries()
+        add_pages(3)
+        # The links of all the rich text are loaded with one query
+        self.assertEqual(get_num_queries(), num_queries)
+
+    def test_blog_rich_text_batched_rendering(self):
+        sources = [
+            self.richtext_sample,
+            f'<p><a linktype="page" id="{self.blog_page.id}">Blog</a> and '
+            f'<a linktype="page" id="{self.home.id}">Home</a></p>',
+            '<p><a href="https://wagtail.org">External</a><a name="anchor"></a></p>',
+            '<p><a linktype="page" id="0">Missing</a></p>',
+            '<embed embedtype="unknown" /><p>Text</p>',
+            "",
+        ]
+        self.assertEqual(
+            format_rich_text_many(sources, "html"),
+            [RichText(source).__html__() for source in sources],
+        )
+
+    @override_settings(GRAPPLE={**settings.GRAPPLE, "RICHTEXT_CACHE_SIZE": 10})
+    def test_rich_text_cache(self):
+        from grapple.types.rich_text import RichText as RichTextType
+
+        source = f'<a linktype="page" id="{self.blog_page.id}">Blog</a>'
+        with mock.patch(
+            "grapple.types.rich_text.expand_rich_text_many",
+            wraps=expand_rich_text_many,
+        ) as expand:
+            html = RichTextType.serialize(source)
+            self.assertIn(f'href="{self.blog_page.url}"', html)
+            self.assertEqual(RichTextType.serialize(RichText(source)), html)
+            self.assertEqual(expand.call_count, 1)
+
+            # Changing the URL of a page expires the cached rich text
+            self.blog_page.slug = "new-slug"
+            with self.captureOnCommitCallbacks(execute=True):
+                self.blog_page.save_revision().publish()
+            self.blog_page.refresh_from_db()
+            html = RichTextType.serialize(source)
+            self.assertIn(f'href="{self.blog_page.url}"', html)
+            self.assertEqual(expand.call_count, 2)
+
+    @override_settings(
+        GRAPPLE={
+            **settings.GRAPPLE,
+            "RICHTEXT_CACHE_SIZE": 0,
+            "RICHTEXT_CACHE": "default",
+        }
+    )
+    def test_rich_text_django_cache(self):
+        caches["default"].clear()
+        sources = [self.richtext_sample, "<p>Text</p>"]
+        with mock.patch(
+            "grapple.types.rich_text.expand_rich_text_many",
+            wraps=expand_rich_text_many,
+        ) as expand:
+            self.assertEqual(
+                format_rich_text_many(sources, "html"),
+                [RichText(source).__html__() for source in sources],
+            )
+            self.assertEqual(
+                format_rich_text_many(sources[:1], "html"),
+                [RichText(self.richtext_sample).__html__()],
+            )
+            self.assertEqual(expand.call_count, 1)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                wagtail_factories.ImageFactory()
+            format_rich_text_many(sources, "html")
+            self.assertEqual(expand.call_count, 2)
+        caches["default"].clear()
+
+    def test_blog_rich_text_json_format(self):
+        query = """
+        query($id: ID) {
+            page(id: $id) {
+                ... on BlogPage {
+                    summary(format: JSON)
+                    body {
+                        ... on RichTextBlock {
+                            value(format: JSON)
+                        }
+                        ... on CalloutBlock {
+                            text(format: RAW)
+                        }
+                    }
+                }
+            }
+        }
+        """
+        executed = self.client.execute(
+            query,
+            variables={"id": self.blog_page.id},
+            context_value=RequestFactory().get("/"),
+        )
+        self.assertNotIn("errors", executed)
+        page = executed["data"]["page"]
+        expected = [
+            {"type": "text", "value": "Text with a 'link' to "},
+            {
+                "type": "element",
+                "tag": "a",
+                "attrs": {"href": self.home.url},
+                "children": [{"type": "text", "value": "Home"}],
+            },
+        ]
+        self.assertEqual(json.loads(page["summary"]), expected)
+
+        blocks = [block for block in page["body"] if block]
+        self.assertEqual(json.loads(blocks[0]["value"]), expected)
+        self.assertEqual(blocks[1]["text"], self.richtext_sample)
+
+    def test_rich_text_tree(self):
+        from grapple.types.rich_text import parse_rich_text_html
+
+        self.assertEqual(
+            parse_rich_text_html(
+                '<p class="intro">Fish &amp; chips<br>'
+                '<img alt="" src="/fish.png"/><b>Open<i>nested</p>'
+                "stray</span> end"
+            ),
+            [
+                {
+                    "type": "element",
+                    "tag": "p",
+                    "attrs": {"class": "intro"},
+                    "children": [
+                        {"type": "text", "value": "Fish & chips"},
+                        {"type": "element", "tag": "br", "attrs": {}, "children": []},
+                        {
+                            "type": "element",
+                            "tag": "img",
+                            "attrs": {"alt": "", "src": "/fish.png"},
+                            "children": [],
+                        },
+                        {
+                            "type": "element",
+                            "tag": "b",
+                            "attrs": {},
+                            "children": [
+                                {"type": "text", "value": "Open"},
+                                {
+                                    "type": "element",
+                                    "tag": "i",
+                                    "attrs": {},
+                                    "children": [{"type": "text", "value": "nested"}],
+                                },
+                            ],
+                        },
+                    ],
+                },
+                {"type": "text", "value": "stray end"},
+            ],
+        )
+
     def test_blog_body_objectives(self):
         block_type = "ListBlock"
         query_blocks = self.get_blocks_from_body(
@@ -566,6 +835,253 @@ class BlogTest(BaseGrappleTest):
 
         self.fail("VideoBlock type not instantiated in Streamfield")
 
+    def test_blog_embed_loaded_once_per_url(self):
+        query = """
+        query($id: ID) {
+            page(id: $id) {
+                ... on BlogPage {
+                    body {
+                        ...on VideoBlock {
+                            youtubeLink {
+                                embed
+                                rawEmbed
+                            }
+                        }
+                    }
+                }
+            }
+        }
+        """
+        caches["default"].clear()
+        finder = self.get_embed_finder()
+        with mock.patch("wagtail.embeds.embeds.get_finders", return_value=[finder]):
+            executed = self.client.execute(
+                query,
+                variables={"id": self.blog_page.id},
+                context_value=RequestFactory().get("/"),
+            )
+            video = next(block for block in executed["data"]["page"]["body"] if block)
+            self.assertEqual(video["youtubeLink"]["embed"], "<iframe></iframe>")
+            self.assertEqual(
+                json.loads(video["youtubeLink"]["rawEmbed"])["title"],
+                "Wagtail Space 2018",
+            )
+            self.assertEqual(finder.find_embed.call_count, 1)
+
+            # Stored embeds are read from the database
+            with CaptureQueriesContext(connection) as queries:
+                self.client.execute(
+                    query,
+                    variables={"id": self.blog_page.id},
+                    context_value=RequestFactory().get("/"),
+                )
+            embed_queries = [
+                query
+                for query in queries.captured_queries
+                if "wagtailembeds_embed" in query["sql"]
+            ]
+            self.assertEqual(len(embed_queries), 1)
+            self.assertEqual(finder.find_embed.call_count, 1)
+
+    def test_blog_embed_failure_cached(self):
+        from wagtail.embeds.exceptions import EmbedNotFoundException
+
+        query = """
+        query($id: ID) {
+            page(id: $id) {
+                ... on BlogPage {
+                    body {
+                        ...on VideoBlock {
+                            youtubeLink {
+                                embed
+                                rawEmbed
+                            }
+                        }
+                    }
+                }
+            }
+        }
+        """
+        caches["default"].clear()
+        finder = mock.Mock()
+        finder.accept.return_value = True
+        finder.find_embed.side_effect = EmbedNotFoundException
+        with mock.patch("wagtail.embeds.embeds.get_finders", return_value=[finder]):
+            for _ in range(2):
+                executed = self.client.execute(
+                    query,
+                    variables={"id": self.blog_page.id},
+                    context_value=RequestFactory().get("/"),
+                )
+                video = next(
+                    block for block in executed["data"]["page"]["body"] if block
+                )
+                self.assertEqual(
+                    video["youtubeLink"], {"embed": None, "rawEmbed": None}
+                )
+            self.assertEqual(finder.find_embed.call_count, 1)
+
+            with override_settings(
+                GRAPPLE={**settings.GRAPPLE, "EMBED_FAILURE_TIMEOUT": None}
+            ):
+                self.client.execute(
+                    query,
+                    variables={"id": self.blog_page.id},
+                    context_value=RequestFactory().get("/"),
+                )
+            self.assertEqual(finder.find_embed.call_count, 2)
+        caches["default"].clear()
+
+    def get_embed_finder(self):
+        finder = mock.Mock()
+        finder.accept.return_value = True
+        finder.find_embed.return_value = {
+            "title": "Wagtail Space 2018",
+            "type": "video",
+            "thumbnail_url": "",
+            "width": 200,
+            "height": 113,
+            "html": "<iframe></iframe>",
+        }
+        return finder
+
+    def get_blog_embed(self):
+        query = """
+        query($id: ID) {
+            page(id: $id) {
+                ... on BlogPage {
+                    body {
+                        ...on VideoBlock {
+                            youtubeLink {
+                                embed
+                            }
+                        }
+                    }
+                }
+            }
+        }
+        """
+        executed = self.client.execute(
+            query,
+            variables={"id": self.blog_page.id},
+            context_value=RequestFactory().get("/"),
+        )
+        video = next(block for block in executed["data"]["page"]["body"] if block)
+        return video["youtubeLink"]["embed"]
+
+    @override_settings(GRAPPLE={**settings.GRAPPLE, "EMBED_FETCH_ON_READ": False})
+    def test_blog_embed_warmed_by_command(self):
+        caches["default"].clear()
+        finder = self.get_embed_finder()
+        with mock.patch("wagtail.embeds.embeds.get_finders", return_value=[finder]):
+            self.assertIsNone(self.get_blog_embed())
+            self.assertEqual(finder.find_embed.call_count, 0)
+
+            output = StringIO()
+            call_command("grapple_warm_embeds", stdout=output)
+            self.assertEqual(
+                output.getvalue().strip(), "Embedded 1 URLs, 0 could not be embedded."
+            )
+            self.assertEqual(finder.find_embed.call_count, 1)
+
+            self.assertEqual(self.get_blog_embed(), "<iframe></iframe>")
+            self.assertEqual(finder.find_embed.call_count, 1)
+
+    # The background thread cannot use the database of the test transaction.
+    @mock.patch("grapple.embeds.get_stored_embeds", mock.Mock(return_value={}))
+    def test_blog_embed_warmed_on_publish(self):
+        caches["default"].clear()
+        url = "https://www.youtube.com/watch?v=_U79Wc965vw"
+        fetching, released = threading.Event(), threading.Event()
+
+        def get_embed(url):
+            fetching.set()
+            released.wait(5)
+
+        with mock.patch("grapple.embeds.get_embed", side_effect=get_embed) as mocked:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.blog_page.save_revision().publish()
+            mocked.assert_not_called()
+
+            with override_settings(  # noqa: SIM117
+                GRAPPLE={**settings.GRAPPLE, "EMBED_WARM_ON_PUBLISH": True}
+            ):
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.blog_page.save_revision().publish()
+
+            # Publishing returns while the provider is still being waited for.
+            self.assertTrue(fetching.wait(5))
+            threads = [
+                thread
+                for thread in threading.enumerate()
+                if thread.name == "grapple-warm-embeds"
+            ]
+            self.assertEqual(len(threads), 1)
+            released.set()
+            threads[0].join(5)
+            mocked.assert_called_once_with(url)
+
+    @override_settings(
+        GRAPPLE={**settings.GRAPPLE, "EMBED_MAX_WORKERS": 2, "EMBED_TIMEOUT": 0.1}
+    )
+    def test_embed_loader_timeout(self):
+        from grapple.loaders import EmbedLoader
+
+        caches["default"].clear()
+        released = threading.Event()
+        embed = mock.Mock()
+
+        def get_embed(url):
+            if url == "https://example.com/slow":
+                released.wait(5)
+            return embed
+
+        loader = EmbedLoader(mock.Mock(context=None))
+        with mock.patch("grapple.embeds.get_embed", side_effect=get_embed):
+            embeds = loader.batch_load(
+                ["https://example.com/fast", "https://example.com/slow"]
+            )
+        released.set()
+
+        self.assertEqual(embeds, {"https://example.com/fast": embed})
+
+    @override_settings(GRAPPLE={**settings.GRAPPLE, "EMBED_MAX_WORKERS": 2})
+    def test_embed_fetches_are_bounded_across_requests(self):
+        from grapple.embeds import embed_fetch_pool, fetch_embeds
+
+        caches["default"].clear()
+        released = threading.Event()
+        lock = threading.Lock()
+        running, max_running = 0, 0
+        embed = mock.Mock()
+
+        def get_embed(url):
+            nonlocal running, max_running
+            with lock:
+                running += 1
+                max_running = max(max_running, running)
+            released.wait(5)
+            with lock:
+                running -= 1
+            return embed
+
+        first_urls = [f"https://example.com/first/{i}" for i in range(3)]
+        second_urls = [f"https://example.com/second/{i}" for i in range(3)]
+        with mock.patch("grapple.embeds.get_embed", side_effect=get_embed) as mocked:
+            # Each request gives up on its slow embeds, which keep being fetched.
+            self.assertEqual(fetch_embeds(first_urls, timeout=0.1), {})
+            self.assertEqual(fetch_embeds(second_urls, timeout=0.1), {})
+            # URLs being fetched are not fetched again.
+            futures = [embed_fetch_pool.submit(url) for url in first_urls + second_urls]
+            self.assertEqual(len(set(futures)), 6)
+            self.assertEqual(embed_fetch_pool.submit(first_urls[0]), futures[0])
+            released.set()
+            wait(futures, timeout=5)
+
+        self.assertEqual([future.result() for future in futures], [embed] * 6)
+        self.assertEqual(mocked.call_count, 6)
+        self.assertEqual(max_running, 2)
+
     def test_blog_body_pagechooserblock(self):
         another_blog_post = BlogPageFactory(
             body=[("page", self.blog_page)], parent=self.home
@@ -603,6 +1119,52 @@ class BlogTest(BaseGrappleTest):
         # Check that we test all blocks that were returned.
         self.assertEqual(len(query_blocks), count)
 
+    def test_blog_body_pagechooserblock_num_queries(self):
+        query = """
+        query($id: ID) {
+            page(id: $id) {
+                ... on BlogPage {
+                    body {
+                        ... on PageChooserBlock {
+                            page {
+                                title
+                                ... on BlogPage {
+                                    date
+                                }
+                            }
+                        }
+                    }
+                }
+            }
+        }
+        """
+
+        def get_num_queries(num_blocks):
+            blog_page = BlogPageFactory(
+                parent=self.home,
+                body=[
+                    ("page", BlogPageFactory(parent=self.home, body=[]))
+                    for _ in range(num_blocks)
+                ],
+            )
+            with CaptureQueriesContext(connection) as queries:
+                executed = self.client.execute(
+                    query,
+                    variables={"id": blog_page.id},
+                    context_value=RequestFactory().get("/"),
+                )
+            self.assertNotIn("errors", executed)
+            body = executed["data"]["page"]["body"]
+            self.assertEqual(len(body), num_blocks)
+            self.assertEqual(
+                [block["page"]["title"] for block in body],
+                [block.value.title for block in blog_page.body],
+            )
+            return len(queries)
+
+        # The specific pages of all blocks are loaded with one query
+        self.assertEqual(get_num_queries(2), get_num_queries(5))
+
     def test_blog_body_snippetchooserblock_advert(self):
         url = "https://http.cat"
         text = "cats"
@@ -830,6 +1392,128 @@ class BlogTest(BaseGrappleTest):
         self.assertEqual(pagination["nextPage"], None)
         self.assertEqual(pagination["totalPages"], 2)
 
+    def test_blog_page_paginated_authors_without_total(self):
+        query = """
+        query ($id: ID, $page: PositiveInt, $perPage: PositiveInt) {
+            page(id: $id) {
+                ... on BlogPage {
+                    paginatedAuthors(page: $page, perPage: $perPage) {
+                        items {
+                            role
+                        }
+                        pagination {
+                            count
+                            currentPage
+                            prevPage
+                            nextPage
+                        }
+                    }
+                }
+            }
+        }
+        """
+
+        def get_paginated_authors(page):
+            with CaptureQueriesContext(connection) as queries:
+                executed = self.client.execute(
+                    query,
+                    variables={"id": self.blog_page.id, "page": page, "perPage": 5},
+                )
+            counted = any("COUNT(" in query["sql"] for query in queries)
+            return executed["data"]["page"]["paginatedAuthors"], counted
+
+        paginated_authors, counted = get_paginated_authors(1)
+        self.assertFalse(counted)
+        self.assertEqual(len(paginated_authors["items"]), 5)
+        self.assertEqual(
+            paginated_authors["pagination"],
+            {"count": 5, "currentPage": 1, "prevPage": None, "nextPage": 2},
+        )
+
+        paginated_authors, counted = get_paginated_authors(2)
+        self.assertFalse(counted)
+        self.assertEqual(len(paginated_authors["items"]), 3)
+        self.assertEqual(
+            paginated_authors["pagination"],
+            {"count": 3, "currentPage": 2, "prevPage": 1, "nextPage": None},
+        )
+
+        # Out of range pages still return the last page, which needs a count
+        paginated_authors, counted = get_paginated_authors(5)
+        self.assertTrue(counted)
+        self.assertEqual(
+            paginated_authors["pagination"],
+            {"count": 3, "currentPage": 2, "prevPage": 1, "nextPage": None},
+        )
+
+    def get_paginated_authors_total(self):
+        query = """
+        query ($id: ID) {
+            page(id: $id) {
+                ... on BlogPage {
+                    paginatedAuthors(perPage: 5) {
+                        pagination {
+                            total
+                            totalPages
+                            totalStrategy
+                        }
+                    }
+                }
+            }
+        }
+        """
+        with CaptureQueriesContext(connection) as queries:
+            executed = self.client.execute(query, variables={"id": self.blog_page.id})
+        self.assertNotIn("errors", executed)
+        counted = any("COUNT(" in query["sql"] for query in queries)
+        return executed["data"]["page"]["paginatedAuthors"]["pagination"], counted
+
+    def test_blog_page_paginated_authors_total_strategy(self):
+        pagination, counted = self.get_paginated_authors_total()
+        self.assertTrue(counted)
+        self.assertEqual(
+            pagination, {"total": 8, "totalPages": 2, "totalStrategy": "EXACT"}
+        )
+
+    @override_settings(
+        GRAPPLE={**settings.GRAPPLE, "PAGINATION_TOTAL_STRATEGY": "cached"}
+    )
+    def test_blog_page_paginated_authors_cached_total(self):
+        caches["default"].clear()
+        pagination, counted = self.get_paginated_authors_total()
+        self.assertTrue(counted)
+        self.assertEqual(pagination["totalStrategy"], "EXACT")
+
+        pagination, counted = self.get_paginated_authors_total()
+        self.assertFalse(counted)
+        self.assertEqual(
+            pagination, {"total": 8, "totalPages": 2, "totalStrategy": "CACHED"}
+        )
+
+    @override_settings(
+        GRAPPLE={**settings.GRAPPLE, "PAGINATION_TOTAL_STRATEGY": "estimated"}
+    )
+    def test_blog_page_paginated_authors_estimated_total(self):
+        # Estimates need PostgreSQL, otherwise the objects are counted.
+        with mock.patch("grapple.utils.estimate_total", return_value=None):
+            pagination, counted = self.get_paginated_authors_total()
+        self.assertTrue(counted)
+        self.assertEqual(pagination["totalStrategy"], "EXACT")
+
+        # Small estimates are not precise enough, so the objects are counted.
+        with mock.patch("grapple.utils.estimate_total", return_value=9):
+            pagination, counted = self.get_paginated_authors_total()
+        self.assertTrue(counted)
+        self.assertEqual(pagination["total"], 8)
+
+        with mock.patch("grapple.utils.estimate_total", return_value=20000):
+            pagination, counted = self.get_paginated_authors_total()
+        self.assertFalse(counted)
+        self.assertEqual(
+            pagination,
+            {"total": 20000, "totalPages": 4000, "totalStrategy": "ESTIMATED"},
+        )
+
     def test_structvalue_block(self):
         block_type = "TextAndButtonsBlock"
         query_blocks = self.get_blocks_from_body(
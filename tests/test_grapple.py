@@ -1,23 +1,45 @@
 import unittest
 
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
 from pydoc import locate
 from unittest.mock import patch
 
 import wagtail_factories
 
 from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.db import connection
-from django.test import RequestFactory, TestCase, override_settings
+from django.db import connection, connections
+from django.test import (
+    RequestFactory,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from graphene.test import Client
 from testapp.factories import AdvertFactory, BlogPageFactory, PersonFactory
-from testapp.models import GlobalSocialMediaSettings, HomePage, SocialMediaSettings
+from testapp.models import (
+    Advert,
+    BlogPage,
+    GlobalSocialMediaSettings,
+    HomePage,
+    Person,
+    SocialMediaSettings,
+)
 from wagtail.documents import get_document_model
+from wagtail.images import get_image_model
 from wagtail.models import Page, Site
+from wagtail.search.backends.base import BaseSearchResults
 from wagtailmedia.models import get_media_model
 
-from grapple.registry import RegistryItem
+from grapple.registry import RegistryItem, registry
 from grapple.schema import create_schema
+from grapple.types.interfaces import PageInterface
+from grapple.types.search import get_searchable_models
 
 
 SCHEMA = locate(settings.GRAPHENE["SCHEMA"])
@@ -166,6 +188,32 @@ class PagesTest(BaseGrappleTest):
         self.assertEqual(pages_data[0]["pageType"], "HomePage")
         self.assertEqual(len(executed["data"]["pages"]), 1)
 
+    def test_pages_page_type_num_queries(self):
+        def get_num_queries(fields):
+            with CaptureQueriesContext(connection) as queries:
+                executed = self.client.execute(f"{{ pages {{ {fields} }} }}")
+            self.assertNotIn("errors", executed)
+            return len(queries)
+
+        # pageType and contentType are resolved without loading anything else
+        self.assertEqual(
+            get_num_queries("id contentType pageType"), get_num_queries("id")
+        )
+
+    def test_page_type_of_generic_page(self):
+        blog_page = BlogPage.objects.first()
+        page = Page.objects.get(pk=blog_page.pk)
+        PageInterface.resolve_page_type(page, None)
+
+        with self.assertNumQueries(0):
+            self.assertIs(
+                PageInterface.resolve_page_type(page, None),
+                registry.pages[BlogPage],
+            )
+            self.assertEqual(
+                PageInterface.resolve_content_type(page, None), "testapp.BlogPage"
+            )
+
     def test_pages_in_site(self):
         query = """
         {
@@ -471,6 +519,503 @@ class PagesTest(BaseGrappleTest):
             self.assertEqual(page["depth"], p1_2.depth + 1)
 
 
+class PageTreeBatchingTest(BaseGrappleTest):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.section_one = BlogPageFactory(slug="section-one", parent=cls.home)
+        cls.section_two = BlogPageFactory(slug="section-two", parent=cls.home)
+        for section in (cls.section_one, cls.section_two):
+            for i in range(3):
+                BlogPageFactory(slug=f"{section.slug}-{i}", parent=section)
+
+    def setUp(self):
+        super().setUp()
+        self.request = RequestFactory().get("/")
+
+    def test_parent_and_ancestors(self):
+        query = """
+        {
+            pages(limit: 100) {
+                slug
+                parent {
+                    slug
+                }
+                ancestors {
+                    slug
+                }
+            }
+        }
+        """
+        executed = self.client.execute(query, context_value=self.request)
+        pages = {page["slug"]: page for page in executed["data"]["pages"]}
+
+        self.assertEqual(pages["section-one-1"]["parent"]["slug"], "section-one")
+        self.assertEqual(
+            [ancestor["slug"] for ancestor in pages["section-one-1"]["ancestors"]],
+            ["root", self.home.slug, "section-one"],
+        )
+        self.assertEqual(pages["section-two"]["parent"]["slug"], self.home.slug)
+        self.assertEqual(
+            [ancestor["slug"] for ancestor in pages["section-two"]["ancestors"]],
+            ["root", self.home.slug],
+        )
+
+    def test_parent_and_ancestors_num_queries(self):
+        query = """
+        {
+            pages(limit: 100) {
+                parent {
+                    title
+                }
+                ancestors {
+                    slug
+                }
+            }
+        }
+        """
+        # The listing, the parents and the ancestors each need one query for
+        # the base pages plus one per content type (Page, HomePage, BlogPage).
+        # The listing and the ancestors also check view restrictions.
+        with self.assertNumQueries(4 + 4 + 5):
+            self.client.execute(query, context_value=self.request)
+
+        BlogPageFactory(parent=self.section_one)
+        BlogPageFactory(parent=self.section_two)
+        with self.assertNumQueries(4 + 4 + 5):
+            self.client.execute(query, context_value=RequestFactory().get("/"))
+
+    def test_ancestors_arguments(self):
+        query = """
+        query($id: ID) {
+            page(id: $id) {
+                ancestors(limit: 1, offset: 1) {
+                    slug
+                }
+                orderedAncestors: ancestors(order: "-depth") {
+                    slug
+                }
+            }
+        }
+        """
+        executed = self.client.execute(
+            query,
+            variables={"id": self.section_one.get_children().first().id},
+            context_value=self.request,
+        )
+        page = executed["data"]["page"]
+        self.assertEqual(
+            [ancestor["slug"] for ancestor in page["ancestors"]], [self.home.slug]
+        )
+        self.assertEqual(
+            [ancestor["slug"] for ancestor in page["orderedAncestors"]],
+            ["section-one", self.home.slug, "root"],
+        )
+
+    def test_children_siblings_and_descendants(self):
+        query = """
+        {
+            pages(limit: 100) {
+                slug
+                children(limit: 2, offset: 1) {
+                    slug
+                }
+                orderedChildren: children(order: "-slug") {
+                    slug
+                }
+                siblings {
+                    slug
+                }
+                nextSiblings {
+                    slug
+                }
+                previousSiblings {
+                    slug
+                }
+                descendants(limit: 4) {
+                    slug
+                }
+            }
+        }
+        """
+        executed = self.client.execute(query, context_value=self.request)
+        pages = {page["slug"]: page for page in executed["data"]["pages"]}
+
+        def slugs(page, field):
+            return [item["slug"] for item in pages[page][field]]
+
+        self.assertEqual(
+            slugs("section-one", "children"), ["section-one-1", "section-one-2"]
+        )
+        self.assertEqual(
+            slugs("section-two", "orderedChildren"),
+            ["section-two-2", "section-two-1", "section-two-0"],
+        )
+        self.assertEqual(slugs("section-one-0", "children"), [])
+        self.assertEqual(
+            slugs("section-one-1", "siblings"), ["section-one-0", "section-one-2"]
+        )
+        self.assertEqual(slugs("section-one-1", "nextSiblings"), ["section-one-2"])
+        self.assertEqual(
+            slugs("section-two-2", "previousSiblings"),
+            ["section-two-1", "section-two-0"],
+        )
+        self.assertEqual(slugs("section-two", "siblings"), ["section-one"])
+        self.assertEqual(
+            slugs(self.home.slug, "descendants"),
+            ["section-one", "section-one-0", "section-one-1", "section-one-2"],
+        )
+        self.assertEqual(
+            slugs("section-two", "descendants"),
+            ["section-two-0", "section-two-1", "section-two-2"],
+        )
+
+    def test_previous_siblings_order(self):
+        query = """
+        query($id: ID) {
+            page(id: $id) {
+                previousSiblings {
+                    id
+                }
+                nearestPreviousSibling: previousSiblings(limit: 1) {
+                    id
+                }
+            }
+        }
+        """
+        page = self.section_two.get_children().last()
+        executed = self.client.execute(
+            query, variables={"id": page.id}, context_value=self.request
+        )
+        data = executed["data"]["page"]
+        expected = [str(sibling.id) for sibling in page.get_prev_siblings()]
+        self.assertEqual(len(expected), 2)
+        self.assertEqual([item["id"] for item in data["previousSiblings"]], expected)
+        self.assertEqual(
+            [item["id"] for item in data["nearestPreviousSibling"]], expected[:1]
+        )
+
+    def test_children_num_queries(self):
+        query = """
+        query($id: ID) {
+            page(id: $id) {
+                children {
+                    title
+                    children {
+                        title
+                    }
+                }
+            }
+        }
+        """
+        # The page, then one windowed query for each level of children. Each
+        # step also needs one query per content type and a view restrictions check.
+        with self.assertNumQueries(3 + 3 + 3):
+            executed = self.client.execute(
+                query, variables={"id": self.home.id}, context_value=self.request
+            )
+
+        children = executed["data"]["page"]["children"]
+        self.assertEqual(len(children), 2)
+        self.assertEqual(len(children[0]["children"]), 3)
+
+    def test_children_with_search(self):
+        query = """
+        query($id: ID) {
+            page(id: $id) {
+                children(searchQuery: "blog") {
+                    slug
+                }
+            }
+        }
+        """
+        executed = self.client.execute(
+            query, variables={"id": self.home.id}, context_value=self.request
+        )
+        self.assertEqual(len(executed["data"]["page"]["children"]), 2)
+
+
+class QuerySetOptimizerTest(BaseGrappleTest):
+    def setUp(self):
+        super().setUp()
+        self.request = RequestFactory().get("/")
+        self.request.user = AnonymousUser()
+        self.add_posts(2)
+
+    def add_posts(self, num_posts):
+        for _ in range(num_posts):
+            BlogPageFactory(
+                parent=self.home, advert=AdvertFactory(), body=[], hero_image=None
+            )
+
+    def get_num_queries(self, query, key):
+        with CaptureQueriesContext(connection) as queries:
+            executed = self.client.execute(query, context_value=self.request)
+        self.assertNotIn("errors", executed)
+        self.assertTrue(executed["data"][key])
+        return len(queries)
+
+    def test_pages_related_fields_num_queries(self):
+        query = """
+        {
+            pages(contentType: "testapp.BlogPage", limit: 100) {
+                title
+                ... on BlogPage {
+                    author {
+                        title
+                    }
+                    advert {
+                        ... on Advert {
+                            url
+                        }
+                    }
+                    relatedLinks(limit: 2) {
+                        name
+                    }
+                    authors
+                    tags {
+                        name
+                    }
+                }
+            }
+        }
+        """
+        num_queries = self.get_num_queries(query, "pages")
+        self.add_posts(3)
+        self.assertEqual(self.get_num_queries(query, "pages"), num_queries)
+
+        executed = self.client.execute(query, context_value=self.request)
+        for page in BlogPage.objects.all():
+            data = next(
+                item
+                for item in executed["data"]["pages"]
+                if item["title"] == page.title
+            )
+            self.assertEqual(data["author"]["title"], page.author.title)
+            self.assertEqual(data["advert"]["url"], page.advert.url)
+            self.assertEqual(len(data["relatedLinks"]), 2)
+            self.assertEqual(
+                data["authors"],
+                [author.person.name for author in page.authors.all()],
+            )
+            self.assertEqual(
+                sorted(tag["name"] for tag in data["tags"]),
+                sorted(page.tags.names()),
+            )
+
+    def test_query_field_related_fields_num_queries(self):
+        query = """
+        {
+            posts(limit: 100) {
+                advert {
+                    ... on Advert {
+                        url
+                    }
+                }
+                relatedLinks {
+                    name
+                }
+                authors
+            }
+        }
+        """
+        num_queries = self.get_num_queries(query, "posts")
+        self.add_posts(3)
+        self.assertEqual(self.get_num_queries(query, "posts"), num_queries)
+
+    def test_page_relations_related_fields_num_queries(self):
+        query = """
+        {
+            pages(limit: 100) {
+                children {
+                    ... on BlogPage {
+                        advert {
+                            ... on Advert {
+                                url
+                            }
+                        }
+                        relatedLinks {
+                            name
+                        }
+                    }
+                }
+                siblings {
+                    ... on BlogPage {
+                        relatedLinks {
+                            name
+                        }
+                    }
+                }
+                parent {
+                    ... on BlogPage {
+                        relatedLinks {
+                            name
+                        }
+                    }
+                }
+                ancestors {
+                    ... on BlogPage {
+                        relatedLinks {
+                            name
+                        }
+                    }
+                }
+            }
+        }
+        """
+        num_queries = self.get_num_queries(query, "pages")
+        self.add_posts(3)
+        self.assertEqual(self.get_num_queries(query, "pages"), num_queries)
+
+    def get_blog_page_queries(self, query):
+        with CaptureQueriesContext(connection) as queries:
+            executed = self.client.execute(query, context_value=self.request)
+        self.assertNotIn("errors", executed)
+        return [
+            item["sql"]
+            for item in queries.captured_queries
+            if 'FROM "testapp_blogpage"' in item["sql"]
+        ]
+
+    def test_pages_defer_streamfields(self):
+        query = """
+        {
+            pages(contentType: "testapp.BlogPage") {
+                title
+                ... on BlogPage {
+                    date
+                }
+            }
+        }
+        """
+        queries = self.get_blog_page_queries(query)
+        self.assertTrue(queries)
+        for sql in queries:
+            self.assertNotIn('"body"', sql)
+
+    def test_pages_streamfield_selected(self):
+        query = """
+        {
+            pages(contentType: "testapp.BlogPage") {
+                ... on BlogPage {
+                    body {
+                        blockType
+                    }
+                }
+            }
+        }
+        """
+        queries = self.get_blog_page_queries(query)
+        self.assertTrue(queries)
+        self.assertTrue(all('"body"' in sql for sql in queries))
+
+    def test_query_field_defer_streamfields(self):
+        query = """
+        {
+            posts {
+                title
+            }
+        }
+        """
+        queries = self.get_blog_page_queries(query)
+        self.assertTrue(queries)
+        for sql in queries:
+            self.assertNotIn('"body"', sql)
+
+    def test_page_relations_defer_streamfields(self):
+        query = """
+        {
+            pages(limit: 100) {
+                children {
+                    title
+                }
+                siblings {
+                    title
+                }
+                descendants {
+                    title
+                }
+                parent {
+                    title
+                }
+                ancestors {
+                    title
+                }
+            }
+        }
+        """
+        queries = self.get_blog_page_queries(query)
+        self.assertTrue(queries)
+        for sql in queries:
+            self.assertNotIn('"body"', sql)
+
+    def test_prefetched_list_arguments(self):
+        post = BlogPage.objects.live().first()
+        query = """
+        {
+            posts(limit: 100) {
+                id
+                relatedLinks(limit: 2, offset: 1) {
+                    name
+                }
+                orderedLinks: relatedLinks(order: "-name") {
+                    name
+                }
+            }
+        }
+        """
+        executed = self.client.execute(query, context_value=self.request)
+        data = next(
+            item for item in executed["data"]["posts"] if item["id"] == str(post.id)
+        )
+        names = [link.name for link in post.related_links.all()]
+        self.assertEqual([link["name"] for link in data["relatedLinks"]], names[1:3])
+        self.assertEqual(
+            [link["name"] for link in data["orderedLinks"]], sorted(names, reverse=True)
+        )
+
+    def test_image_renditions_prefetch_selected_filter_specs(self):
+        # Renditions cached by previous tests would not be in the database
+        get_image_model().get_rendition_model().cache_backend.clear()
+
+        def add_hero_images():
+            for post in BlogPage.objects.filter(hero_image__isnull=True):
+                post.hero_image = wagtail_factories.ImageFactory()
+                post.hero_image.get_renditions("width-100", "fill-10x10")
+                post.save()
+
+        query = """
+        {
+            pages(contentType: "testapp.BlogPage", limit: 100) {
+                ... on BlogPage {
+                    heroImage {
+                        rendition(width: 100) {
+                            url
+                        }
+                    }
+                }
+            }
+        }
+        """
+        add_hero_images()
+        num_queries = self.get_num_queries(query, "pages")
+        self.add_posts(3)
+        add_hero_images()
+        with CaptureQueriesContext(connection) as queries:
+            executed = self.client.execute(query, context_value=self.request)
+        self.assertEqual(len(queries), num_queries)
+
+        # Only the renditions requested by the query are loaded
+        rendition_queries = [
+            query["sql"] for query in queries if "filter_spec" in query["sql"]
+        ]
+        self.assertEqual(len(rendition_queries), 1)
+        self.assertIn("width-100", rendition_queries[0])
+        self.assertNotIn("fill-10x10", rendition_queries[0])
+        for item in executed["data"]["pages"]:
+            self.assertIn("width-100", item["heroImage"]["rendition"]["url"])
+
+
 class PagesSearchTest(BaseGrappleTest):
     @classmethod
     def setUpTestData(cls):
@@ -673,6 +1218,229 @@ class PagesSearchTest(BaseGrappleTest):
         self.assertEqual(page_data[8]["title"], "Gamma Alpha")
         self.assertEqual(page_data[9]["title"], "Gamma Beta")
 
+    def search_titles(self, search_query):
+        query = """
+        query($searchQuery: String) {
+            pages(searchQuery: $searchQuery) {
+                title
+            }
+        }
+        """
+        executed = self.client.execute(query, variables={"searchQuery": search_query})
+        self.assertNotIn("errors", executed)
+        return [page["title"] for page in executed["data"]["pages"]]
+
+    @override_settings(GRAPPLE={**settings.GRAPPLE, "SEARCH_CACHE": "default"})
+    def test_search_results_are_cached(self):
+        caches["default"].clear()
+        titles = self.search_titles("Alpha")
+        self.assertEqual(len(titles), 6)
+
+        with patch.object(BaseSearchResults, "_do_search") as do_search:
+            self.assertEqual(self.search_titles("Alpha"), titles)
+            self.assertEqual(self.search_titles(" alpha"), titles)
+            do_search.assert_not_called()
+
+        self.assertEqual(len(self.search_titles("Beta")), 6)
+
+    @override_settings(GRAPPLE={**settings.GRAPPLE, "SEARCH_CACHE": "default"})
+    def test_paginated_search_results_are_cached(self):
+        caches["default"].clear()
+        query = """
+        {
+            blogPages(searchQuery: "Alpha", page: 2, perPage: 4) {
+                items { title }
+                pagination { total totalPages currentPage }
+            }
+        }
+        """
+        request = RequestFactory().get("/")
+        request.user = AnonymousUser()
+        executed = self.client.execute(query, context_value=request)
+        self.assertNotIn("errors", executed)
+        pagination = executed["data"]["blogPages"]["pagination"]
+        self.assertEqual(pagination, {"total": 6, "totalPages": 2, "currentPage": 2})
+
+        request = RequestFactory().get("/")
+        request.user = AnonymousUser()
+        with patch.object(BaseSearchResults, "_do_search") as do_search:  # noqa: SIM117
+            with patch.object(BaseSearchResults, "_do_count") as do_count:
+                self.assertEqual(
+                    self.client.execute(query, context_value=request), executed
+                )
+        do_search.assert_not_called()
+        do_count.assert_not_called()
+
+    @override_settings(GRAPPLE={**settings.GRAPPLE, "SEARCH_CACHE": "default"})
+    def test_search_cache_expires_when_index_changes(self):
+        caches["default"].clear()
+        self.assertNotIn("Alpha Omega", self.search_titles("Omega"))
+
+        BlogPageFactory(title="Alpha Omega", parent=self.home)
+        self.assertEqual(self.search_titles("Omega"), ["Alpha Omega"])
+
+
+class PagesConnectionTest(BaseGrappleTest):
+    query = """
+    query ($first: PositiveInt, $after: String, $last: PositiveInt, $before: String, $order: String) {
+        pagesConnection(first: $first, after: $after, last: $last, before: $before, order: $order, contentType: "testapp.BlogPage") {
+            items {
+                title
+            }
+            pageInfo {
+                hasNextPage
+                hasPreviousPage
+                startCursor
+                endCursor
+            }
+        }
+    }
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.pages = [
+            BlogPageFactory(title=title, parent=cls.home)
+            for title in ["Delta", "Alpha", "Echo", "Charlie", "Bravo"]
+        ]
+
+    def get_connection(self, **variables):
+        executed = self.client.execute(self.query, variables=variables)
+        self.assertNotIn("errors", executed)
+        connection = executed["data"]["pagesConnection"]
+        return [item["title"] for item in connection["items"]], connection["pageInfo"]
+
+    def test_forward_pagination(self):
+        titles, page_info = self.get_connection(first=2, order="title")
+        self.assertEqual(titles, ["Alpha", "Bravo"])
+        self.assertTrue(page_info["hasNextPage"])
+        self.assertFalse(page_info["hasPreviousPage"])
+
+        titles, page_info = self.get_connection(
+            first=2, after=page_info["endCursor"], order="title"
+        )
+        self.assertEqual(titles, ["Charlie", "Delta"])
+        self.assertTrue(page_info["hasNextPage"])
+        self.assertTrue(page_info["hasPreviousPage"])
+
+        titles, page_info = self.get_connection(
+            first=2, after=page_info["endCursor"], order="title"
+        )
+        self.assertEqual(titles, ["Echo"])
+        self.assertFalse(page_info["hasNextPage"])
+
+    def test_backward_pagination(self):
+        titles, page_info = self.get_connection(last=2, order="-title")
+        self.assertEqual(titles, ["Bravo", "Alpha"])
+        self.assertTrue(page_info["hasPreviousPage"])
+        self.assertFalse(page_info["hasNextPage"])
+
+        titles, page_info = self.get_connection(
+            last=2, before=page_info["startCursor"], order="-title"
+        )
+        self.assertEqual(titles, ["Delta", "Charlie"])
+        self.assertTrue(page_info["hasPreviousPage"])
+        self.assertTrue(page_info["hasNextPage"])
+
+    def test_default_order(self):
+        titles, _page_info = self.get_connection(first=10)
+        self.assertEqual(titles, [page.title for page in self.pages])
+
+    def test_empty_values_come_last(self):
+        for page in self.pages[3:]:
+            page.save_revision()
+
+        titles = []
+        after = None
+        for _ in self.pages:
+            page_titles, page_info = self.get_connection(
+                first=1, after=after, order="-latest_revision_created_at"
+            )
+            titles += page_titles
+            after = page_info["endCursor"]
+        self.assertFalse(page_info["hasNextPage"])
+        self.assertEqual(titles, ["Bravo", "Charlie", "Delta", "Alpha", "Echo"])
+
+        titles, _page_info = self.get_connection(
+            last=3, before=after, order="-latest_revision_created_at"
+        )
+        self.assertEqual(titles, ["Charlie", "Delta", "Alpha"])
+
+    def test_datetimes_differing_below_a_millisecond(self):
+        published_at = timezone.now().replace(microsecond=1000)
+        for i, page in enumerate(self.pages):
+            page.first_published_at = published_at + timedelta(microseconds=i * 100)
+            page.save(update_fields=["first_published_at"])
+        titles = [page.title for page in self.pages]
+
+        for order, expected in [
+            ("first_published_at", titles),
+            ("-first_published_at", titles[::-1]),
+        ]:
+            with self.subTest(order=order):
+                paged_titles, after = [], None
+                for _ in self.pages:
+                    page_titles, page_info = self.get_connection(
+                        first=2, after=after, order=order
+                    )
+                    paged_titles += page_titles
+                    after = page_info["endCursor"]
+                    if not page_info["hasNextPage"]:
+                        break
+                self.assertEqual(paged_titles, expected)
+
+    def test_pages_cost_the_same_at_any_depth(self):
+        _titles, page_info = self.get_connection(first=1, order="title")
+        with CaptureQueriesContext(connection) as first_page:
+            self.get_connection(first=1, order="title")
+        with CaptureQueriesContext(connection) as next_page:
+            self.get_connection(first=1, after=page_info["endCursor"], order="title")
+        self.assertEqual(len(next_page), len(first_page))
+        self.assertNotIn("OFFSET", next_page[-1]["sql"])
+
+    def test_invalid_cursor(self):
+        executed = self.client.execute(
+            self.query, variables={"first": 1, "after": "invalid"}
+        )
+        self.assertEqual(executed["errors"][0]["message"], "Invalid cursor.")
+
+    def test_first_and_last(self):
+        executed = self.client.execute(self.query, variables={"first": 1, "last": 1})
+        self.assertEqual(
+            executed["errors"][0]["message"], "Pass either `first` or `last`, not both."
+        )
+
+    def test_registered_connection(self):
+        query = """
+        query ($after: String) {
+            people(first: 2, after: $after, order: "name") {
+                items {
+                    name
+                }
+                pageInfo {
+                    hasNextPage
+                    endCursor
+                }
+            }
+        }
+        """
+        for name in ["B", "A", "B", "A", "B"]:
+            PersonFactory(name=name)
+
+        names, after = [], None
+        while True:
+            executed = self.client.execute(query, variables={"after": after})
+            self.assertNotIn("errors", executed)
+            names += [item["name"] for item in executed["data"]["people"]["items"]]
+            page_info = executed["data"]["people"]["pageInfo"]
+            if not page_info["hasNextPage"]:
+                break
+            after = page_info["endCursor"]
+
+        # Ties are broken by primary key, so no person is skipped or repeated.
+        self.assertEqual(names, sorted(Person.objects.values_list("name", flat=True)))
+
 
 class PageUrlPathTest(BaseGrappleTest):
     def _query_by_path(self, path, *, in_site=False):
@@ -1710,6 +2478,140 @@ class SettingsTest(BaseGrappleTest):
         )
 
 
+class SearchQueryTest(BaseGrappleTest):
+    query = """
+    query ($query: String, $limit: PositiveInt, $offset: PositiveInt, $operator: SearchOperatorEnum) {
+        search(query: $query, limit: $limit, offset: $offset, searchOperator: $operator) {
+            __typename
+            ... on BlogPage {
+                title
+            }
+            ... on CustomImage {
+                title
+            }
+        }
+    }
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.home = HomePage.objects.first()
+        BlogPageFactory(title="Alpha Beta", parent=cls.home)
+        BlogPageFactory(title="Alpha Gamma", parent=cls.home)
+        BlogPageFactory(title="Alpha Draft", parent=cls.home, live=False)
+        wagtail_factories.ImageFactory(title="Alpha Image")
+
+    def search(self, **variables):
+        executed = self.client.execute(self.query, variables=variables)
+        self.assertNotIn("errors", executed)
+        return executed["data"]["search"]
+
+    @override_settings(GRAPPLE={"SEARCH_MAX_WORKERS": 1})
+    def test_search(self):
+        results = self.search(query="Alpha", limit=10)
+        self.assertEqual(
+            sorted(result["title"] for result in results),
+            ["Alpha Beta", "Alpha Gamma", "Alpha Image"],
+        )
+
+    @override_settings(GRAPPLE={"SEARCH_MAX_WORKERS": 1})
+    def test_search_pagination(self):
+        results = self.search(query="Alpha", limit=10)
+        self.assertEqual(self.search(query="Alpha", limit=2), results[:2])
+        self.assertEqual(self.search(query="Alpha", limit=2, offset=1), results[1:3])
+
+    @override_settings(GRAPPLE={"SEARCH_MAX_WORKERS": 1})
+    def test_search_operator(self):
+        results = self.search(query="Alpha Beta", operator="OR", limit=10)
+        self.assertEqual(len(results), 3)
+        results = self.search(query="Alpha Beta", operator="AND", limit=10)
+        self.assertEqual([result["title"] for result in results], ["Alpha Beta"])
+
+    def test_search_without_query(self):
+        self.assertEqual(self.search(), [])
+
+    def test_searched_models(self):
+        models = get_searchable_models()
+        self.assertIn(BlogPage, models)
+        self.assertIn(get_image_model(), models)
+        # Snippets that are not indexed are not searched
+        self.assertNotIn(Advert, models)
+
+    def test_concurrent_search(self):
+        def get_result(model, title, search_score):
+            result = model(title=title)
+            result.search_score = search_score
+            return result
+
+        results = {
+            BlogPage: [
+                get_result(BlogPage, "Blog 1", 10),
+                get_result(BlogPage, "Blog 2", 2),
+            ],
+            get_image_model(): [
+                get_result(get_image_model(), "Image 1", 5),
+                get_result(get_image_model(), "Image 2", 1),
+            ],
+        }
+
+        def search_model(model, query, operator, limit):
+            return results.get(model, [])[:limit]
+
+        with patch(  # noqa: SIM117
+            "grapple.types.search.search_model", side_effect=search_model
+        ):
+            with patch(
+                "grapple.types.search.ThreadPoolExecutor", wraps=ThreadPoolExecutor
+            ) as executor:
+                data = self.search(query="Alpha", limit=3)
+
+        executor.assert_called_once()
+        # The results of all models are merged by score
+        self.assertEqual(
+            [result["title"] for result in data], ["Blog 1", "Image 1", "Blog 2"]
+        )
+
+
+class ConcurrentSearchQueryTest(TransactionTestCase):
+    # Search threads use their own database connections, so the test data must
+    # be committed for them to see it.
+    serialized_rollback = True
+
+    query = SearchQueryTest.query
+
+    def setUp(self):
+        self.client = Client(SCHEMA, middleware=MIDDLEWARE)
+        home = HomePage.objects.first()
+        for title in ["Alpha Beta", "Alpha Gamma"]:
+            BlogPageFactory(title=title, parent=home)
+        wagtail_factories.ImageFactory(title="Alpha Image")
+
+    def search(self):
+        executed = self.client.execute(
+            self.query, variables={"query": "Alpha", "limit": 10}
+        )
+        self.assertNotIn("errors", executed)
+        return [result["title"] for result in executed["data"]["search"]]
+
+    def test_concurrent_search(self):
+        with override_settings(GRAPPLE={"SEARCH_MAX_WORKERS": 1}):
+            inline_results = self.search()
+
+        with patch(
+            "grapple.types.search.connections.close_all",
+            wraps=connections.close_all,
+        ) as close_all:
+            results = self.search()
+
+        # SQLite does not score results, so they are interleaved by rank, in
+        # the order the models are searched.
+        self.assertEqual(results, inline_results)
+        self.assertEqual(results, ["Alpha Image", "Alpha Beta", "Alpha Gamma"])
+        # Every thread closes its database connections.
+        self.assertEqual(close_all.call_count, len(get_searchable_models()))
+
+
 class SnippetsTest(BaseGrappleTest):
     def setUp(self):
         super().setUp()
@@ -1747,6 +2649,119 @@ class SnippetsTest(BaseGrappleTest):
         self.assertEqual(snippets_data[1]["snippetType"], "Person")
         self.assertEqual(snippets_data[1]["contentType"], "testapp.Person")
 
+    def test_snippets_type_filters(self):
+        query = """
+        query ($snippetType: String, $contentType: String) {
+            snippets(snippetType: $snippetType, contentType: $contentType) {
+                snippetType
+            }
+        }
+        """
+
+        def get_snippet_types(**variables):
+            executed = self.client.execute(query, variables=variables)
+            return sorted(s["snippetType"] for s in executed["data"]["snippets"])
+
+        self.assertEqual(get_snippet_types(snippetType="Advert"), ["Advert"])
+        self.assertEqual(get_snippet_types(contentType="testapp.Person"), ["Person"])
+        self.assertEqual(
+            get_snippet_types(contentType="testapp.Advert, testapp.Person"),
+            ["Advert", "Person"],
+        )
+        self.assertEqual(get_snippet_types(snippetType="Unknown"), [])
+
+    def test_snippets_pagination_and_order(self):
+        AdvertFactory()
+        PersonFactory()
+        query = """
+        query ($limit: PositiveInt, $offset: PositiveInt, $order: String) {
+            snippets(limit: $limit, offset: $offset, order: $order) {
+                snippetType
+                ... on Advert {
+                    id
+                }
+                ... on Person {
+                    id
+                }
+            }
+        }
+        """
+
+        executed = self.client.execute(query, variables={"order": "-id"})
+        snippets = executed["data"]["snippets"]
+        self.assertEqual(len(snippets), 4)
+        ids = [int(snippet["id"]) for snippet in snippets]
+        self.assertEqual(ids, sorted(ids, reverse=True))
+
+        executed = self.client.execute(
+            query, variables={"order": "-id", "limit": 2, "offset": 1}
+        )
+        self.assertEqual(executed["data"]["snippets"], snippets[1:3])
+
+    def test_snippets_order_by_field_of_some_models(self):
+        PersonFactory()
+        query = """
+        query ($order: String) {
+            snippets(order: $order) {
+                snippetType
+                ... on Person {
+                    name
+                }
+            }
+        }
+        """
+
+        # Only Person has a name, so adverts are left out.
+        executed = self.client.execute(query, variables={"order": "-name"})
+        self.assertNotIn("errors", executed)
+        snippets = executed["data"]["snippets"]
+        self.assertEqual({snippet["snippetType"] for snippet in snippets}, {"Person"})
+        names = [snippet["name"] for snippet in snippets]
+        self.assertEqual(len(names), 2)
+        self.assertEqual(names, sorted(names, reverse=True))
+
+        executed = self.client.execute(query, variables={"order": "unknown"})
+        self.assertEqual(
+            executed["errors"][0]["message"],
+            "No snippet type can be ordered by 'unknown'. Filter the snippets by "
+            "snippetType or contentType to order by the fields of specific snippet types.",
+        )
+
+    @override_settings(GRAPPLE={**settings.GRAPPLE, "PAGE_SIZE": 1})
+    def test_snippets_not_limited_by_default(self):
+        executed = self.client.execute("{ snippets { snippetType } }")
+        self.assertEqual(len(executed["data"]["snippets"]), 2)
+
+        executed = self.client.execute("{ snippets(limit: 1) { snippetType } }")
+        self.assertEqual(len(executed["data"]["snippets"]), 1)
+
+    def test_snippets_only_query_needed_models(self):
+        query = """
+        {
+            snippets(limit: 1) {
+                snippetType
+            }
+        }
+        """
+
+        # The first snippet model fills the results, so the others are not queried.
+        with self.assertNumQueries(1):
+            executed = self.client.execute(query)
+        self.assertEqual(len(executed["data"]["snippets"]), 1)
+
+    def test_snippets_search_skips_models_not_indexed(self):
+        query = """
+        {
+            snippets(searchQuery: "Name") {
+                snippetType
+            }
+        }
+        """
+
+        executed = self.client.execute(query)
+        self.assertNotIn("errors", executed)
+        self.assertEqual(executed["data"]["snippets"], [])
+
     def test_no_snippet_classes_registered(self):
         """
         If there are no registered snippet classes, the snippets query should
@@ -1,6 +1,10 @@
+from unittest import mock
+
 import wagtail_factories
 
+from django.db import connection
 from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from test_grapple import BaseGrappleTestWithIntrospection
 from wagtail.images import get_image_model
 from wagtail.images.tests.utils import get_test_image_file_svg
@@ -224,6 +228,132 @@ class ImageTypesTest(BaseGrappleTestWithIntrospection):
         with self.assertNumQueries(2):
             self.client.execute(query)
 
+    def test_images_prefetch_selected_renditions_only(self):
+        # Renditions cached by previous tests would not be in the database
+        Image.get_rendition_model().cache_backend.clear()
+        self.example_image.get_renditions("width-100", "width-200", "fill-50x50")
+        query = """
+        {
+            images {
+                rendition(width: 100) {
+                    url
+                }
+                srcSet(sizes: [200])
+            }
+        }
+        """
+
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.execute(query)["data"]["images"]
+
+        self.assertEqual(len(queries), 2)
+        self.assertIn("width-100", queries[1]["sql"])
+        self.assertIn("width-200", queries[1]["sql"])
+        self.assertNotIn("fill-50x50", queries[1]["sql"])
+        self.assertIn("width-100", data[0]["rendition"]["url"])
+        self.assertIn("width-200", data[0]["srcSet"])
+
+        # Renditions are not loaded at all unless requested
+        with self.assertNumQueries(1):
+            self.client.execute("{ images { id } }")
+
+    def test_image_prefetch_selected_renditions_only(self):
+        Image.get_rendition_model().cache_backend.clear()
+        self.example_image.get_renditions("width-100", "fill-50x50")
+        query = """
+        query ($id: ID!) {
+            image(id: $id) {
+                rendition(width: 100) {
+                    url
+                }
+            }
+        }
+        """
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.execute(query, variables={"id": self.example_image.id})
+
+        self.assertEqual(len(queries), 2)
+        self.assertIn("width-100", queries[1]["sql"])
+        self.assertNotIn("fill-50x50", queries[1]["sql"])
+
+    def test_src_set_generates_renditions_in_bulk(self):
+        query = """
+        query ($id: ID!) {
+            image(id: $id) {
+                srcSet(sizes: [100, 200, 300])
+            }
+        }
+        """
+
+        with mock.patch.object(
+            Image, "create_renditions", wraps=self.example_image.create_renditions
+        ) as create_renditions:
+            data = self.client.execute(query, variables={"id": self.example_image.id})[
+                "data"
+            ]["image"]
+
+        create_renditions.assert_called_once()
+        self.assertEqual(len(create_renditions.call_args.args), 3)
+        srcset = data["srcSet"].split(", ")
+        self.assertEqual(len(srcset), 3)
+        for entry, width in zip(srcset, [100, 200, 300]):
+            self.assertIn(f"width-{width}", entry)
+
+    def test_renditions_field(self):
+        query = """
+        query ($id: ID!) {
+            image(id: $id) {
+                renditions(specs: ["fill-100x100", "width-200|format-webp"]) {
+                    filterSpec
+                    url
+                }
+            }
+        }
+        """
+
+        data = self.client.execute(query, variables={"id": self.example_image.id})[
+            "data"
+        ]["image"]["renditions"]
+
+        self.assertEqual(
+            [rendition["filterSpec"] for rendition in data],
+            ["fill-100x100", "width-200|format-webp"],
+        )
+        self.assertIn("fill-100x100", data[0]["url"])
+        self.assertIn("width-200.format-webp.webp", data[1]["url"])
+
+    @override_settings(GRAPPLE={"ALLOWED_IMAGE_FILTERS": ["width-200"]})
+    def test_renditions_field_with_allowed_image_filters_restrictions(self):
+        query = """
+        query ($id: ID!, $specs: [String!]!) {
+            image(id: $id) {
+                renditions(specs: $specs) {
+                    url
+                }
+            }
+        }
+        """
+
+        results = self.client.execute(
+            query,
+            variables={
+                "id": self.example_image.id,
+                "specs": ["width-100", "width-200"],
+            },
+        )
+        self.assertIsNone(results["data"]["image"]["renditions"])
+        self.assertEqual(
+            results["errors"][0]["message"],
+            "Invalid filter specs. Check the `ALLOWED_IMAGE_FILTERS` setting.",
+        )
+
+        data = self.client.execute(
+            query, variables={"id": self.example_image.id, "specs": ["width-200"]}
+        )["data"]["image"]
+        self.assertEqual(len(data["renditions"]), 1)
+        self.assertIn("width-200", data["renditions"][0]["url"])
+
 
 class ImageTypesTestWithSVG(BaseGrappleTestWithIntrospection):
     @classmethod
@@ -358,6 +488,23 @@ class ImageTypesTestWithSVG(BaseGrappleTestWithIntrospection):
             "'SvgImage' object has no attribute 'save_as_webp'",
         )
 
+    def test_svg_renditions_field_with_preserve_svg(self):
+        query = """
+        query ($id: ID!) {
+            image(id: $id) {
+                renditions(specs: ["width-100|format-webp", "bgcolor-fff"]) {
+                    url
+                }
+            }
+        }
+        """
+
+        data = self.client.execute(query, variables={"id": self.example_svg_image.id})[
+            "data"
+        ]["image"]["renditions"]
+        self.assertTrue(data[0]["url"].endswith("grapple-test.width-100.svg"))
+        self.assertTrue(data[1]["url"].endswith("grapple-test.original.svg"))
+
     def test_svg_rendition_with_filters_passed_through_to_svg_safe_spec(self):
         # bgcolor is not one of the allowed filters, so we should end with an empty filter spec
         query = """
@@ -1,3 +1,7 @@
+import json
+
+from django.core.cache import caches
+from django.test import override_settings
 from test_grapple import BaseGrappleTest
 from testapp.factories import RedirectFactory
 from testapp.models import BlogPage
@@ -5,6 +9,8 @@ from wagtail.contrib.redirects.models import Redirect
 from wagtail.models import Site
 from wagtail_factories import SiteFactory
 
+from grapple.types.redirects import build_redirect_map
+
 
 class TestRedirectQueries(BaseGrappleTest):
     @classmethod
@@ -277,3 +283,322 @@ class TestRedirectQueries(BaseGrappleTest):
         # There should be one SELECT query for Redirects and one for Sites.
         with self.assertNumQueries(2):
             self.client.execute(query)
+
+    def test_all_sites_query_efficiency(self):
+        """
+        Verify that the sites of redirects without a site are only fetched once.
+        """
+
+        SiteFactory(hostname="test-site", port=81)
+        SiteFactory(hostname="another-test-site", port=82)
+        for i in range(3):
+            RedirectFactory(old_path=f"/old-path-{i}", site=None, redirect_page=None)
+
+        query = """
+        {
+            redirects {
+                oldUrl
+                site {
+                    hostname
+                }
+            }
+        }
+        """
+
+        # One query for Redirects and one for all Sites.
+        with self.assertNumQueries(2):
+            result = self.client.execute(query)["data"]["redirects"]
+
+        self.assertEqual(len(result), 9)
+
+    def test_pagination(self):
+        """
+        Test that `limit` and `offset` apply to the redirects of every site.
+        """
+
+        SiteFactory(hostname="test-site", port=81)
+        RedirectFactory(old_path="/first", site=None)
+        RedirectFactory(old_path="/second", site=None)
+
+        query = """
+        query ($limit: PositiveInt, $offset: PositiveInt) {
+            redirects(limit: $limit, offset: $offset) {
+                oldUrl
+            }
+        }
+        """
+
+        result = self.client.execute(query, variables={"limit": 2, "offset": 1})
+        self.assertEqual(
+            [redirect["oldUrl"] for redirect in result["data"]["redirects"]],
+            ["http://test-site:81/first", "http://localhost/second"],
+        )
+
+        result = self.client.execute(query, variables={"offset": 3})
+        self.assertEqual(
+            [redirect["oldUrl"] for redirect in result["data"]["redirects"]],
+            ["http://test-site:81/second"],
+        )
+
+    def test_negative_pagination(self):
+        RedirectFactory(old_path="/first", site=None)
+
+        for arguments in ["limit: -1", "offset: -1"]:
+            with self.subTest(arguments=arguments):
+                result = self.client.execute(
+                    f"{{ redirects({arguments}) {{ oldUrl }} }}"
+                )
+                self.assertIn("errors", result)
+                self.assertIn("PositiveInt", result["errors"][0]["message"])
+
+        query = """
+        query ($limit: PositiveInt, $offset: PositiveInt) {
+            redirects(limit: $limit, offset: $offset) {
+                oldUrl
+            }
+        }
+        """
+        for variables in [{"limit": -1}, {"offset": -1}]:
+            with self.subTest(variables=variables):
+                result = self.client.execute(query, variables=variables)
+                self.assertIn("errors", result)
+                self.assertIn("PositiveInt", result["errors"][0]["message"])
+
+    def test_site_and_old_path_filters(self):
+        """
+        Test that redirects can be filtered by site and old path, including
+        redirects without a site.
+        """
+
+        test_site = SiteFactory(hostname="test-site", port=81)
+        other_site = SiteFactory(hostname="other-site", port=82)
+        RedirectFactory(old_path="/all-sites", site=None)
+        RedirectFactory(old_path="/test-site", site=test_site)
+        RedirectFactory(old_path="/other-site", site=other_site)
+
+        query = """
+        query ($site: String, $oldPath: String) {
+            redirects(site: $site, oldPath: $oldPath) {
+                oldUrl
+            }
+        }
+        """
+
+        result = self.client.execute(query, variables={"site": "test-site"})
+        self.assertEqual(
+            [redirect["oldUrl"] for redirect in result["data"]["redirects"]],
+            ["http://test-site:81/all-sites", "http://test-site:81/test-site"],
+        )
+
+        result = self.client.execute(query, variables={"oldPath": "all-sites/"})
+        self.assertEqual(
+            [redirect["oldUrl"] for redirect in result["data"]["redirects"]],
+            [
+                "http://localhost/all-sites",
+                "http://other-site:82/all-sites",
+                "http://test-site:81/all-sites",
+            ],
+        )
+
+        result = self.client.execute(
+            query, variables={"site": "other-site:82", "oldPath": "/test-site"}
+        )
+        self.assertEqual(result["data"]["redirects"], [])
+
+        result = self.client.execute(query, variables={"site": "unknown-site"})
+        self.assertEqual(result["data"]["redirects"], [])
+
+
+class TestRedirectQuery(BaseGrappleTest):
+    query = """
+    query ($oldPath: String!, $site: String) {
+        redirect(oldPath: $oldPath, site: $site) {
+            oldPath
+            newUrl
+            site {
+                hostname
+            }
+        }
+    }
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        super().setUpTestData()
+        cls.test_site = SiteFactory(hostname="test-site", port=81)
+        RedirectFactory(
+            redirect_page=None,
+            old_path="/all-sites",
+            redirect_link="http://all-sites",
+            site=None,
+        )
+        RedirectFactory(
+            redirect_page=None,
+            old_path="/both",
+            redirect_link="http://all-sites/both",
+            site=None,
+        )
+        RedirectFactory(
+            redirect_page=None,
+            old_path="/both",
+            redirect_link="http://test-site/both",
+            site=cls.test_site,
+        )
+        RedirectFactory(
+            redirect_page=None,
+            old_path="/query?a=1&b=2",
+            redirect_link="http://all-sites/query",
+            site=None,
+        )
+
+    def get_redirect(self, old_path, site="test-site"):
+        result = self.client.execute(
+            self.query, variables={"oldPath": old_path, "site": site}
+        )
+        self.assertNotIn("errors", result)
+        return result["data"]["redirect"]
+
+    def test_site_redirect_takes_precedence(self):
+        redirect = self.get_redirect("/both")
+        self.assertEqual(redirect["newUrl"], "http://test-site/both")
+        self.assertEqual(redirect["site"]["hostname"], "test-site")
+
+        redirect = self.get_redirect("/both", site="localhost")
+        self.assertEqual(redirect["newUrl"], "http://all-sites/both")
+        self.assertEqual(redirect["site"]["hostname"], "localhost")
+
+    def test_site_less_redirect_fallback(self):
+        redirect = self.get_redirect("/all-sites")
+        self.assertEqual(redirect["oldPath"], "/all-sites")
+        self.assertEqual(redirect["newUrl"], "http://all-sites")
+        self.assertEqual(redirect["site"]["hostname"], "test-site")
+
+    def test_path_is_normalised(self):
+        self.assertEqual(
+            self.get_redirect(" all-sites/ ")["newUrl"], "http://all-sites"
+        )
+        self.assertEqual(
+            self.get_redirect("/query?b=2&a=1")["newUrl"], "http://all-sites/query"
+        )
+        # Falls back to the path without its query string
+        self.assertEqual(
+            self.get_redirect("/all-sites?utm_source=test")["newUrl"],
+            "http://all-sites",
+        )
+
+    def test_no_redirect(self):
+        self.assertIsNone(self.get_redirect("/missing"))
+        self.assertIsNone(self.get_redirect("/all-sites", site="unknown-site"))
+
+    def test_query_efficiency(self):
+        # One query for the site and one for the redirect.
+        with self.assertNumQueries(2):
+            self.get_redirect("/both?utm_source=test")
+
+
+class TestRedirectMapQuery(BaseGrappleTest):
+    query = """
+    query ($site: String) {
+        redirectMap(site: $site)
+    }
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        super().setUpTestData()
+        cls.test_site = SiteFactory(hostname="test-site", port=81)
+        RedirectFactory(
+            old_path="/all-sites",
+            redirect_link="http://all-sites",
+            is_permanent=True,
+            site=None,
+            redirect_page=None,
+        )
+        RedirectFactory(
+            old_path="/both",
+            redirect_link="http://all-sites/both",
+            site=None,
+            redirect_page=None,
+        )
+        cls.site_redirect = RedirectFactory(
+            old_path="/both",
+            redirect_link="http://test-site/both",
+            is_permanent=False,
+            site=cls.test_site,
+            redirect_page=None,
+        )
+        RedirectFactory(
+            old_path="/gone",
+            redirect_link="",
+            is_permanent=False,
+            site=None,
+            redirect_page=None,
+        )
+
+    def setUp(self):
+        super().setUp()
+        caches["default"].clear()
+
+    def get_redirect_map(self, site="test-site"):
+        result = self.client.execute(self.query, variables={"site": site})
+        self.assertNotIn("errors", result)
+        return json.loads(result["data"]["redirectMap"])
+
+    def test_redirect_map(self):
+        redirect_map = self.get_redirect_map()
+        self.assertEqual(
+            redirect_map,
+            {
+                "/all-sites": ["http://all-sites", 301],
+                "/both": ["http://test-site/both", 302],
+                "/gone": [None, 302],
+            },
+        )
+        self.assertEqual(
+            self.get_redirect_map(site="localhost")["/both"][0],
+            "http://all-sites/both",
+        )
+
+    def test_unknown_site(self):
+        result = self.client.execute(self.query, variables={"site": "unknown-site"})
+        self.assertIsNone(result["data"]["redirectMap"])
+
+    @override_settings(GRAPPLE={"REDIRECT_MAP_CACHE": "default"})
+    def test_redirect_map_is_cached(self):
+        redirect_map = self.get_redirect_map()
+
+        # Only the site is fetched from the database.
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get_redirect_map(), redirect_map)
+
+    @override_settings(GRAPPLE={"REDIRECT_MAP_CACHE": "default"})
+    def test_cached_redirect_map_is_updated(self):
+        self.get_redirect_map()
+        self.get_redirect_map(site="localhost")
+
+        RedirectFactory(
+            old_path="/new",
+            redirect_link="http://all-sites/new",
+            is_permanent=True,
+            site=None,
+            redirect_page=None,
+        )
+        self.assertEqual(self.get_redirect_map()["/new"], ["http://all-sites/new", 301])
+        self.assertEqual(
+            self.get_redirect_map(site="localhost")["/new"],
+            ["http://all-sites/new", 301],
+        )
+
+        # Moving a redirect removes its previous entry.
+        self.site_redirect.old_path = "/moved"
+        self.site_redirect.save()
+        redirect_map = self.get_redirect_map()
+        self.assertEqual(redirect_map["/moved"], ["http://test-site/both", 302])
+        self.assertEqual(redirect_map["/both"][0], "http://all-sites/both")
+
+        # Deleting a redirect removes its entry.
+        self.site_redirect.delete()
+        self.assertNotIn("/moved", self.get_redirect_map())
+
+        # The cached map matches a freshly built one.
+        self.assertEqual(self.get_redirect_map(), build_redirect_map(self.test_site))
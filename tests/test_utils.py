@@ -1,9 +1,14 @@
+from unittest import mock
+
 import wagtail_factories
 
-from django.test import TestCase
+from django.conf import settings
+from django.test import TestCase, override_settings
 from graphql import GraphQLError
+from wagtail.contrib.search_promotions.models import Query
 
-from grapple.utils import resolve_site_by_hostname, resolve_site_by_id
+from grapple.search_hits import SearchHitBuffer, search_hit_buffer
+from grapple.utils import add_search_hit, resolve_site_by_hostname, resolve_site_by_id
 
 
 class TestResolveSiteById(TestCase):
@@ -104,3 +109,67 @@ class TestResolveSiteByHostname(TestCase):
                 hostname="example.com",
                 filter_name="hostname",
             )
+
+
+@mock.patch.object(SearchHitBuffer, "_start")
+class TestAddSearchHit(TestCase):
+    """
+    Test suite for the `grapple.utils.add_search_hit()` utility method.
+    """
+
+    def tearDown(self):
+        search_hit_buffer.flush()
+
+    def test_hit_is_recorded_immediately_by_default(self, start):
+        add_search_hit("Hello")
+
+        self.assertEqual(Query.get("hello").hits, 1)
+        start.assert_not_called()
+
+    def test_hits_are_buffered_when_flush_interval_is_set(self, start):
+        with override_settings(
+            GRAPPLE={**settings.GRAPPLE, "SEARCH_HIT_FLUSH_INTERVAL": 60}
+        ):
+            add_search_hit("Hello")
+            add_search_hit("hello ")
+            add_search_hit("World")
+
+        self.assertFalse(Query.objects.exists())
+        self.assertEqual(len(search_hit_buffer), 3)
+        start.assert_called()
+
+        # One query per distinct search, plus a constant overhead.
+        with self.assertNumQueries(7):
+            self.assertEqual(search_hit_buffer.flush(), 3)
+
+        self.assertEqual(len(search_hit_buffer), 0)
+        self.assertEqual(Query.get("hello").hits, 2)
+        self.assertEqual(Query.get("world").hits, 1)
+
+    def test_flush_adds_to_existing_hits(self, start):
+        Query.get("hello").add_hit()
+
+        with override_settings(
+            GRAPPLE={**settings.GRAPPLE, "SEARCH_HIT_FLUSH_INTERVAL": 60}
+        ):
+            add_search_hit("hello")
+        search_hit_buffer.flush()
+
+        self.assertEqual(Query.get("hello").hits, 2)
+        self.assertEqual(Query.objects.count(), 1)
+
+    def test_flush_is_requested_when_threshold_is_reached(self, start):
+        with override_settings(
+            GRAPPLE={
+                **settings.GRAPPLE,
+                "SEARCH_HIT_FLUSH_INTERVAL": 60,
+                "SEARCH_HIT_FLUSH_THRESHOLD": 2,
+            }
+        ):
+            add_search_hit("hello")
+            self.assertFalse(search_hit_buffer.flush_requested)
+            add_search_hit("world")
+            self.assertTrue(search_hit_buffer.flush_requested)
+
+        search_hit_buffer.flush()
+        self.assertFalse(search_hit_buffer.flush_requested)
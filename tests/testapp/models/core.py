@@ -218,6 +218,7 @@ class BlogPageRelatedLink(Orderable):
 
 
 @register_snippet
+@register_paginated_query_field("person", "people", cursor_pagination=True)
 class Person(models.Model):
     name = models.CharField(max_length=255)
     job = models.CharField(max_length=255)
@@ -271,12 +272,16 @@ class Advert(models.Model):
         GraphQLRichText("rich_text"),
         GraphQLString("string_rich_text", source="rich_text"),
         GraphQLString("extra_rich_text", deprecation_reason="Use rich_text instead"),
+        GraphQLString("description", source="get_description", depends_on=["text"]),
     ]
     graphql_interfaces = (AdditionalInterface,)
 
     def __str__(self):
         return self.text
 
+    def get_description(self, info, **kwargs):
+        return f"Advert: {self.text}"
+
 
 @register_setting
 class SocialMediaSettings(BaseSiteSetting):